@@ -0,0 +1,86 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark encoding page content streams
+
+Renders an article consisting of a number of long paragraphs and reports the
+total size of the (uncompressed) page content streams and the time spent
+encoding the text (Canvas.show_glyphs), for a number of settings of the
+numeric precision (ContentStream.precision).
+
+    python benchmarks/content_stream.py [number of words per paragraph]
+
+"""
+
+
+import sys
+import time
+import warnings
+
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rinoh.backend.pdf import Canvas
+from rinoh.document import DocumentTree
+from rinoh.paragraph import Paragraph
+from rinoh.templates import Article
+
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do'
+         ' eiusmod tempor incididunt ut labore et dolore magna aliqua ut enim'
+         ' ad minim veniam quis nostrud exercitation ullamco laboris nisi ut'
+         ' aliquip ex ea commodo consequat').split()
+
+
+def render(num_words, precision):
+    show_glyphs = Canvas.show_glyphs
+    encoding_time = 0
+
+    def timed_show_glyphs(canvas, *args, **kwargs):
+        nonlocal encoding_time
+        start = time.perf_counter()
+        try:
+            return show_glyphs(canvas, *args, **kwargs)
+        finally:
+            encoding_time += time.perf_counter() - start
+
+    Canvas.show_glyphs = timed_show_glyphs
+    Canvas.precision, default_precision = precision, Canvas.precision
+    try:
+        with TemporaryDirectory() as out_dir, redirect_stdout(StringIO()), \
+                warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            paragraphs = [Paragraph(' '.join(WORDS[(index * 7 + paragraph)
+                                                   % len(WORDS)]
+                                             for index in range(num_words)))
+                          for paragraph in range(4)]
+            document = Article(DocumentTree(paragraphs))
+            document.render(Path(out_dir) / 'content_stream')
+            pages = document.backend_document.pages
+            size = sum(len(page.canvas.getvalue()) for page in pages)
+    finally:
+        Canvas.show_glyphs = show_glyphs
+        Canvas.precision = default_precision
+    return size, encoding_time, len(pages)
+
+
+def main(num_words=3000):
+    print('4 paragraphs of {} words'.format(num_words))
+    print('{:<12} {:>8} {:>16} {:>20}'.format('precision', 'pages',
+                                              'content (bytes)',
+                                              'show_glyphs (s)'))
+    for precision in (6, 3, 2):
+        size, duration, num_pages = render(num_words, precision)
+        print('{:<12} {:>8} {:>16} {:>20.4f}'.format(precision, num_pages,
+                                                     size, duration))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,88 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark the time it takes to load OpenType fonts
+
+Loads each font and looks up the metrics, kerning and ligatures for a few
+glyphs, as needed to set the first line of text. This is compared to parsing
+all tables and glyph headers and verifying the table checksums up front, as
+done previously. By default, the fonts in the test suite and in the installed
+rinoh-typeface-* packages are loaded.
+
+    python benchmarks/font_loading.py [font file ...]
+
+"""
+
+
+import importlib.metadata as ilm
+import sys
+import time
+
+from pathlib import Path
+
+from rinoh.font.opentype import OpenTypeFont
+
+
+TESTS_PATH = Path(__file__).parent.parent / 'tests'
+
+
+def find_fonts():
+    paths = sorted(TESTS_PATH.glob('*.[ot]tf'))
+    for dist in ilm.distributions():
+        name = dist.metadata['Name'] or ''
+        if not name.lower().startswith('rinoh-typeface-'):
+            continue
+        paths.extend(sorted(Path(dist.locate_file(file))
+                            for file in dist.files or ()
+                            if file.suffix.lower() in ('.otf', '.ttf')))
+    return paths
+
+
+def first_line(font):
+    glyphs = [font.get_glyph_metrics(char, 'normal') for char in 'Waffle']
+    for glyph, next_glyph in zip(glyphs, glyphs[1:]):
+        font.get_kerning(glyph, next_glyph)
+        font.get_ligature(glyph, next_glyph)
+
+
+def load_lazy(path):
+    first_line(OpenTypeFont(path))
+
+
+def load_eager(path):
+    font = OpenTypeFont(path, verify_checksums=True)
+    for tag in font._available_tables:
+        font[tag]
+    for glyph in font._glyphs_by_code.values():
+        glyph.bounding_box
+    first_line(font)
+
+
+def time_fonts(function, paths):
+    start = time.perf_counter()
+    for path in paths:
+        function(path)
+    return time.perf_counter() - start
+
+
+def main(*paths):
+    paths = [Path(path) for path in paths] or find_fonts()
+    eager_time = time_fonts(load_eager, paths)
+    lazy_time = time_fonts(load_lazy, paths)
+    print('{} fonts ({:.1f} MB)'.format(len(paths),
+                                        sum(path.stat().st_size
+                                            for path in paths) / 2**20))
+    print('{:<24} {:>10} {:>8}'.format('', 'time (s)', 'speedup'))
+    for label, duration in (('eager parsing', eager_time),
+                            ('lazy parsing', lazy_time)):
+        print('{:<24} {:>10.4f} {:>7.1f}x'
+              .format(label, duration, eager_time / duration))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,84 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark the embedding of OpenType fonts in the PDF output
+
+Renders a reStructuredText document (README.rst by default) using the Sphinx
+style sheet, which relies on the TeX Gyre (CFF) and DejaVu Serif (TrueType)
+fonts, with and without font subsetting. For each, the output size and the
+time spent writing the PDF file are reported.
+
+    python benchmarks/font_subsetting.py [document.rst]
+
+"""
+
+
+import sys
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rinoh.backend import pdf
+from rinoh.frontend.rst import ReStructuredTextReader
+from rinoh.templates import Article
+
+
+ROOT = Path(__file__).parent.parent
+
+
+@contextmanager
+def timed_write(timings):
+    write = pdf.Document.write
+
+    def timed(self, file):
+        start = time.perf_counter()
+        write(self, file)
+        timings.append(time.perf_counter() - start)
+
+    pdf.Document.write = timed
+    try:
+        yield
+    finally:
+        pdf.Document.write = write
+
+
+def render(source, subset_fonts):
+    doctree = ReStructuredTextReader().parse(source)
+    configuration = Article.Configuration('benchmark', stylesheet='sphinx')
+    document = configuration.document(doctree)
+    timings = []
+    pdf.Document.subset_fonts = subset_fonts
+    with TemporaryDirectory() as output_dir, timed_write(timings):
+        filename_root = Path(output_dir) / source.stem
+        document.render(filename_root)
+        size = filename_root.with_suffix('.pdf').stat().st_size
+    write_time, = timings
+    return size, write_time
+
+
+def main(source):
+    results = {}
+    for subset_fonts in (False, True):
+        results[subset_fonts] = render(source, subset_fonts)
+    pdf.Document.subset_fonts = True
+    print()
+    print('{:<16} {:>12} {:>12}'.format('', 'size (bytes)', 'write (s)'))
+    for subset_fonts, label in ((False, 'full fonts'), (True, 'subset fonts')):
+        size, write_time = results[subset_fonts]
+        print('{:<16} {:>12} {:>12.3f}'.format(label, size, write_time))
+    (full_size, full_time), (subset_size, subset_time) = (results[False],
+                                                          results[True])
+    print('{:<16} {:>11.1f}x {:>11.1f}x'.format('reduction',
+                                                full_size / subset_size,
+                                                full_time / subset_time))
+
+
+if __name__ == '__main__':
+    main(Path(sys.argv[1]) if len(sys.argv) > 1 else ROOT / 'README.rst')
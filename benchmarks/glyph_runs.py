@@ -0,0 +1,133 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark the memory used by glyph runs
+
+First compares holding the glyphs of a number of words as GlyphRun objects
+(parallel arrays) to holding them as an object per glyph, as done previously.
+Then renders an article consisting of long paragraphs and reports the peak
+memory use (tracemalloc) and the time spent in the garbage collector.
+
+    python benchmarks/glyph_runs.py [number of words]
+
+"""
+
+
+import gc
+import sys
+import time
+import tracemalloc
+import warnings
+
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rinoh.document import DocumentTree
+from rinoh.paragraph import GlyphRun, Paragraph
+from rinoh.templates import Article
+
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do'
+         ' eiusmod tempor incididunt ut labore et dolore magna aliqua ut enim'
+         ' ad minim veniam quis nostrud exercitation ullamco laboris nisi ut'
+         ' aliquip ex ea commodo consequat').split()
+
+
+class Glyph(object):
+    """A glyph as represented before the introduction of GlyphRun"""
+
+    __slots__ = ('metrics', 'width', 'char')
+
+    def __init__(self, metrics, width, char):
+        self.metrics = metrics
+        self.width = width
+        self.char = char
+
+
+class GCTimer(object):
+    """Accumulates the time spent in garbage collection"""
+
+    def __init__(self):
+        self.duration = 0
+        self.collections = 0
+        self._start = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        else:
+            self.duration += time.perf_counter() - self._start
+            self.collections += 1
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        gc.callbacks.remove(self)
+
+
+def measure(function):
+    """Return the result of `function`, its peak memory use (in MB), and the
+    time spent in garbage collection while executing it"""
+    gc.collect()
+    tracemalloc.start()
+    with GCTimer() as gc_timer:
+        result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2**20, gc_timer
+
+
+def glyph_objects(words):
+    return [tuple(Glyph(None, 5.0 * index, char)
+                  for index, char in enumerate(word)) for word in words]
+
+
+def glyph_runs(words):
+    return [GlyphRun([None] * len(word),
+                     [5.0 * index for index in range(len(word))], word)
+            for word in words]
+
+
+def render_article(num_words):
+    with TemporaryDirectory() as out_dir, redirect_stdout(StringIO()), \
+            warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        paragraphs = [Paragraph(' '.join(WORDS[(index * 7 + paragraph)
+                                               % len(WORDS)]
+                                         for index in range(num_words // 4)))
+                      for paragraph in range(4)]
+        document = Article(DocumentTree(paragraphs))
+        document.render(Path(out_dir) / 'glyph_runs')
+
+
+def main(num_words=20000):
+    words = [WORDS[index % len(WORDS)] + str(index)
+             for index in range(num_words)]
+    print('{} words, held in memory'.format(num_words))
+    print('{:<24} {:>12} {:>12} {:>6}'.format('', 'peak (MB)', 'GC time (s)',
+                                              '# GC'))
+    for label, function in (('object per glyph', glyph_objects),
+                            ('glyph runs', glyph_runs)):
+        _, peak, gc_timer = measure(lambda: function(words))
+        print('{:<24} {:>12.2f} {:>12.4f} {:>6}'
+              .format(label, peak, gc_timer.duration, gc_timer.collections))
+    print()
+    print('rendering an article of {} words'.format(num_words))
+    start = time.perf_counter()
+    _, peak, gc_timer = measure(lambda: render_article(num_words))
+    print('time: {:.2f} s, peak memory: {:.1f} MB, GC time: {:.3f} s'
+          ' ({} collections)'.format(time.perf_counter() - start, peak,
+                                     gc_timer.duration, gc_timer.collections))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,88 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark the matching of hyphenation patterns against a list of words
+
+Compares the Aho-Corasick automaton of CompiledPatterns with looking up each
+substring of the word in the dictionary of patterns, as done previously. The
+words are read from the given text file (for example /usr/share/dict/words);
+by default, the words in rinohtype's documentation are used.
+
+    python benchmarks/hyphenation.py [word list] [hyph_*.dic file]
+
+"""
+
+
+import re
+import sys
+import time
+
+from pathlib import Path
+
+from rinoh import DATA_PATH
+from rinoh.hyphenator import CompiledPatterns, parse_dic_file
+
+
+DOC_PATH = Path(__file__).parent.parent / 'doc'
+EN_US = Path(DATA_PATH) / 'hyphen' / 'hyph_en_US.dic'
+
+
+def read_words(path=None):
+    paths = [path] if path else sorted(DOC_PATH.glob('**/*.rst'))
+    words = set()
+    for path in paths:
+        text = Path(path).read_text(encoding='utf-8')
+        words.update(word.lower() for word in re.findall(r'\w{3,}', text))
+    return ['.{}.'.format(word) for word in sorted(words)]
+
+
+def substring_priorities(patterns, maxlen, word):
+    res = [0] * (len(word) + 1)
+    for i in range(len(word) - 1):
+        for j in range(i + 1, min(i + maxlen, len(word)) + 1):
+            p = patterns.get(word[i:j])
+            if p:
+                offset, value = p
+                s = slice(i + offset, i + offset + len(value))
+                res[s] = map(max, value, res[s])
+    return res
+
+
+def time_words(function, words):
+    start = time.perf_counter()
+    for word in words:
+        function(word)
+    return time.perf_counter() - start
+
+
+def main(words_path=None, dic_path=EN_US):
+    words = read_words(words_path)
+    patterns = parse_dic_file(dic_path)
+    maxlen = max(map(len, patterns))
+    compiled = CompiledPatterns(CompiledPatterns.compile(patterns))
+    for word in words:
+        assert (compiled.priorities(word)
+                == substring_priorities(patterns, maxlen, word)), word
+    compiled = CompiledPatterns(CompiledPatterns.compile(patterns))
+    substring_time = time_words(lambda word: substring_priorities(patterns,
+                                                                  maxlen,
+                                                                  word),
+                                words)
+    cold_time = time_words(compiled.priorities, words)
+    warm_time = time_words(compiled.priorities, words)
+    print('{} words'.format(len(words)))
+    print('{:<24} {:>10} {:>8}'.format('', 'time (s)', 'speedup'))
+    for label, duration in (('substring lookups', substring_time),
+                            ('automaton (first pass)', cold_time),
+                            ('automaton', warm_time)):
+        print('{:<24} {:>10.4f} {:>7.1f}x'
+              .format(label, duration, substring_time / duration))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:3])
@@ -0,0 +1,129 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark breaking long paragraphs into lines
+
+Renders an article consisting of a number of long paragraphs and reports the
+time spent typesetting the paragraphs (ParagraphBase.render). The line breaker
+(LineBreaker) is compared to appending words to lines one by one, generating
+the words following the end of each line again from the start of the
+paragraph's text, as done previously (word_by_word_lines).
+
+    python benchmarks/line_breaking.py [number of words per paragraph]
+
+"""
+
+
+import sys
+import time
+import warnings
+
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rinoh.document import DocumentTree
+from rinoh.paragraph import Line, NewLineException, Paragraph, ParagraphBase
+from rinoh.templates import Article
+
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do'
+         ' eiusmod tempor incididunt ut labore et dolore magna aliqua ut enim'
+         ' ad minim veniam quis nostrud exercitation ullamco laboris nisi ut'
+         ' aliquip ex ea commodo consequat').split()
+
+
+def create_paragraphs(num_paragraphs, num_words):
+    return [Paragraph(' '.join(WORDS[(index * 7 + paragraph) % len(WORDS)]
+                               for index in range(num_words)))
+            for paragraph in range(num_paragraphs)]
+
+
+def word_by_word_lines(paragraph, state, container, line_width, indent_first,
+                       tab_stops, continued=False):
+    """ParagraphBase._lines as implemented before the introduction of
+    LineBreaker"""
+    line = Line(tab_stops, line_width, container, indent_first,
+                paragraph.significant_whitespace, continued=continued)
+    state.save()
+    wrapped = continued
+    while True:
+        try:
+            word = state.next_word(container)
+        except StopIteration:
+            break
+        try:
+            wrapped = not line.append_word(word)
+        except NewLineException:
+            if wrapped:
+                continue
+            line.append(word.glyphs_span)
+            line.parts.append(word)
+        else:
+            if not wrapped:
+                state.save()
+                continue
+            for first, second, is_last in word.hyphenate(container):
+                if line.append_word(first, force=is_last):
+                    state.prepend_word(second)
+                    break
+            else:
+                if not line:
+                    line.append_word(word, True)
+                else:
+                    state.restore()
+        yield line, not wrapped
+        line = Line(tab_stops, line_width, container,
+                    significant_whitespace=paragraph.significant_whitespace,
+                    continued=wrapped)
+    if line:
+        yield line, True
+
+
+def time_rendering(num_words, word_by_word=False):
+    render = ParagraphBase.render
+    lines = ParagraphBase._lines
+    render_time = 0
+
+    def timed_render(paragraph, *args, **kwargs):
+        nonlocal render_time
+        start = time.perf_counter()
+        try:
+            return render(paragraph, *args, **kwargs)
+        finally:
+            render_time += time.perf_counter() - start
+
+    ParagraphBase.render = timed_render
+    if word_by_word:
+        ParagraphBase._lines = word_by_word_lines
+    try:
+        with TemporaryDirectory() as out_dir, redirect_stdout(StringIO()), \
+                warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            paragraphs = create_paragraphs(4, num_words)
+            document = Article(DocumentTree(paragraphs))
+            document.render(Path(out_dir) / 'paragraphs')
+    finally:
+        ParagraphBase.render = render
+        ParagraphBase._lines = lines
+    return render_time
+
+
+def main(num_words=3000):
+    print('4 paragraphs of {} words'.format(num_words))
+    print('{:<32} {:>10} {:>8}'.format('', 'time (s)', 'speedup'))
+    word_by_word_time = time_rendering(num_words, word_by_word=True)
+    for label, duration in (('word by word', word_by_word_time),
+                            ('LineBreaker', time_rendering(num_words))):
+        print('{:<32} {:>10.4f} {:>7.1f}x'
+              .format(label, duration, word_by_word_time / duration))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,75 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark the preparation of PNG images for embedding in the PDF output
+
+Generates interlaced RGB and (interlaced and non-interlaced) RGBA PNG images of
+the given size and times reading them with and without the NumPy-accelerated
+code paths. Requires NumPy.
+
+    python benchmarks/png_decoding.py [width [height]]
+
+"""
+
+
+import sys
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rinoh.backend.pdf.xobject import png, purepng
+
+
+IMAGES = [('RGB interlaced', False, True),
+          ('RGBA', True, False),
+          ('RGBA interlaced', True, True)]
+
+
+def write_image(path, width, height, alpha, interlace):
+    planes = 4 if alpha else 3
+    rows = (bytearray((x * planes + y + plane) % 256
+                      for x in range(width) for plane in range(planes))
+            for y in range(height))
+    writer = purepng.Writer(width, height, alpha=alpha, interlace=interlace)
+    with open(path, 'wb') as file:
+        writer.write(file, rows)
+
+
+def read_image(path, numpy):
+    png.numpy = numpy
+    start = time.perf_counter()
+    xobject = png.PNGReader(path)
+    xobject.reset()
+    if 'SMask' in xobject:
+        xobject['SMask'].reset()
+    return time.perf_counter() - start
+
+
+def main(width, height):
+    numpy = png.numpy
+    if numpy is None:
+        raise SystemExit('This benchmark requires NumPy')
+    print('{:<16} {:>12} {:>12} {:>8}'.format('{}x{}'.format(width, height),
+                                              'purepng (s)', 'NumPy (s)',
+                                              'speedup'))
+    with TemporaryDirectory() as output_dir:
+        for label, alpha, interlace in IMAGES:
+            path = Path(output_dir) / (label.replace(' ', '_') + '.png')
+            write_image(path, width, height, alpha, interlace)
+            purepng_time = read_image(path, None)
+            numpy_time = read_image(path, numpy)
+            print('{:<16} {:>12.3f} {:>12.3f} {:>7.1f}x'
+                  .format(label, purepng_time, numpy_time,
+                          purepng_time / numpy_time))
+    png.numpy = numpy
+
+
+if __name__ == '__main__':
+    width, height = (int(arg) for arg in (sys.argv[1:] + ['1000', '1000'])[:2])
+    main(width, height)
@@ -0,0 +1,86 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark the memory used by a long table
+
+Compares a Table whose body is built up front with a StreamingTable that
+creates its rows as they are rendered. Reports the memory allocated for the
+table itself (before rendering) and the peak memory use while rendering, as
+traced by tracemalloc. The latter includes the rendered pages, which are kept
+in memory until the document is written.
+
+    python benchmarks/streaming_table.py [number of rows]
+
+"""
+
+
+import sys
+import time
+import tracemalloc
+import warnings
+
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rinoh.document import DocumentTree
+from rinoh.table import Table, StreamingTable, TableBody, TableHead, TableRow
+from rinoh.templates import Article
+
+
+def records(num_rows):
+    for index in range(num_rows):
+        yield ('record {}'.format(index), index * 7919 % 10007,
+               'lorem ipsum ' * (index % 4))
+
+
+def create_table(num_rows):
+    rows = [TableRow.from_values(record) for record in records(num_rows)]
+    return Table(TableBody(rows), head=create_head())
+
+
+def create_streaming_table(num_rows):
+    return StreamingTable(lambda: records(num_rows), head=create_head())
+
+
+def create_head():
+    return TableHead([TableRow.from_values(['name', 'number', 'text'])])
+
+
+def measure(create, num_rows):
+    tracemalloc.start()
+    try:
+        table = create(num_rows)
+        table_size, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        with TemporaryDirectory() as out_dir, redirect_stdout(StringIO()), \
+                warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            document = Article(DocumentTree([table]))
+            document.render(Path(out_dir) / 'table')
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return table_size, peak, duration
+
+
+def main(num_rows=1000):
+    print('{} rows'.format(num_rows))
+    print('{:<16} {:>12} {:>12} {:>10}'
+          .format('', 'table (MB)', 'peak (MB)', 'time (s)'))
+    for label, create in (('Table', create_table),
+                          ('StreamingTable', create_streaming_table)):
+        table_size, peak, duration = measure(create, num_rows)
+        print('{:<16} {:>12.1f} {:>12.1f} {:>10.1f}'
+              .format(label, table_size / 2**20, peak / 2**20, duration))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,116 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark matching document elements to the selectors of a style sheet
+
+Builds the Sphinx regression test projects to collect the elements styled
+while rendering them, then times matching these elements by walking the
+matchers of the style sheet chain (StyledMatcher.match) and using the style
+sheet's CompiledMatcher. Requires Sphinx. Projects using the document
+templates registered by the regression tests fail to build and are skipped.
+
+    python benchmarks/style_matching.py [test project name ...]
+
+"""
+
+
+import sys
+import time
+import warnings
+
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sphinx.application import Sphinx
+
+from rinoh.document import Document
+from rinoh.style import CompiledMatcher
+
+
+ROOTS_PATH = Path(__file__).parent.parent / 'tests_regression' / 'sphinx'
+
+
+def collect_styled(root_path):
+    """Render the Sphinx project and return the (document, styled) pairs
+    passed to Document.get_matches"""
+    styled_elements = {}
+    get_matches = Document.get_matches
+
+    def recording_get_matches(document, styled):
+        styled_elements.setdefault(id(styled), (document, styled))
+        return get_matches(document, styled)
+
+    Document.get_matches = recording_get_matches
+    try:
+        with TemporaryDirectory() as out_dir, redirect_stdout(StringIO()), \
+                warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            app = Sphinx(str(root_path), str(root_path), out_dir, out_dir,
+                         'rinoh', status=None, warning=StringIO())
+            app.build()
+    finally:
+        Document.get_matches = get_matches
+    return list(styled_elements.values())
+
+
+def walk_matchers(document, styled):
+    stylesheet = document.stylesheet
+    while stylesheet is not None:
+        yield from stylesheet.matcher.match(styled, stylesheet, document)
+        stylesheet = stylesheet.base
+
+
+def compiled_matcher(document, styled):
+    return document.stylesheet.compiled_matcher.match(styled, document)
+
+
+def time_matching(function, elements):
+    start = time.perf_counter()
+    for document, styled in elements:
+        for _ in function(document, styled):
+            pass
+    return time.perf_counter() - start
+
+
+def main(names):
+    roots = ([ROOTS_PATH / ('test-' + name) for name in names] if names
+             else sorted(ROOTS_PATH.glob('test-*')))
+    print('{:<26} {:>8} {:>10} {:>10} {:>8}'
+          .format('project', 'elements', 'walk (s)', 'compiled', 'speedup'))
+    for root_path in roots:
+        try:
+            elements = collect_styled(root_path)
+        except Exception as exception:
+            print('{:<26} failed to build: {}'.format(root_path.name,
+                                                      exception))
+            continue
+        for document, styled in elements:
+            walked = [(match.style_name, match.specificity)
+                      for match in walk_matchers(document, styled)]
+            compiled = [(match.style_name, match.specificity)
+                        for match in compiled_matcher(document, styled)]
+            assert sorted(walked) == sorted(compiled), styled
+        stylesheets = {id(document.stylesheet): document.stylesheet
+                       for document, _ in elements}
+        start = time.perf_counter()
+        for stylesheet in stylesheets.values():
+            CompiledMatcher(stylesheet)
+        compile_time = time.perf_counter() - start
+        walk_time = time_matching(walk_matchers, elements)
+        compiled_time = time_matching(compiled_matcher, elements)
+        print('{:<26} {:>8} {:>10.4f} {:>10.4f} {:>7.1f}x   '
+              '(compiling: {:.4f} s)'
+              .format(root_path.name, len(elements), walk_time,
+                      compiled_time, walk_time / compiled_time,
+                      compile_time))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
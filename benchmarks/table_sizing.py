@@ -0,0 +1,101 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Benchmark sizing the columns of a large automatic-width table
+
+Renders an article holding a table with automatic-width columns and reports
+the time spent sizing the columns (Table._size_columns). This is compared for
+measuring all cells each time the columns are sized (as done previously),
+measuring each cell only once (the content widths are stored in the
+document) and measuring only a sample of the rows (column_sizing_rows).
+
+    python benchmarks/table_sizing.py [number of rows]
+
+"""
+
+
+import sys
+import time
+import warnings
+
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rinoh.document import DocumentTree
+from rinoh.paragraph import Paragraph
+from rinoh.style import StyleSheet
+from rinoh.stylesheets import sphinx_article
+from rinoh.table import Table, TableBody, TableRow, TableCell
+from rinoh.templates import Article
+
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do'
+         ' eiusmod tempor incididunt ut labore et dolore magna aliqua').split()
+
+
+def create_table(num_rows):
+    def cell(row_index, column_index):
+        num_words = 1 + (row_index * 7 + column_index * 3) % 9
+        text = ' '.join(WORDS[(row_index + index) % len(WORDS)]
+                        for index in range(num_words))
+        return TableCell([Paragraph(text)])
+
+    rows = [TableRow([cell(row_index, column_index)
+                      for column_index in range(4)])
+            for row_index in range(num_rows)]
+    return Table(TableBody(rows))
+
+
+def time_rendering(num_rows, stylesheet=sphinx_article, measure_once=True):
+    size_columns = Table._size_columns
+    sizing_time = 0
+
+    def timed_size_columns(table, container):
+        nonlocal sizing_time
+        if not measure_once:
+            container.document.content_widths.clear()
+        start = time.perf_counter()
+        try:
+            return size_columns(table, container)
+        finally:
+            sizing_time += time.perf_counter() - start
+
+    configuration = Article.Configuration('benchmark', stylesheet=stylesheet)
+    Table._size_columns = timed_size_columns
+    try:
+        with TemporaryDirectory() as out_dir, redirect_stdout(StringIO()), \
+                warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            document = Article(DocumentTree([create_table(num_rows)]),
+                               configuration=configuration)
+            document.render(Path(out_dir) / 'table')
+    finally:
+        Table._size_columns = size_columns
+    return sizing_time
+
+
+def main(num_rows=2000):
+    sampled = StyleSheet('sampled', base=sphinx_article)
+    sampled('table', column_sizing_rows=200)
+    print('{} rows'.format(num_rows))
+    print('{:<32} {:>10} {:>8}'.format('', 'time (s)', 'speedup'))
+    measure_always = time_rendering(num_rows, measure_once=False)
+    for label, duration in (('measure cells for each sizing',
+                             measure_always),
+                            ('measure cells once',
+                             time_rendering(num_rows)),
+                            ('measure 200 sampled rows',
+                             time_rendering(num_rows, sampled))):
+        print('{:<32} {:>10.4f} {:>7.1f}x'
+              .format(label, duration, measure_always / duration))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
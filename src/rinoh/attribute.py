@@ -6,20 +6,24 @@
 # Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
 
 
+import hashlib
+import os
+import pickle
 import re
 
 from collections import OrderedDict
 from configparser import ConfigParser
-from io import StringIO
+from io import BytesIO, StringIO
 from itertools import chain
 from pathlib import Path
 from token import NUMBER, ENDMARKER, MINUS, PLUS, NAME, NEWLINE
 from tokenize import generate_tokens
 from warnings import warn
 
+from . import __version__
 from .util import (NamedDescriptor, WithNamedDescriptors,
                    NotImplementedAttribute, class_property, PeekIterator,
-                   cached)
+                   cached, atomic_write, cache_dir)
 
 
 __all__ = ['AttributeType', 'AcceptNoneAttributeType', 'OptionSet',
@@ -475,30 +479,126 @@ class RuleSet(OrderedDict, Source):
         return value
 
 
+# directory holding the parsed rule set files, named after the hash of the
+# rule set file's path
+CACHE_PATH = cache_dir('rulesets')
+
+
 class RuleSetFile(RuleSet):
+    """Base class for rule sets loaded from an INI file
+
+    The sections read from the file and the values returned by the methods
+    listed in :attr:`persistent_caches` are stored in a cache file in
+    :data:`CACHE_PATH`. When the rule set file is loaded again and it hasn't
+    been modified since (and the rinohtype version is the same), the file
+    does not need to be parsed again. Values that cannot be pickled or that do
+    not compare equal after unpickling are simply parsed again.
+
+    """
+
+    #: names of the :func:`.cached` methods whose return values are stored in
+    #: the cache file
+    persistent_caches = ('_attribute_from_string', )
+
+    CACHE_MAGIC = b'rinohRSC'
+    CACHE_VERSION = 1
+
     def __init__(self, filename, base=None, source=None, **kwargs):
         self.filename = self._absolute_path(filename, source)
-        config = ConfigParser(default_section=None, delimiters=('=',),
-                              interpolation=None)
-        with self.filename.open() as file:
-            config.read_file(file)
-        options = dict(config[self.main_section]
-                       if config.has_section(self.main_section) else {})
+        cache_key = self._cache_key()
+        sections = self._load_cached(cache_key)
+        if sections is None:
+            sections = self._read_sections()
+        options = dict(sections.get(self.main_section, ()))
         name = options.pop('name', filename)
         base = options.pop('base', base)
         options.update(kwargs)    # optionally override options
         super().__init__(name, base=base, source=source, **options)
-        if config.has_section('VARIABLES'):
-            for name, value in config.items('VARIABLES'):
-                self.variables[name] = value
-        for section_name, section_body in config.items():
-            if section_name in (None, self.main_section, 'VARIABLES'):
+        for name, value in sections.get('VARIABLES', ()):
+            self.variables[name] = value
+        for section_name, section_items in sections.items():
+            if section_name in (self.main_section, 'VARIABLES'):
                 continue
             if ':' in section_name:
                 name, classifier = (s.strip() for s in section_name.split(':'))
             else:
                 name, classifier = section_name.strip(), None
-            self.process_section(name, classifier, section_body.items())
+            self.process_section(name, classifier, section_items)
+        if not self._cache_loaded:
+            self._store_cached(cache_key, sections)
+
+    def _read_sections(self):
+        config = ConfigParser(default_section=None, delimiters=('=',),
+                              interpolation=None)
+        with self.filename.open() as file:
+            config.read_file(file)
+        return OrderedDict((section_name, list(section_body.items()))
+                           for section_name, section_body in config.items()
+                           if section_name is not None)
+
+    def _cache_key(self):
+        path = str(self.filename.resolve())
+        try:
+            stat = os.stat(path)
+        except OSError:     # reported when trying to read the file
+            return None
+        return path, stat.st_mtime_ns, stat.st_size, __version__
+
+    @staticmethod
+    def _cache_file(cache_key):
+        digest = hashlib.sha256(cache_key[0].encode('utf-8')).hexdigest()
+        return CACHE_PATH / (digest + '.rsc')
+
+    def _load_cached(self, cache_key):
+        """Return the sections stored in the cache file for this rule set
+        file, also restoring the persistent caches
+
+        Returns ``None`` if there is no valid cache file."""
+        self._cache_loaded = False
+        if cache_key is None:
+            return None
+        try:
+            with open(self._cache_file(cache_key), 'rb') as file:
+                if file.read(len(self.CACHE_MAGIC)) != self.CACHE_MAGIC:
+                    return None
+                version, key, sections, caches = pickle.load(file)
+        except Exception:   # missing, unreadable or corrupt cache file
+            return None
+        if version != self.CACHE_VERSION or key != cache_key:
+            return None
+        for method_name in self.persistent_caches:
+            cache = {}
+            for entry in caches.get(method_name, ()):
+                try:
+                    args, value = _RuleSetUnpickler.loads(entry, self)
+                except Exception:   # e.g. the value's class was removed
+                    continue
+                cache[args] = value
+            setattr(self, '_cached_' + method_name, cache)
+        self._cache_loaded = True
+        return sections
+
+    def _store_cached(self, cache_key, sections):
+        if cache_key is None:
+            return
+        caches = {}
+        for method_name in self.persistent_caches:
+            entries = caches[method_name] = []
+            cache = getattr(self, '_cached_' + method_name, {})
+            for args_value in cache.items():
+                try:
+                    entry = _RuleSetPickler.dumps(args_value, self)
+                    if _RuleSetUnpickler.loads(entry, self) != args_value:
+                        continue
+                except Exception:   # not picklable; will be parsed again
+                    continue
+                entries.append(entry)
+        data = pickle.dumps((self.CACHE_VERSION, cache_key, sections, caches),
+                            pickle.HIGHEST_PROTOCOL)
+        try:
+            atomic_write(self._cache_file(cache_key), self.CACHE_MAGIC + data)
+        except OSError:         # the cache directory is not writable
+            pass
 
     @classmethod
     def _absolute_path(cls, filename, source):
@@ -522,6 +622,48 @@ class RuleSetFile(RuleSet):
         raise NotImplementedError
 
 
+class _RuleSetPickler(pickle.Pickler):
+    """Pickles values parsed by `ruleset`, storing references to the rule set
+    itself instead of its contents
+
+    Shared resources such as typefaces and other rule sets cannot be
+    pickled."""
+
+    def __init__(self, file, ruleset):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.ruleset = ruleset
+
+    @classmethod
+    def dumps(cls, obj, ruleset):
+        file = BytesIO()
+        cls(file, ruleset).dump(obj)
+        return file.getvalue()
+
+    def persistent_id(self, obj):
+        from .resource import Resource
+
+        if obj is self.ruleset:
+            return 'ruleset'
+        if isinstance(obj, (RuleSet, Resource)):
+            raise pickle.PicklingError('{!r} is a shared resource'.format(obj))
+        return None
+
+
+class _RuleSetUnpickler(pickle.Unpickler):
+    def __init__(self, file, ruleset):
+        super().__init__(file)
+        self.ruleset = ruleset
+
+    @classmethod
+    def loads(cls, data, ruleset):
+        return cls(BytesIO(data), ruleset).load()
+
+    def persistent_load(self, persistent_id):
+        if persistent_id != 'ruleset':
+            raise pickle.UnpicklingError('unsupported persistent object')
+        return self.ruleset
+
+
 class Bool(AttributeType):
     """Expresses a binary choice"""
 
@@ -8,8 +8,10 @@
 
 import math
 
+from hashlib import md5
 from io import BytesIO
 from contextlib import contextmanager
+from operator import attrgetter
 
 try:
     from PIL import Image as PILImage
@@ -17,6 +19,7 @@ except ImportError:
     PILImage = None
 
 from . import cos
+from .content import ContentStream, literal_string, hex_string
 from .reader import PDFReader, PDFPageReader
 from .filter import FlateDecode
 from .xobject.jpeg import JPEGReader
@@ -24,18 +27,24 @@ from .xobject.png import PNGReader
 
 from ...font.type1 import Type1Font
 from ...font.opentype import OpenTypeFont
+from ...font.opentype.subset import subset_font
 from ...number import NumberFormatBase
 
 
 class Document(object):
     extension = '.pdf'
 
+    subset_fonts = True     # embed only the glyphs used (OpenType fonts)
+
     def __init__(self, creator,
                  title=None, author=None, subject=None, keywords=None):
         self.cos_document = cos.Document(creator, title, author, subject,
                                          keywords)
         self.pages = []
         self.fonts = {}
+        self.used_glyphs = {}   # OpenType font -> set of glyph IDs
+        self.image_numbers = {}
+        self._imported_fonts = {}   # (font type, arguments) -> font
         self._font_number = 0
         self._image_number = 0
 
@@ -47,6 +56,17 @@ class Document(object):
         self._image_number += 1
         return self._image_number
 
+    def get_image_number(self, image):
+        """Return the number that identifies `image` in the page resources
+
+        All placements of an image share a single number (and XObject)."""
+        try:
+            image_number = self.image_numbers[image]
+        except KeyError:
+            image_number = self.get_unique_image_number()
+            self.image_numbers[image] = image_number
+        return image_number
+
     def get_metadata(self, field):
         return str(self.cos_document.info[field.capitalize()])
 
@@ -66,29 +86,121 @@ class Document(object):
                 if font.encoding_scheme == 'AdobeStandardEncoding':
                     symbolic = False
             elif isinstance(font, OpenTypeFont):
-                ff_cls = (cos.OpenTypeFontFile if 'CFF' in font
-                          else cos.TrueTypeFontFile)
-                with open(font.filename, 'rb') as font_data:
-                    font_file = ff_cls(font_data.read(), filter=FlateDecode())
+                font_file = None    # embedded on writing, see _embed_font
             # TODO: properly determine flags
             font_desc = cos.FontDescriptor(font, symbolic, font_file)
             if isinstance(font, Type1Font):
                 font_rsc = cos.Type1Font(font, font_desc)
             elif isinstance(font, OpenTypeFont):
                 cid_system_info = cos.CIDSystemInfo('Identity', 'Adobe', 0)
-                widths = font['hmtx']['advanceWidth']
-                scale = 1000 / font.units_per_em
-                w = cos.Array([cos.Integer(0),
-                               cos.Array(cos.Integer(round(w * scale)) for w in widths)])
                 cf_cls = cos.CIDFontType0 if 'CFF' in font else cos.CIDFontType2
-                cid_font = cf_cls(font.name, cid_system_info, font_desc, w=w)
-                mapping = font['cmap'][font._encoding].mapping
-                to_unicode = cos.ToUnicode(mapping, filter=FlateDecode())
-                font_rsc = cos.CompositeFont(cid_font, 'Identity-H', to_unicode)
+                cid_font = cf_cls(font.name, cid_system_info, font_desc)
+                font_rsc = cos.CompositeFont(cid_font, 'Identity-H')
+                self.used_glyphs[font] = set()
             font_number = self.get_unique_font_number()
             self.fonts[font] = font_number, font_rsc
         return font_number, font_rsc
 
+    def _embed_font(self, font, font_rsc):
+        """Embed the OpenType `font` and set the glyph widths and the
+        ToUnicode mapping for the glyphs used in the document
+
+        If :attr:`subset_fonts` is set, the embedded font only contains the
+        outlines for the used glyphs and its name is prefixed with a subset
+        tag."""
+        cid_font = font_rsc['DescendantFonts'][0]
+        font_desc = cid_font['FontDescriptor']
+        if self.subset_fonts:
+            glyph_ids = sorted(self.used_glyphs[font] | {0})
+            font_data = subset_font(font, glyph_ids)
+            digest = md5((font.name + repr(glyph_ids)).encode('utf-8')).digest()
+            tag = ''.join(chr(ord('A') + byte % 26) for byte in digest[:6])
+            name = '{}+{}'.format(tag, font.name)
+            cid_font['BaseFont'] = cos.Name(name)
+            font_rsc['BaseFont'] = cid_font.composite_font_name('Identity-H')
+            font_desc['FontName'] = cos.Name(name)
+        else:
+            glyph_ids = range(font['maxp']['numGlyphs'])
+            with open(font.filename, 'rb') as file:
+                font_data = file.read()
+        ff_cls = (cos.OpenTypeFontFile if 'CFF' in font
+                  else cos.TrueTypeFontFile)
+        font_desc[ff_cls.key] = ff_cls(font_data, filter=FlateDecode())
+        widths = font['hmtx']['advanceWidth']
+        scale = 1000 / font.units_per_em
+        w = cos.Array()
+        run_start = None
+        for glyph_id in glyph_ids:
+            if glyph_id - 1 != run_start:
+                w.append(cos.Integer(glyph_id))
+                run_widths = cos.Array()
+                w.append(run_widths)
+            run_widths.append(cos.Integer(round(widths[glyph_id] * scale)))
+            run_start = glyph_id
+        cid_font['W'] = w
+        used_glyph_ids = set(glyph_ids)
+        mapping = {code: glyph_id for code, glyph_id
+                   in font['cmap'][font._encoding].mapping.items()
+                   if glyph_id in used_glyph_ids}
+        font_rsc['ToUnicode'] = cos.ToUnicode(mapping, filter=FlateDecode())
+
+    def start_output(self, file):
+        """Write finished pages to `file` early to limit memory usage
+
+        After calling this method, :meth:`flush_page` writes a page's content
+        stream and the other objects it references to `file`. Objects that
+        can still change (fonts, the page tree, outlines, named destinations,
+        page labels) are held back until :meth:`write`, which needs to be
+        passed the same `file`. `file` needs to be seekable, since the output
+        is truncated when flushed pages are discarded.
+
+        """
+        self.cos_document.start_output(file)
+
+    def flush_page(self, page):
+        """Write `page` to the output file (see :meth:`start_output`) and
+        free the memory held by its content stream"""
+        cos_document = self.cos_document
+        page.output_position = cos_document.output_position
+        contents = self._create_contents(page)
+        deferred = [cos_document.catalog['Pages']]
+        deferred.extend(font_rsc for _, font_rsc in self.fonts.values())
+        cos_document.write_objects(page.cos_page, deferred)
+        contents.discard_data()
+        page.canvas.close()
+
+    def _create_contents(self, page):
+        contents = cos.Stream(filter=FlateDecode())
+        contents.write(page.canvas.getvalue())
+        page.cos_page['Contents'] = contents
+        return contents
+
+    def discard_pages(self, number_of_pages):
+        """Discard all pages following the first `number_of_pages` pages
+
+        Named destinations that point to the discarded pages are removed too,
+        as is the output written for flushed pages (see :meth:`flush_page`).
+
+        Returns:
+            list[Page]: the discarded pages
+
+        """
+        discarded = self.pages[number_of_pages:]
+        flushed = [page.output_position for page in discarded
+                   if page.output_position is not None]
+        if flushed:
+            self.cos_document.truncate_output(min(flushed))
+        del self.pages[number_of_pages:]
+        cos_pages = self.cos_document.catalog['Pages']
+        del cos_pages['Kids'][number_of_pages:]
+        cos_pages['Count'] = cos.Integer(number_of_pages)
+        discarded_cos_pages = set(id(page.cos_page) for page in discarded)
+        dests = self.cos_document.dests
+        for key, dest in list(dests.items()):
+            if id(dest[0]) in discarded_cos_pages:
+                del dests[key]
+        return discarded
+
     def create_outlines(self, sections_tree):
         outlines = self.cos_document.catalog['Outlines'] = cos.Outlines()
         self._create_outline_level(sections_tree, outlines, True)
@@ -116,24 +228,123 @@ class Document(object):
         parent['Count'] = cos.Integer(count if top_level else - count)
 
     def write(self, file):
+        for font, (_, font_rsc) in self.fonts.items():
+            if isinstance(font, OpenTypeFont):
+                self._embed_font(font, font_rsc)
         page_labels = self.cos_document.catalog['PageLabels']['Nums']
         for index, page in enumerate(self.pages):
-            contents = cos.Stream(filter=FlateDecode())
-            contents.write(page.canvas.getvalue())
-            page.cos_page['Contents'] = contents
-            rinoh_page = page.rinoh_page
-            number_format = (rinoh_page.document_part
-                             .get_config_value('page_number_format',
-                                               rinoh_page.document))
-            if number_format != 'continue':
+            if page.output_position is None:
+                self._create_contents(page)
+            if page.restarts_numbering:
                 pdf_number_format = PAGE_NUMBER_FORMATS[page.number_format]
-                prefix = rinoh_page.page_number_prefix
                 page_labels.append(cos.Integer(index))
                 page_labels.append(cos.PageLabel(pdf_number_format,
-                                                 label_prefix=prefix,
+                                                 label_prefix=page.number_prefix,
                                                  start=page.number))
         self.cos_document.write(file)
 
+    def export_pages(self):
+        """Return the placed pages in a form that can be pickled
+
+        This allows pages to be rendered in another process and then added to
+        this document using :meth:`import_pages`. Fonts are exported as the
+        arguments they were created with and images as their filename, if
+        they were loaded from a file.
+
+        """
+        fonts = {}
+        for font, (font_number, font_rsc) in self.fonts.items():
+            differences = getattr(font_rsc, 'differences', None)
+            used_glyphs = self.used_glyphs.get(font)
+            fonts[id(font_rsc)] = (font_number, type(font), font.arguments,
+                                   differences, used_glyphs)
+        images = {}
+        pages = []
+        for page in self.pages:
+            canvas = page.canvas
+            page_images = {}
+            for image_number, image in canvas.images.items():
+                page_images[image_number] = image.filename or image
+            pages.append(dict(width=float(page.width),
+                              height=float(page.height),
+                              rotate=int(page.cos_page.get('Rotate', 0)),
+                              number=page.number,
+                              number_format=page.number_format,
+                              restarts_numbering=page.restarts_numbering,
+                              number_prefix=page.number_prefix,
+                              contents=canvas.getvalue(),
+                              fonts={font_name: fonts[id(font_rsc)][0]
+                                     for font_name, font_rsc
+                                     in canvas.fonts.items()},
+                              images=page_images,
+                              annotations=canvas.annotations))
+        return dict(fonts=list(fonts.values()), pages=pages)
+
+    def import_pages(self, exported, get_image=None):
+        """Append the pages exported by :meth:`export_pages`
+
+        Args:
+            exported: the return value of :meth:`export_pages`, called on a
+                document in another process
+            get_image (callable): returns the :class:`Image` for a filename;
+                creates a new :class:`Image` if not given
+
+        Returns:
+            list[ImportedPage]: the imported pages
+
+        """
+        get_image = get_image or Image
+        font_resources = {}
+        for (font_number, font_type, arguments, differences,
+             used_glyphs) in exported['fonts']:
+            font = self._imported_font(font_type, arguments)
+            _, font_rsc = self.register_font(font)
+            if used_glyphs:
+                self.used_glyphs[font] |= used_glyphs
+            if differences:
+                font_rsc = self._merge_differences(font_rsc, differences)
+            font_resources[font_number] = font_rsc
+        pages = []
+        for page_data in exported['pages']:
+            images = {}
+            for image_number, image in page_data['images'].items():
+                if not isinstance(image, Image):
+                    image = get_image(image)
+                    self.get_image_number(image)    # register with document
+                images[image_number] = image
+            fonts = {font_name: font_resources[font_number]
+                     for font_name, font_number in page_data['fonts'].items()}
+            pages.append(ImportedPage(self, page_data, fonts, images))
+        return pages
+
+    def _imported_font(self, font_type, arguments):
+        """Return the font created with `arguments`, reusing the font that
+        was imported before"""
+        key = font_type, repr(arguments)
+        try:
+            return self._imported_fonts[key]
+        except KeyError:
+            pass
+        args, kwargs = arguments
+        font = self._imported_fonts[key] = font_type(*args, **kwargs)
+        return font
+
+    def _merge_differences(self, font_rsc, differences):
+        """Add the encoding `differences` of an imported Type 1 font to
+        `font_rsc`
+
+        If the codes conflict with the codes assigned to other glyphs before,
+        a new font resource (sharing the font descriptor) is returned."""
+        used_codes = {code: name for name, code
+                      in font_rsc.differences.items()}
+        if any(font_rsc.differences.get(name, code) != code
+               or used_codes.get(code, name) != name
+               for name, code in differences.items()):
+            font_rsc = cos.Type1Font(font_rsc.font,
+                                     font_rsc['FontDescriptor'])
+        font_rsc.differences.update(differences)
+        return font_rsc
+
 
 PAGE_NUMBER_FORMATS = {NumberFormatBase.NUMBER: cos.DECIMAL_ARABIC,
                        NumberFormatBase.LOWERCASE_CHARACTER: cos.LOWERCASE_LETTERS,
@@ -158,15 +369,65 @@ class Page(object):
         self.number = rinoh_page.number
         self.number_format = rinoh_page.number_format
         self.canvas = PageCanvas(self)
+        self.output_position = None     # set when flushed to the output file
         self.backend_document.pages.append(self)
 
+    @property
+    def restarts_numbering(self):
+        """Whether this page's document part restarts the page numbering
+
+        If so, a page label is created for the page."""
+        rinoh_page = self.rinoh_page
+        number_format = (rinoh_page.document_part
+                         .get_config_value('page_number_format',
+                                           rinoh_page.document))
+        return number_format != 'continue'
+
+    @property
+    def number_prefix(self):
+        return self.rinoh_page.page_number_prefix
+
     def add_font_resource(self, font_name, font_rsc):
         page_rsc = self.cos_page['Resources']
         fonts_dict = page_rsc.setdefault('Font', cos.Dictionary())
         fonts_dict[font_name] = font_rsc
 
 
-class Canvas(BytesIO):
+class ImportedPage(Page):
+    """A page rendered by another backend document
+
+    See :meth:`Document.export_pages` and :meth:`Document.import_pages`.
+
+    """
+
+    rinoh_page = None
+    restarts_numbering = None   # set from the exported page data
+    number_prefix = None
+
+    def __init__(self, backend_document, page_data, fonts, images):
+        self.backend_document = backend_document
+        cos_pages = backend_document.cos_document.catalog['Pages']
+        self.cos_page = cos_pages.new_page(page_data['width'],
+                                           page_data['height'],
+                                           page_data['rotate'])
+        self.width = page_data['width']
+        self.height = page_data['height']
+        self.number = page_data['number']
+        self.number_format = page_data['number_format']
+        self.restarts_numbering = page_data['restarts_numbering']
+        self.number_prefix = page_data['number_prefix']
+        self.canvas = canvas = PageCanvas(self)
+        canvas.clear()      # the contents include the initial translation
+        canvas.write(page_data['contents'])
+        canvas.fonts.update(fonts)
+        canvas.images.update(images)
+        canvas.annotations.extend(page_data['annotations'])
+        canvas.place_annotations()
+        self.output_position = None
+        self.backend_document.pages.append(self)
+
+
+class Canvas(ContentStream):
     def __init__(self, clip=False):
         super().__init__()
         self.fonts = {}
@@ -186,40 +447,36 @@ class Canvas(BytesIO):
         parent_canvas.images.update(self.images)
         parent_canvas.annotations.extend(translated_annotations)
 
-    def print(self, string):
-        self.write(string.encode('ascii') + b'\n')
-
     @contextmanager
     def save_state(self):
-        self.print('q')
+        self.operator(b'q')
         yield
-        self.print('Q')
+        self.operator(b'Q')
 
     def translate(self, x, y):
-        self.print('1 0 0 1 {:f} {:f} cm'.format(x, - y))
+        self.operator(b'cm', 1, 0, 0, 1, x, - y)
 
     def rotate(self, degrees):
         rad = math.radians(degrees)
         sine, cosine = math.sin(rad), math.cos(rad)
-        self.print('{cos:f} {sin:f} {neg_sin:f} {cos:f} 0 0 cm'
-                   .format(cos=cosine, sin=sine, neg_sin=-sine))
+        self.operator(b'cm', cosine, sine, - sine, cosine, 0, 0)
 
     def scale(self, x, y=None):
         if y is None:
             y = x
-        self.print('{:f} 0 0 {:f} 0 0 cm'.format(x, y))
+        self.operator(b'cm', x, 0, 0, y, 0, 0)
 
     def move_to(self, x, y):
-        self.print('{:f} {:f} m'.format(x, y))
+        self.operator(b'm', x, y)
 
     def line_to(self, x, y):
-        self.print('{:f} {:f} l'.format(x, y))
+        self.operator(b'l', x, y)
 
     def new_path(self):
         pass
 
     def close_path(self):
-        self.print('h')
+        self.operator(b'h')
 
     def line_path(self, points):
         self.new_path()
@@ -228,35 +485,35 @@ class Canvas(BytesIO):
             self.line_to(*point)
 
     def line_width(self, width):
-        self.print('{0} w'.format(float(width)))
+        self.operator(b'w', float(width))
 
     def stroke_color(self, color):
         r, g, b, a = color.rgba
-        self.print('{0} {1} {2} RG'.format(r, g, b))
+        self.operator(b'RG', r, g, b)
 
     def fill_color(self, color):
         r, g, b, a = color.rgba
-        self.print('{0} {1} {2} rg'.format(r, g, b))
+        self.operator(b'rg', r, g, b)
 
     def stroke(self, line_width=None, color=None):
         if color:
             self.stroke_color(color)
         if line_width:
             self.line_width(line_width)
-        self.print('S')
+        self.operator(b'S')
 
     def fill(self, color=None):
         with self.save_state():
             if color:
                 self.fill_color(color)
-                self.print('f')
+                self.operator(b'f')
 
     def stroke_and_fill(self, stroke_width, stroke_color, fill_color):
         with self.save_state():
             self.line_width(stroke_width)
             self.stroke_color(stroke_color)
             self.fill_color(fill_color)
-            self.print('B')
+            self.operator(b'B')
 
     def register_font(self, document, font):
         font_number, font_rsc = document.backend_document.register_font(font)
@@ -264,43 +521,50 @@ class Canvas(BytesIO):
         self.fonts.setdefault(font_name, font_rsc)
         return font_name, font_rsc
 
-    def show_glyphs(self, left, cursor, span, glyphs, container):
+    def show_glyphs(self, left, cursor, span, glyphs_spans, container):
+        """Show the glyphs held by `glyphs_spans` (list of
+        :class:`paragraph.GlyphsSpan`), set in the style of `span`, starting at
+        (`left`, `cursor`); returns the total width of the glyphs"""
         font = span.font(container)
         size = span.height(container)
         color = span.get_style('font_color', container)
         font_name, font_rsc = self.register_font(container.document, font)
-        string = ''
-        current_string = ''
+        default_scale = 1000 / font.units_per_em
+        adjusted_scale = 1000 / size    # w kerning & character spacing
+        if font.encoding:
+            glyph_code = font_rsc.get_code
+            to_string, hexadecimal = literal_string, False
+        else:
+            backend_document = container.document.backend_document
+            used_glyphs = backend_document.used_glyphs[font]
+            glyph_code = attrgetter('code')
+            to_string, hexadecimal = hex_string, True
+        segments = []
+        codes = []
         total_width = 0
-        for glyph in glyphs:
-            glyph_metrics, width = glyph.metrics, glyph.width
-            total_width += width
-            default_advance = 1000 * glyph_metrics.width / font.units_per_em
-            adjusted_advance = 1000 * width / size  # w kerning & char spacing
-            adjust = default_advance - adjusted_advance
-            if font.encoding:
-                code = font_rsc.get_code(glyph_metrics)
-                char = CODE_TO_CHAR[code]
-            else:
-                code = glyph_metrics.code
-                high, low = code >> 8, code & 0xFF
-                char = CODE_TO_CHAR[high] + CODE_TO_CHAR[low]
-            if abs(adjust) > 1e-3:
-                adjust_str = '{:.3f}'.format(adjust).rstrip('0').rstrip('.')
-                string += '({}{}) {} '.format(current_string, char, adjust_str)
-                current_string = ''
-            else:
-                current_string += char
-        if current_string:
-            string += '({})'.format(current_string)
+        for glyphs_span in glyphs_spans:
+            for glyph_metrics, width in glyphs_span.glyphs():
+                total_width += width
+                adjust = (default_scale * glyph_metrics.width
+                          - adjusted_scale * width)
+                codes.append(glyph_code(glyph_metrics))
+                if abs(adjust) > 1e-3:
+                    segments.append((to_string(codes), hexadecimal, adjust))
+                    if hexadecimal:
+                        used_glyphs.update(codes)
+                    codes = []
+        if codes:
+            segments.append((to_string(codes), hexadecimal, None))
+            if hexadecimal:
+                used_glyphs.update(codes)
         with self.save_state():
-            self.print('BT')
-            self.print('/{} {} Tf'.format(font_name, size))
+            self.operator(b'BT')
+            self.operator(b'Tf', b'/' + font_name.encode('ascii'), size)
             self.fill_color(color)
             y_offset = span.y_offset(container)
-            self.print('{:f} {:f} Td'.format(left, - (cursor - y_offset)))
-            self.print('[{}] TJ'.format(string))
-            self.print('ET')
+            self.operator(b'Td', left, - (cursor - y_offset))
+            self.show_text(segments)
+            self.operator(b'ET')
         return total_width
 
     def annotate(self, annotation, left, top, width, height):
@@ -309,7 +573,7 @@ class Canvas(BytesIO):
 
     def place_image(self, image, left, top, document,
                     scale_width=1, scale_height=1, rotate=0):
-        image_number = document.backend_document.get_unique_image_number()
+        image_number = document.backend_document.get_image_number(image)
         self.images[image_number] = image
         rad = math.radians(rotate)
         sine, cosine = abs(math.sin(rad)), abs(math.cos(rad))
@@ -326,7 +590,7 @@ class Canvas(BytesIO):
             self.scale(scale_width, scale_height)
             if image.xobject.subtype == 'Image':
                 self.scale(image.width, image.height)
-            self.print('/Im{} Do'.format(image_number))
+            self.operator(b'Do', b'/Im%d' % image_number)
         return scaled_width, scaled_height
 
 
@@ -399,6 +663,7 @@ class Image(object):
             file_position = filename_or_file.tell()
         except AttributeError:
             file_position = None
+        self.filename = filename_or_file if file_position is None else None
         for Reader in (PDFPageReader, PNGReader, JPEGReader):
             try:
                 self.xobject = Reader(filename_or_file)
@@ -424,6 +689,15 @@ class Image(object):
     def dpi(self):
         return self.xobject.dpi
 
+    @property
+    def data_size(self):
+        """The number of bytes of encoded image data (the XObject stream
+        data, as embedded in the PDF file) held in memory"""
+        size = len(self.xobject.getvalue())
+        if 'SMask' in self.xobject:
+            size += len(self.xobject['SMask'].getvalue())
+        return size
+
     def _convert_to_png(self, filename_or_file):
         if PILImage is None:
             raise ModuleNotFoundError('The Pillow package is required to '
@@ -437,20 +711,3 @@ class Image(object):
         input_image.save(png_image, 'PNG', **metadata)
         png_image.seek(0)
         return png_image
-
-
-CODE_TO_CHAR = {}
-
-
-def _code_to_char(code):
-    if code < 32 or code > 127:
-        char = r'\{:03o}'.format(code)
-    else:
-        char = chr(code)
-        if char in r'\()':
-            char = '\\' + char
-    return char
-
-
-for code in range(256):
-    CODE_TO_CHAR[code] = _code_to_char(code)
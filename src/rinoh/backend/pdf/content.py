@@ -0,0 +1,133 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Building PDF content streams
+
+:class:`ContentStream` writes content stream operators and their operands
+straight into a bytearray, without going through intermediate strings.
+
+"""
+
+
+import sys
+
+from array import array
+from binascii import hexlify
+
+
+__all__ = ['ContentStream', 'format_number', 'literal_string', 'hex_string']
+
+
+def _escape_code(code):
+    if code < 32 or code > 127:
+        return b'\\%03o' % code
+    char = bytes([code])
+    return b'\\' + char if char in b'\\()' else char
+
+
+ESCAPED_CODES = tuple(_escape_code(code) for code in range(256))
+"""The representation of each byte value in a PDF literal string"""
+
+
+def format_number(value, precision):
+    """Format `value` as a PDF number with at most `precision` decimals
+
+    Trailing zeros (and the decimal point) are dropped, and negative zero is
+    written as zero."""
+    string = b'%.*f' % (precision, value)
+    if b'.' in string:
+        string = string.rstrip(b'0').rstrip(b'.')
+    return b'0' if string == b'-0' else string
+
+
+def literal_string(codes):
+    """Return the PDF literal string for the single-byte character `codes`,
+    excluding the enclosing parentheses"""
+    return b''.join([ESCAPED_CODES[code] for code in codes])
+
+
+def hex_string(codes):
+    """Return the PDF hexadecimal string for the two-byte character `codes`
+    (glyph IDs/CIDs), excluding the enclosing angle brackets"""
+    codes = array('H', codes)
+    if sys.byteorder == 'little':
+        codes.byteswap()
+    return hexlify(codes.tobytes())
+
+
+class ContentStream(object):
+    """A PDF content stream under construction
+
+    The operators are appended to a bytearray. The operands are formatted
+    with at most :attr:`precision` decimals (trailing zeros are omitted); the
+    kerning adjustments in text arrays (:meth:`show_text`) use
+    :attr:`adjustment_precision` decimals.
+
+    """
+
+    #: the number of decimals for coordinates and other operands
+    precision = 6
+    #: the number of decimals for the glyph position adjustments in TJ arrays
+    adjustment_precision = 3
+
+    def __init__(self):
+        self._data = bytearray()
+
+    def write(self, data):
+        self._data += data
+        return len(data)
+
+    def getvalue(self):
+        return bytes(self._data)
+
+    def clear(self):
+        del self._data[:]
+
+    def close(self):
+        """Free the memory held by this content stream"""
+        self._data = None
+
+    def print(self, string):
+        self._data += string.encode('ascii') + b'\n'
+
+    def operator(self, operator, *operands):
+        """Append `operator` (bytes) preceded by `operands`
+
+        Numeric operands are formatted using :attr:`precision`; operands that
+        are bytes (names, for example) are written as-is."""
+        precision = self.precision
+        data = self._data
+        for operand in operands:
+            data += (operand if isinstance(operand, bytes)
+                     else format_number(operand, precision))
+            data += b' '
+        data += operator
+        data += b'\n'
+
+    def show_text(self, segments):
+        """Append a TJ operator showing the glyphs in `segments`
+
+        Each segment is a tuple of the string of character codes (see
+        :func:`literal_string` and :func:`hex_string`), a flag that indicates
+        whether the string is a hexadecimal string, and the adjustment to
+        apply after the last glyph in thousandths of a text space unit (or
+        `None`).
+
+        """
+        precision = self.adjustment_precision
+        data = self._data
+        data += b'['
+        for string, hexadecimal, adjustment in segments:
+            data += b'<' if hexadecimal else b'('
+            data += string
+            data += b'>' if hexadecimal else b')'
+            if adjustment is not None:
+                data += b' '
+                data += format_number(adjustment, precision)
+                data += b' '
+        data += b'] TJ\n'
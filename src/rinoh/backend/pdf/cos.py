@@ -420,6 +420,11 @@ class Stream(Dictionary):
     def write_raw(self, b):
         return self._data.write(b)
 
+    def discard_data(self):
+        """Free the memory held by the stream's data (after it was written)"""
+        self.reset()
+        self._data = BytesIO()
+
     def reset(self):
         if self._coder:
             self._coder.close()
@@ -456,6 +461,8 @@ class Document(dict):
     PRODUCER = 'rinohtype v{} PDF backend ({})'.format(__version__,
                                                        __release_date__)
 
+    _output = None          # file to which objects are written early
+
     def __init__(self, creator,
                  title=None, author=None, subject=None, keywords=None):
         self.catalog = Catalog()
@@ -530,16 +537,108 @@ class Document(dict):
             dests_names.append(name)
             dests_names.append(self.dests[name])
 
+    @staticmethod
+    def _write_header(file):
+        file.write('%PDF-{}\n'.format(PDF_VERSION).encode('utf_8'))
+        file.write(b'%\xDC\xE1\xD8\xB7\n')
+
+    def _write_object(self, file, identifier, obj, addresses):
+        addresses[identifier] = file.tell()
+        file.write('{} 0 obj\n'.format(identifier).encode('utf_8'))
+        file.write(obj.direct_bytes(self) + b'\n')
+        file.write(b'endobj\n')
+
+    def start_output(self, file):
+        """Start writing the PDF file to `file` (which needs to be seekable)
+
+        Objects can subsequently be written out to the file early using
+        :meth:`write_objects`. :meth:`write` writes out the remaining objects
+        and finishes the file.
+
+        """
+        file.seek(0)
+        file.truncate()
+        self._output = file
+        self._addresses = {}        # identifier -> address of written objects
+        self._write_header(file)
+
+    @property
+    def output_position(self):
+        """The position in the output file where the next object will be
+        written (see :meth:`start_output`)"""
+        return self._output.tell()
+
+    def write_objects(self, obj, deferred=()):
+        """Write `obj` and the indirect objects it references to the output
+        file (see :meth:`start_output`)
+
+        Objects that were written out before are skipped. The objects in
+        `deferred` are assigned an object number, but are only written out by
+        :meth:`write`; use this for objects that can still change later on.
+        The objects referenced by deferred objects are not traversed.
+
+        """
+        deferred_ids = set()
+        for deferred_obj in deferred:
+            self.register(deferred_obj)
+            deferred_ids.add(id(deferred_obj))
+        visited = set()
+        to_write = []
+        stack = [obj]
+        while stack:
+            item = stack.pop()
+            if id(item) in visited or id(item) in deferred_ids:
+                continue
+            visited.add(id(item))
+            if item.indirect:
+                reference = self.register(item)
+                if reference.identifier in self._addresses:
+                    continue
+                to_write.append((reference.identifier, item))
+            if isinstance(item, Container):
+                stack.extend(reversed(list(item.children())))
+        for identifier, item in to_write:
+            self._write_object(self._output, identifier, item, self._addresses)
+
+    def truncate_output(self, position):
+        """Discard the objects written to the output file from `position`
+        onwards
+
+        These objects are also unregistered, so that they are assigned a new
+        object number when they are written out again.
+
+        """
+        discarded = set(identifier
+                        for identifier, address in self._addresses.items()
+                        if address >= position)
+        for identifier in discarded:
+            del self._addresses[identifier]
+            del self[identifier]
+        for object_id, reference in list(self._by_object_id.items()):
+            if reference.identifier in discarded:
+                del self._by_object_id[object_id]
+        self._output.seek(position)
+        self._output.truncate()
+
     def write(self, file_or_filename):
+        """Write the PDF file to `file_or_filename`
+
+        If output was started using :meth:`start_output`, the objects not yet
+        written out are appended to that file instead.
+
+        """
         def out(string):
             file.write(string + b'\n')
 
-        try:
-            file = open(file_or_filename, 'wb')
-            close_file = True
-        except TypeError:
-            file = file_or_filename
-            close_file = False
+        close_file = False
+        if self._output is not None:
+            file = self._output
+        else:
+            try:
+                file = open(file_or_filename, 'wb')
+                close_file = True
+            except TypeError:
+                file = file_or_filename
 
         self.build_dests_names_array()
         self.catalog.register_indirect(self)
@@ -548,17 +647,16 @@ class Document(dict):
             self.info['ModDate'].delete(self)
         self.info['ModDate'] = Date(self.timestamp)
 
-        out('%PDF-{}'.format(PDF_VERSION).encode('utf_8'))
-        file.write(b'%\xDC\xE1\xD8\xB7\n')
+        if self._output is not None:
+            addresses = self._addresses
+        else:
+            self._write_header(file)
+            addresses = {}
         # write out indirect objects
-        addresses = {}
         for identifier in range(1, self.max_identifier + 1):
-            if identifier in self:
-                obj = self[identifier]
-                addresses[identifier] = file.tell()
-                out('{} 0 obj'.format(identifier).encode('utf_8'))
-                out(obj.direct_bytes(self))
-                out(b'endobj')
+            if identifier in self and identifier not in addresses:
+                self._write_object(file, identifier, self[identifier],
+                                   addresses)
         xref_table_address = file.tell()
         self._write_xref_table(file, addresses)
         out(b'trailer')
@@ -23,6 +23,7 @@ Classes representing a document:
 from pathlib import Path
 
 import datetime
+import multiprocessing
 import pickle
 import re
 import sys
@@ -31,6 +32,7 @@ import time
 from collections import OrderedDict, defaultdict, deque
 from contextlib import suppress
 from copy import copy
+from functools import partial
 from itertools import count
 from operator import attrgetter
 from os import getenv
@@ -39,19 +41,22 @@ from . import __version__, __release_date__
 from .attribute import OptionSet, Source
 from .backend import pdf
 from .flowable import StaticGroupedFlowables
+from .image import ImageCache
 from .language import EN
 from .layout import (Container, ReflowRequired,
                      BACKGROUND, CONTENT, HEADER_FOOTER)
 from .number import NumberFormatBase, format_number
-from .reference import ReferenceType
+from .paragraph import ShapingCache
+from .reference import ReferenceType, NUMBER_OF_PAGES
 from .strings import Strings
-from .style import Match, StyleLog, ZERO_SPECIFICITY
+from .style import Match, MatchSignatures, StyleLog, ZERO_SPECIFICITY
 from .text import StyledText
-from .util import DEFAULT, WeakMutableKeyDictionary
+from .util import DEFAULT, LRUCache, WeakMutableKeyDictionary
 from .warnings import warn
 
 
-__all__ = ['Page', 'PageOrientation', 'PageType', 'Document', 'DocumentTree']
+__all__ = ['Page', 'PageOrientation', 'PageType', 'Document', 'DocumentTree',
+           'DependencyGraph']
 
 
 class DocumentTree(StaticGroupedFlowables):
@@ -189,6 +194,29 @@ class Page(Container):
         self.canvas.place_annotations()
 
 
+class PagePlaceholder(object):
+    """Stands in for a page rendered in another process
+
+    When rendering document parts in parallel (see
+    :meth:`Document._render_parallel`), :attr:`Document.page_elements` maps
+    the IDs of the elements placed on pages rendered by other processes to
+    these placeholders.
+
+    Args:
+        part_name (str): the name of the page's document part template
+        number (int): the page number
+
+    """
+
+    def __init__(self, part_name, number):
+        self.document_part = part_name
+        self.number = number
+
+    def __repr__(self):
+        return '{}({!r}, {})'.format(type(self).__name__, self.document_part,
+                                     self.number)
+
+
 class PartPageCount(object):
     def __init__(self):
         self.count = 0
@@ -204,6 +232,233 @@ class PartPageCount(object):
         return self
 
 
+class PageSnapshot(object):
+    """The rendering state at the start of a page
+
+    A snapshot is saved before each page is created. It allows a following
+    rendering pass to resume rendering at this page, keeping the preceding
+    pages from the previous pass.
+
+    Args:
+        document (Document): the document being rendered
+        part (DocumentPart): the document part the page belongs to
+        create_page (callable): creates the page
+        page_number (int): the value of the page number counter in
+            :meth:`DocumentPart.render`
+        sideways_chain (Chain): chain for rendering sideways floats
+
+    """
+
+    def __init__(self, document, part, create_page, page_number,
+                 sideways_chain):
+        (self.part_index, part_page_counts, part_page_count,
+         self.last_number_format) = document._part_progress
+        count_copies = {}   # preserve the sharing of counts among parts
+
+        def copy_count(count):
+            return count_copies.setdefault(id(count), copy(count))
+
+        self.part_page_counts = {name: copy_count(count)
+                                 for name, count in part_page_counts.items()}
+        self.part_page_count = copy_count(part_page_count)
+        self.floats = set(document.floats)
+        self.sideways_floats = deque(document.sideways_floats)
+        self.registered_sideways_floats = \
+            set(document.registered_sideways_floats)
+        self.placed_footnotes = set(document.placed_footnotes)
+        self.num_style_log_entries = len(document.style_log.entries)
+        self.num_backend_pages = len(document.backend_document.pages)
+        self.part = part
+        self.num_part_pages = len(part.pages)
+        self.create_page = create_page
+        self.page_number = page_number
+        self.chain_state = part.chain.save_state()
+        self.sideways_chain = sideways_chain
+        self.sideways_chain_state = (sideways_chain.save_state()
+                                     if sideways_chain else None)
+
+    def restore(self, document):
+        """Reset the document's rendering state to this snapshot
+
+        Discards the pages rendered after this snapshot was saved.
+
+        Returns:
+            tuple: the index of the document part template to resume
+                rendering, the page counts for the preceding document parts,
+                the page count for the current document part and the page
+                number format of the preceding document part
+
+        """
+        document.floats = set(self.floats)
+        document.sideways_floats = deque(self.sideways_floats)
+        document.registered_sideways_floats = \
+            set(self.registered_sideways_floats)
+        document.placed_footnotes = set(self.placed_footnotes)
+        del document.style_log.entries[self.num_style_log_entries:]
+        backend_pages = document.backend_document.discard_pages(
+            self.num_backend_pages)
+        discarded_pages = set(backend_page.rinoh_page
+                              for backend_page in backend_pages)
+        for element_id, page in list(document.page_elements.items()):
+            if page in discarded_pages:
+                del document.page_elements[element_id]
+        count_copies = {}
+
+        def copy_count(count):
+            return count_copies.setdefault(id(count), copy(count))
+
+        part_page_counts = {name: copy_count(count)
+                            for name, count in self.part_page_counts.items()}
+        return (self.part_index, part_page_counts,
+                copy_count(self.part_page_count), self.last_number_format)
+
+    def restore_part(self, part):
+        """Reset the rendering state of `part` to this snapshot
+
+        Returns:
+            tuple: the callable that creates the page, the page number
+                counter and the chain for rendering sideways floats
+
+        """
+        assert part is self.part
+        del part.pages[self.num_part_pages:]
+        part.chain.restore_state(self.chain_state)
+        if self.sideways_chain:
+            self.sideways_chain.restore_state(self.sideways_chain_state)
+        return self.create_page, self.page_number, self.sideways_chain
+
+
+class DependencyGraph(object):
+    """Records which references are read while rendering each page
+
+    Page references and the number of pages in a document part are only known
+    after the pages they refer to have been rendered. The first rendering pass
+    uses the values from the references cache or placeholders, so pages that
+    read these need to be rendered again in the next pass if the values
+    changed.
+
+    :meth:`Document.get_reference` and :attr:`DocumentPart.number_of_pages`
+    register each value they return with :meth:`register_read`. A read is
+    identified by an `(id, type)` pair, where `type` is a
+    :class:`ReferenceType` or the :const:`NUMBER_OF_PAGES` field type (`id`
+    then is the document part template's name).
+
+    """
+
+    def __init__(self):
+        self._reads = OrderedDict()     # page -> {(id, type): value}
+        self.current_page = None
+        self.read_count = 0             # total number of reads registered
+
+    def start_page(self, page):
+        """Register subsequent reads with `page`, until the next call"""
+        self._reads[page] = {}
+        self.current_page = page
+
+    def end_pass(self):
+        """Stop registering reads; called after rendering the last page"""
+        self.current_page = None
+
+    def register_read(self, id, type, value):
+        """Record that `value` was read for `(id, type)` on the current page
+
+        If different values are read for the same `(id, type)` on a single
+        page, the page will be invalidated after each rendering pass."""
+        self.read_count += 1
+        if self.current_page is None:
+            return
+        reads = self._reads[self.current_page]
+        if reads.setdefault((id, type), value) != value:
+            reads[id, type] = INCONSISTENT
+
+    @property
+    def pages(self):
+        """The rendered pages, in rendering order"""
+        return list(self._reads)
+
+    def page_indices(self):
+        """Return a dictionary mapping the rendered pages to their index in
+        rendering order"""
+        return {page: index for index, page in enumerate(self._reads)}
+
+    def dependencies(self, page):
+        """Return the values read while rendering `page`
+
+        Returns:
+            dict: maps `(id, type)` tuples to the value read
+
+        """
+        return dict(self._reads[page])
+
+    def dependents(self, id, type=None):
+        """Return the pages that read a reference for `id` (optionally limited
+        to the reference `type`)"""
+        return [page for page, reads in self._reads.items()
+                if any(read_id == id and type in (None, read_type)
+                       for read_id, read_type in reads)]
+
+    def changed_references(self, document):
+        """Return the `(id, type)` pairs for which a page read a value that
+        differs from the current value in `document`"""
+        return set(key for reads in self._reads.values()
+                   for key, value in reads.items()
+                   if document.read_value(*key) != value)
+
+    def invalidated_pages(self, document):
+        """Return the pages (in rendering order) that read a value that
+        differs from the current value in `document`"""
+        return [page for page, reads in self._reads.items()
+                if any(document.read_value(*key) != value
+                       for key, value in reads.items())]
+
+    def forward_references(self, page, document, page_indices=None):
+        """Return the `(id, type)` pairs read by `page` that refer to a later
+        page or to a page count
+
+        These are the values that are only known after rendering the pages
+        following `page`. `page_indices` maps the pages to their index in
+        rendering order (see :meth:`page_indices`); it is determined when not
+        given."""
+        if page_indices is None:
+            page_indices = self.page_indices()
+        page_index = page_indices[page]
+        forward = set()
+        for id, type in self._reads[page]:
+            if type == NUMBER_OF_PAGES:
+                forward.add((id, type))
+            elif type == ReferenceType.PAGE:
+                target_page = document.page_elements.get(id)
+                if page_indices.get(target_page, page_index + 1) > page_index:
+                    forward.add((id, type))
+        return forward
+
+    def summary(self, document):
+        """Yield a line of text for each page that depends on forward
+        references, for diagnostic purposes"""
+        page_indices = self.page_indices()
+        for page in self._reads:
+            count = len(self.forward_references(page, document, page_indices))
+            if count:
+                yield ('page {} depends on {} forward reference{}'
+                       .format(page.formatted_number, count,
+                               's' if count > 1 else ''))
+
+    def discard_pages(self, first_index):
+        """Forget about the pages rendered after the first `first_index`
+        pages"""
+        for page in self.pages[first_index:]:
+            del self._reads[page]
+
+    def clear(self):
+        """Forget about all pages"""
+        self._reads.clear()
+        self.current_page = None
+
+
+INCONSISTENT = object()
+UNDEFINED = object()
+
+
 class Metadata(dict, Source):
     def __init__(self, document, **items):
         super().__init__(**items)
@@ -241,6 +496,13 @@ class Document(object):
 
     CACHE_EXTENSION = '.rtc'
 
+    #: the range of unique IDs reserved for each worker process
+    WORKER_UNIQUE_IDS = 1000000
+
+    #: the maximum number of paragraph layouts to keep (see
+    #: :class:`paragraph.ParagraphLayout`)
+    PARAGRAPH_LAYOUTS = 4096
+
     def __init__(self, document_tree, stylesheet, language, strings=None,
                  backend=None):
         """`backend` specifies the backend to use for rendering the document."""
@@ -248,6 +510,10 @@ class Document(object):
         self._print_version_and_license()
         self._no_cache = getenv('RINOH_NO_CACHE', '0') != '0'
         self._single_pass = getenv('RINOH_SINGLE_PASS', '0') != '0'
+        self._stream_output = getenv('RINOH_STREAM_OUTPUT', '0') != '0'
+        self._processes = int(getenv('RINOH_PARALLEL', '0') or 0)
+        self.stream_output = False      # set by render()
+        self.show_progress = True
         self.front_matter = []
         self.supporting_matter = defaultdict(list)
         self.document_tree = document_tree
@@ -255,6 +521,7 @@ class Document(object):
         self.language = language
         self._strings = strings or Strings()
         self.backend = backend or pdf
+        self.image_cache = ImageCache(self.backend)
         self._flowables = list(id(element)
                                for element in document_tree.elements)
 
@@ -266,13 +533,22 @@ class Document(object):
         self.page_elements = {}        # mapping id's to pages
         self.page_references = {}      # mapping id's to page numbers
         self._styled_matches = WeakMutableKeyDictionary()   # cache matching styles
+        self._match_signatures = MatchSignatures(stylesheet)
+        self._signature_matches = {}    # match signature -> matching styles
+        # flowable -> {max width: (style digest, content width)}
+        self.content_widths = WeakMutableKeyDictionary()
+        self.paragraph_layouts = LRUCache(self.PARAGRAPH_LAYOUTS)
+        self.shaped_text = ShapingCache()
         self._sections = []
+        self._part_sections = {}       # part template name -> sections
         self.index_entries = {}
         self._glossary = {}
         self._glossary_first = {}
         self._unique_id = 0
         self.title_targets = set()
         self.error = False
+        self.dependencies = DependencyGraph()
+        self._page_snapshots = []
 
     def _print_version_and_license(self):
         print('rinohtype {} ({})  Copyright (c) Brecht Machiels and'
@@ -310,35 +586,68 @@ to the terms of the GNU Affero General Public License version 3.''')
         id_references[reference_type] = value
 
     def get_reference(self, id, reference_type, default=DEFAULT):
-        if reference_type == ReferenceType.PAGE:
-            return self.page_references.get(id, 'XX')
-        try:
-            return self.references[id][reference_type]
-        except KeyError:
+        value = self.read_value(id, reference_type)
+        self.dependencies.register_read(id, reference_type, value)
+        if value is UNDEFINED:
             if default is DEFAULT:
-                raise
+                raise KeyError((id, reference_type))
             return default
+        return value
+
+    def read_value(self, id, type):
+        """Return the current value for a read registered with the
+        :class:`DependencyGraph`
+
+        Returns :const:`UNDEFINED` if there is no reference of `type` for
+        `id`."""
+        if type == ReferenceType.PAGE:
+            return self.page_references.get(id, 'XX')
+        elif type == NUMBER_OF_PAGES:
+            try:
+                return self.part_page_counts[id].count
+            except KeyError:
+                return 0
+        return self.references.get(id, {}).get(type, UNDEFINED)
+
+    def save_page_state(self, part, create_page, page_number, sideways_chain):
+        """Called by :meth:`DocumentPart.render` before creating a new page
+
+        Saves a :class:`PageSnapshot` that allows a following rendering pass
+        to resume rendering from this page."""
+        snapshot = PageSnapshot(self, part, create_page, page_number,
+                                sideways_chain)
+        self._page_snapshots.append(snapshot)
 
     def get_matches(self, styled):
         styled_matches = self._styled_matches
         try:
             return styled_matches[styled]
         except KeyError:
-            stylesheet = self.stylesheet
-            matches = sorted(stylesheet.find_matches(styled, self),
-                             key=attrgetter('specificity'), reverse=True)
-            last_match = Match(None, ZERO_SPECIFICITY)
-            for match in matches:
-                if (match.specificity == last_match.specificity
-                        and match.style_name != last_match.style_name):
-                    styled.warn("Multiple selectors match with the same "
-                                f"specificity: {last_match.style_name}, "
-                                f"{match.style_name}. See the style log for "
-                                "details.")
-                match.stylesheet = stylesheet.find_source(match.style_name)
-                last_match = match
-            styled_matches[styled] = matches
-            return matches
+            pass
+        # elements sharing a match signature share the list of matches
+        signature = self._match_signatures.get(styled, self)
+        if signature is not None:
+            with suppress(KeyError):
+                matches = styled_matches[styled] = \
+                    self._signature_matches[signature]
+                return matches
+        stylesheet = self.stylesheet
+        matches = sorted(stylesheet.find_matches(styled, self),
+                         key=attrgetter('specificity'), reverse=True)
+        last_match = Match(None, ZERO_SPECIFICITY)
+        for match in matches:
+            if (match.specificity == last_match.specificity
+                    and match.style_name != last_match.style_name):
+                styled.warn("Multiple selectors match with the same "
+                            f"specificity: {last_match.style_name}, "
+                            f"{match.style_name}. See the style log for "
+                            "details.")
+            match.stylesheet = stylesheet.find_source(match.style_name)
+            last_match = match
+        styled_matches[styled] = matches
+        if signature is not None:
+            self._signature_matches[signature] = matches
+        return matches
 
     def set_glossary(self, term, definition):
         try:
@@ -425,6 +734,9 @@ to the terms of the GNU Affero General Public License version 3.''')
             raise ValueError("You need to specify either 'filename_root' or "
                              "'file'.")
 
+        # write out pages as soon as they are placed; if a following rendering
+        # pass discards pages, the output file is truncated accordingly
+        self.stream_output = self._stream_output and file.seekable()
         fake_container = FakeContainer(self)
         prev_page_counts, prev_page_refs = self._load_cache(filename_root)
         try:
@@ -434,20 +746,15 @@ to the terms of the GNU Affero General Public License version 3.''')
             self.page_elements.clear()
             self.part_page_counts = prev_page_counts
             self.page_references = prev_page_refs.copy()
-            while True:
-                self.backend_document = \
-                    self.backend.Document(self.CREATOR, **backend_metadata)
-                self.part_page_counts = self._render_pages()
-                if (self.part_page_counts == prev_page_counts
-                        and self.page_references == prev_page_refs):
-                    break
-                if self._single_pass:
-                    print('Stopping after first rendering pass.')
-                    break
-                print('Not yet converged, rendering again...')
-                prev_page_counts = self.part_page_counts
-                prev_page_refs = self.page_references.copy()
-                del self.backend_document
+            part_groups = (self._part_groups() if self._processes > 1
+                           and 'fork' in multiprocessing.get_all_start_methods()
+                           else [])
+            if len(part_groups) > 1:
+                self._render_parallel(part_groups, backend_metadata,
+                                      prev_page_counts, prev_page_refs)
+            else:
+                self._render_sequential(file, backend_metadata,
+                                        prev_page_counts, prev_page_refs)
             self._create_outlines(self.backend_document)
             if filename:
                 self._save_cache(filename_root)
@@ -460,31 +767,275 @@ to the terms of the GNU Affero General Public License version 3.''')
                 file.close()
         return not self.error
 
-    def _render_pages(self):
+    def _render_sequential(self, file, backend_metadata, prev_page_counts,
+                           prev_page_refs):
+        """Render the document in this process, repeating the rendering
+        passes until the references converge"""
+        resume_at = None
+        while True:
+            if resume_at is None:
+                self.backend_document = \
+                    self.backend.Document(self.CREATOR, **backend_metadata)
+                if self.stream_output:
+                    self.backend_document.start_output(file)
+            self.part_page_counts = self._render_pages(resume_at)
+            if (self.part_page_counts == prev_page_counts
+                    and self.page_references == prev_page_refs):
+                break
+            if self._single_pass:
+                print('Stopping after first rendering pass.')
+                break
+            invalidated_pages = self.dependencies.invalidated_pages(self)
+            if not invalidated_pages:
+                break       # no page depends on the changed references
+            prev_page_counts = self.part_page_counts
+            prev_page_refs = self.page_references.copy()
+            first_page = invalidated_pages[0]
+            page_index = self.dependencies.pages.index(first_page)
+            if page_index > 0:
+                print('Not yet converged, {} page(s) depend on changed '
+                      'references; rendering again from page {}...'
+                      .format(len(invalidated_pages),
+                              first_page.formatted_number))
+                resume_at = self._page_snapshots[page_index]
+                del self._page_snapshots[page_index:]
+                self.dependencies.discard_pages(page_index)
+            else:
+                print('Not yet converged, rendering again...')
+                resume_at = None
+                del self.backend_document
+
+    def _render_pages(self, resume_at=None, part_indices=None):
         """Render the complete document once and return the number of pages
-        rendered."""
-        self.style_log = StyleLog(self.stylesheet)
-        self.floats = set()
-        self.sideways_floats = deque()
-        self.registered_sideways_floats = set()
-        self.placed_footnotes = set()
-        self._start_time = time.time()
+        rendered.
 
-        part_page_counts = {}
-        part_page_count = PartPageCount()
-        last_number_format = None
-        for part_template in self.part_templates:
-            part = part_template.document_part(self, last_number_format)
-            if part is None:
+        If `resume_at` (:class:`PageSnapshot`) is given, the pages rendered
+        before it in the previous pass are kept and rendering continues from
+        the state saved in the snapshot. If `part_indices` is given, only the
+        document parts for the part templates at these indices are rendered
+        (see :meth:`_render_part_group`)."""
+        self._start_time = time.time()
+        if resume_at:
+            (first_part_index, part_page_counts, part_page_count,
+             last_number_format) = resume_at.restore(self)
+        else:
+            self.style_log = StyleLog(self.stylesheet)
+            self.floats = set()
+            self.sideways_floats = deque()
+            self.registered_sideways_floats = set()
+            self.placed_footnotes = set()
+            self._page_snapshots = []
+            self.dependencies.clear()
+            first_part_index = 0
+            part_page_counts = {}
+            part_page_count = PartPageCount()
+            last_number_format = None
+        for index, part_template in enumerate(self.part_templates):
+            if index < first_part_index:
                 continue
-            if part.get_config_value('page_number_format', self) != 'continue':
-                part_page_count = PartPageCount()
-            part_page_count += part.render(part_page_count.count + 1)
+            if part_indices is not None and index not in part_indices:
+                continue
+            if resume_at and index == first_part_index:
+                part = resume_at.part
+            else:
+                resume_at = None
+                part = part_template.document_part(self, last_number_format)
+                if part is None:
+                    continue
+                if (part.get_config_value('page_number_format', self)
+                        != 'continue'):
+                    part_page_count = PartPageCount()
+            self._part_progress = (index, part_page_counts, part_page_count,
+                                   last_number_format)
+            part_page_count += part.render(part_page_count.count + 1,
+                                           resume_at)
             part_page_counts[part_template.name] = part_page_count
             last_number_format = part.page_number_format
-        sys.stdout.write('\n')     # for the progress indicator
+        self.dependencies.end_pass()
+        if self.show_progress:
+            sys.stdout.write('\n')     # for the progress indicator
         return part_page_counts
 
+    def _part_groups(self):
+        """Split the document parts into groups that can be rendered
+        independently
+
+        A new group starts at each document part that restarts the page
+        numbering; the parts that continue the page numbering of the preceding
+        part are included in its group.
+
+        Returns:
+            list[list[int]]: the indices of the part templates in each group
+
+        """
+        groups = []
+        for index, part_template in enumerate(self.part_templates):
+            part = part_template.document_part(self, None)
+            if part is None:
+                continue
+            if (not groups or part.get_config_value('page_number_format', self)
+                    != 'continue'):
+                groups.append([])
+            groups[-1].append(index)
+        return groups
+
+    def _render_parallel(self, part_groups, backend_metadata,
+                         prev_page_counts, prev_page_refs):
+        """Render groups of document parts in worker processes
+
+        The groups (see :meth:`_part_groups`) are rendered independently, each
+        in a separate process forked from this one, so that it inherits the
+        prepared document. References to other groups are resolved using the
+        values from the previous rendering pass (or the references cache). The
+        maps of page references and page counts are collected from the
+        workers after each pass. In the following pass, only the groups that
+        read a value that changed are rendered again. When the references have
+        converged, the pages produced by the workers are combined in a single
+        backend document.
+
+        State that is shared between document parts is not exchanged between
+        the groups; a footnote referenced from two groups, for example, is
+        placed in both.
+
+        """
+        self.stream_output = False
+        self._assign_shared_ids()
+        results = [None] * len(part_groups)
+        to_render = list(range(len(part_groups)))
+        print('Rendering {} groups of document parts in {} processes'
+              .format(len(part_groups), min(self._processes,
+                                            len(part_groups))))
+        while True:
+            groups = [part_groups[index] for index in to_render]
+            for index, result in zip(to_render,
+                                     self._run_workers(groups,
+                                                       backend_metadata)):
+                results[index] = result
+            part_page_counts = {}
+            page_references = prev_page_refs.copy()
+            for result in results:
+                part_page_count = PartPageCount()
+                part_page_count += result['page_count']
+                for name in result['part_names']:
+                    part_page_counts[name] = part_page_count
+                page_references.update(result['page_references'])
+                for id, (part_name, number) in result['page_elements'].items():
+                    self.page_elements[id] = PagePlaceholder(part_name, number)
+            self.part_page_counts = part_page_counts
+            self.page_references = page_references
+            if (part_page_counts == prev_page_counts
+                    and page_references == prev_page_refs):
+                break
+            if self._single_pass:
+                print('Stopping after first rendering pass.')
+                break
+            changed_refs = set(id for id in set(page_references)
+                                            | set(prev_page_refs)
+                               if page_references.get(id, 'XX')
+                               != prev_page_refs.get(id, 'XX'))
+            changed_counts = set(name for name in set(part_page_counts)
+                                                  | set(prev_page_counts)
+                                 if name not in part_page_counts
+                                 or name not in prev_page_counts
+                                 or part_page_counts[name]
+                                 != prev_page_counts[name])
+            to_render = [index for index, result in enumerate(results)
+                         if result['page_reads'] & changed_refs
+                         or result['count_reads'] & changed_counts]
+            if not to_render:
+                break       # no page depends on the changed references
+            prev_page_counts = part_page_counts
+            prev_page_refs = page_references.copy()
+            print('Not yet converged, rendering {} of {} groups of document '
+                  'parts again...'.format(len(to_render), len(part_groups)))
+        self.backend_document = self.backend.Document(self.CREATOR,
+                                                      **backend_metadata)
+        self.style_log = StyleLog(self.stylesheet)
+        get_image = partial(self.image_cache.get,
+                            backend_document=self.backend_document)
+        for result in results:
+            self.backend_document.import_pages(result['pages'], get_image)
+            self.style_log.entries.extend(result['style_log'])
+            self.error = self.error or result['error']
+
+    def _assign_shared_ids(self):
+        """Assign IDs to the elements that can be referenced from other groups
+
+        Sections (table of contents, page headers) and index targets otherwise
+        only receive an ID once rendered or referenced, which would happen
+        independently in each worker process.
+
+        """
+        for section in self._sections:
+            section.get_id(self)
+
+        def assign_index_target_ids(entries):
+            for name, (term, subentries) in entries.items():
+                for index_term, target in subentries.get(None, ()):
+                    target.get_id(self)
+                assign_index_target_ids({name: entry for name, entry
+                                         in subentries.items() if name})
+
+        assign_index_target_ids(self.index_entries)
+
+    def _run_workers(self, part_groups, backend_metadata):
+        """Render each of `part_groups` in a worker process and return the
+        results (see :meth:`_render_part_group`)"""
+        context = multiprocessing.get_context('fork')
+        processes = min(self._processes, len(part_groups))
+        with context.Pool(processes, _init_worker,
+                          (self, backend_metadata)) as pool:
+            return pool.map(_render_part_group, part_groups, chunksize=1)
+
+    def _render_part_group(self, part_indices, backend_metadata):
+        """Render the document parts at `part_indices` (in a worker process)
+
+        Returns:
+            dict: the rendered pages (exported from the backend document),
+                formatted style log entries, the page count and the page
+                references for these parts, and the IDs of the page references
+                and page counts read while rendering
+
+        """
+        self.show_progress = False
+        self.stream_output = False
+        self.backend_document = self.backend.Document(self.CREATOR,
+                                                      **backend_metadata)
+        # elements created while rendering get IDs that differ from those
+        # assigned in the workers rendering the other groups
+        self._unique_id += self.WORKER_UNIQUE_IDS * (part_indices[0] + 1)
+        group_parts = set(self.part_templates[index].name
+                          for index in part_indices)
+        for part_name, sections in self._part_sections.items():
+            if part_name not in group_parts:
+                for section in sections:
+                    self.page_elements.setdefault(section.get_id(self),
+                                                  PagePlaceholder(part_name,
+                                                                  None))
+        part_page_counts = self._render_pages(part_indices=part_indices)
+        page_elements = {id: page for id, page in self.page_elements.items()
+                         if isinstance(page, Page)}
+        reads = set(key for page in self.dependencies.pages
+                    for key in self.dependencies.dependencies(page))
+        source_root = self.document_tree.source_root
+        style_log = [(page_number, (part_indices[0], container), heading, text)
+                     for page_number, container, heading, text
+                     in self.style_log.formatted_entries(source_root)]
+        return dict(part_names=list(part_page_counts),
+                    page_count=next(iter(part_page_counts.values())).count,
+                    page_references={id: self.page_references[id]
+                                     for id in page_elements},
+                    page_elements={id: (page.document_part.template.name,
+                                        page.number)
+                                   for id, page in page_elements.items()},
+                    page_reads=set(id for id, type in reads
+                                   if type == ReferenceType.PAGE),
+                    count_reads=set(id for id, type in reads
+                                    if type == NUMBER_OF_PAGES),
+                    style_log=style_log,
+                    pages=self.backend_document.export_pages(),
+                    error=self.error)
+
     def _create_outlines(self, backend_document):
         """Create an outline in the output file that allows for easy navigation
         of the document. The outline is a hierarchical tree of all the sections
@@ -535,6 +1086,8 @@ to the terms of the GNU Affero General Public License version 3.''')
     PROGRESS_BAR_WIDTH = 40
 
     def progress(self, flowable, container):
+        if not self.show_progress:
+            return
         try:
             index = self._flowables.index(id(flowable))
         except ValueError:
@@ -554,6 +1107,17 @@ to the terms of the GNU Affero General Public License version 3.''')
             sys.stdout.flush()
 
 
+def _init_worker(document, backend_metadata):
+    global _worker_document, _worker_backend_metadata
+    _worker_document = document
+    _worker_backend_metadata = backend_metadata
+
+
+def _render_part_group(part_indices):
+    return _worker_document._render_part_group(part_indices,
+                                               _worker_backend_metadata)
+
+
 class FakeContainer(object):    # TODO: clean up
     def __init__(self, document):
         self.document = document
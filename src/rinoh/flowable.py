@@ -31,7 +31,7 @@ from .layout import (InlineDownExpandingContainer, VirtualContainer,
                      PageBreakException, ReflowRequired)
 from .style import Styled, Style
 from .text import StyledText
-from .util import clamp, ReadAliasAttribute
+from .util import clamp, ReadAliasAttribute, INF
 
 
 __all__ = ['Flowable', 'FlowableStyle',
@@ -260,25 +260,34 @@ class Flowable(Styled):
         container.document.progress(self, container)
         return margin_left + width + margin_right, top_to_baseline, descender
 
-    def flow_inner(self, container, last_descender, state=None, space_below=0,
-                   **kwargs):
+    def _padding_and_borders(self, container):
+        """Return the top, right, bottom and left padding, followed by the
+        top, right, bottom and left border widths"""
         def border_width(attribute):
             border = self.get_style(attribute, container)
             return border.width if border else 0
 
-        draw_top = state.initial
-        width = self._width(container)
         padding = self.get_style('padding', container)
         padding_top = self.get_style('padding_top', container) or padding
         padding_left = self.get_style('padding_left', container) or padding
         padding_right = self.get_style('padding_right', container) or padding
         padding_bottom = self.get_style('padding_bottom', container) or padding
-        padding_h = padding_left + padding_right
         border = border_width('border')
         border_left = border_width('border_left') or border
         border_right = border_width('border_right') or border
         border_top = border_width('border_top') or border
         border_bottom = border_width('border_bottom') or border
+        return (padding_top, padding_right, padding_bottom, padding_left,
+                border_top, border_right, border_bottom, border_left)
+
+    def flow_inner(self, container, last_descender, state=None, space_below=0,
+                   **kwargs):
+        draw_top = state.initial
+        width = self._width(container)
+        (padding_top, padding_right, padding_bottom, padding_left,
+         border_top, border_right, border_bottom, border_left) = \
+            self._padding_and_borders(container)
+        padding_h = padding_left + padding_right
         border_h = border_left + border_right
         left = padding_left + border_left
         right = container.width - padding_right - border_right
@@ -318,6 +327,57 @@ class Flowable(Styled):
         descender = None if border_bottom else descender
         return state, bordered_width, top_to_baseline, descender
 
+    def min_content_width(self, container, **kwargs):
+        """The width of this flowable when its content is wrapped wherever
+        possible (at the longest unbreakable word, for example)
+
+        Includes margins, padding and borders, like the width returned by
+        :meth:`flow`. `kwargs` are passed on as for :meth:`flow`."""
+        return self.content_width(container, 0, **kwargs)
+
+    def max_content_width(self, container, **kwargs):
+        """The width of this flowable when its content is not wrapped
+
+        See :meth:`min_content_width`."""
+        return self.content_width(container, INF, **kwargs)
+
+    def content_width(self, container, max_width, **kwargs):
+        """Return the width of this flowable when flowed into a container of
+        `max_width`, as returned by :meth:`flow`
+
+        The width of the content is determined by :meth:`_content_width`.
+        Flowables that do not implement it are flowed into a virtual container
+        instead.
+
+        """
+        margin_left = self.get_style('margin_left', container)
+        margin_right = self.get_style('margin_right', container)
+        (_, padding_right, _, padding_left, _, border_right, _, border_left) = \
+            self._padding_and_borders(container)
+        margin_width = max_width - margin_right - margin_left
+        inner_width = (margin_width - padding_right - border_right
+                       - (padding_left + border_left))
+        content_width = self._content_width(container, inner_width, **kwargs)
+        if content_width is None:
+            return self._flowed_width(container, max_width, **kwargs)
+        bordered_width = (content_width + (padding_left + padding_right)
+                          + (border_left + border_right))
+        return float(margin_left + bordered_width + margin_right)
+
+    def _content_width(self, container, width, **kwargs):
+        """Return the width of this flowable's content (excluding padding
+        and borders) when rendered in a container of `width`, or ``None`` if
+        it can only be determined by rendering the flowable"""
+        return None
+
+    def _flowed_width(self, container, max_width, **kwargs):
+        """Determine the width by flowing this flowable into a virtual
+        container of `max_width`"""
+        buffer = VirtualContainer(container, width=max_width,
+                                  never_placed=True)
+        width, _, _ = self.flow(buffer, None, **kwargs)
+        return float(width)
+
     def render_frame(self, container, width, height, top=True, bottom=True):
         width, height = float(width), - float(height)
         border = self.get_style('border', container)
@@ -377,6 +437,9 @@ class DummyFlowable(Flowable):
              **kwargs):
         return 0, 0, last_descender
 
+    def content_width(self, container, max_width, **kwargs):
+        return 0
+
 
 class AnchorFlowable(DummyFlowable):
     """A dummy flowable that registers a destination anchor.
@@ -558,6 +621,17 @@ class GroupedFlowables(Flowable):
             raise exc
         return max_flowable_width, first_top_to_baseline or 0, descender
 
+    def _content_width(self, container, width, **kwargs):
+        max_flowable_width = 0
+        for flowable in self.initial_state(container).flowables:
+            if flowable.is_hidden(container):
+                continue
+            flowable.parent = self
+            max_flowable_width = max(max_flowable_width,
+                                     flowable.content_width(container, width,
+                                                            **kwargs))
+        return max_flowable_width
+
     def _flow_with_next(self, state, container, descender, space_below=0,
                         **kwargs):
         try:
@@ -735,12 +809,15 @@ class LabeledFlowable(Flowable):
         self.label.prepare(flowable_target)
         self.flowable.prepare(flowable_target)
 
-    def label_width(self, container):
+    def label_width(self, container, width=None):
+        """Return the width of the label when rendered in a container of
+        `width` (`container`'s width by default) and whether it exceeds
+        `label_max_width`"""
+        width = container.width if width is None else width
         label_min_width = self.get_style('label_min_width', container)
         label_max_width = self.get_style('label_max_width', container)
-        virtual_container = VirtualContainer(container)
-        label_width, _, _ = self.label.flow(virtual_container, 0)
-        spillover = (label_width > label_max_width.to_points(container.width)
+        label_width = self.label.content_width(container, width)
+        spillover = (label_width > label_max_width.to_points(width)
                      if label_max_width else True)
         return max(label_width, label_min_width), spillover
 
@@ -748,18 +825,20 @@ class LabeledFlowable(Flowable):
         initial_content_state = self.flowable.initial_state(container)
         return LabeledFlowableState(self, initial_content_state)
 
-    def render(self, container, last_descender, state, label_column_width=None,
-               space_below=0, **kwargs):
+    def _label_layout(self, container, width, label_column_width):
+        """Determine the width of the label, whether it spills over (is
+        placed above the content), the label's left position and the content's
+        left position and width (``None``: up to the right edge), given the
+        available `width`"""
         def style(name):
             return self.get_style(name, container)
 
-        label_min_width = style('label_min_width').to_points(container.width)
+        label_min_width = style('label_min_width').to_points(width)
         label_max_width_ = style('label_max_width')
-        label_max_width = (label_max_width_.to_points(container.width)
+        label_max_width = (label_max_width_.to_points(width)
                            if label_max_width_ else float('+inf'))
-        align_baselines = style('align_baselines')
 
-        free_label_width, _ = self.label_width(container)
+        free_label_width, _ = self.label_width(container, width)
         label_spillover = False
         label_width = label_column_width or clamp(label_min_width,
                                                   free_label_width,
@@ -768,8 +847,8 @@ class LabeledFlowable(Flowable):
             label_spillover = True
         elif free_label_width > label_width:
             if style('wrap_label'):
-                vcontainer = VirtualContainer(container, width=label_max_width)
-                wrapped_width, _, _ = self.label.flow(vcontainer, 0)
+                wrapped_width = self.label.content_width(container,
+                                                         label_max_width)
                 if wrapped_width < label_max_width:
                     label_width = wrapped_width
                 else:
@@ -784,9 +863,27 @@ class LabeledFlowable(Flowable):
             content_left = label_width + style('label_spacing')
             content_width = None
         else:
-            label_left = container.width - label_width - style('label_spacing')
+            label_left = width - label_width - style('label_spacing')
             content_left = 0
             content_width = label_left
+        return (label_width, label_spillover, label_left, content_left,
+                content_width)
+
+    def _content_width(self, container, width, label_column_width=None,
+                       **kwargs):
+        _, _, _, content_left, content_width = \
+            self._label_layout(container, width, label_column_width)
+        if content_width is None:
+            content_width = width - content_left
+        return content_left + self.flowable.content_width(container,
+                                                          content_width)
+
+    def render(self, container, last_descender, state, label_column_width=None,
+               space_below=0, **kwargs):
+        (label_width, label_spillover, label_left, content_left,
+         content_width) = self._label_layout(container, container.width,
+                                             label_column_width)
+        align_baselines = self.get_style('align_baselines', container)
         max_label_width = None if label_spillover else label_width
 
         if align_baselines and (state.initial and not label_spillover):
@@ -870,14 +967,20 @@ class GroupedLabeledFlowables(GroupedFlowables):
 
     """
 
-    def _calculate_label_width(self, container):
+    def _calculate_label_width(self, container, width=None):
         max_width = 0
         for flowable in self.flowables(container):
-            width, splillover = flowable.label_width(container)
+            label_width, splillover = flowable.label_width(container, width)
             if not splillover:
-                max_width = max(max_width, width)
+                max_width = max(max_width, label_width)
         return max_width
 
+    def _content_width(self, container, width, **kwargs):
+        max_label_width = self._calculate_label_width(container, width)
+        return super()._content_width(container, width,
+                                      label_column_width=max_label_width,
+                                      **kwargs)
+
     def render(self, container, descender, state, **kwargs):
         if state.initial:
             max_label_width = self._calculate_label_width(container)
@@ -936,6 +1039,11 @@ class Float(Flowable):
             return 0, 0, last_descender
         return super().flow(container, last_descender, state=state, **kwargs)
 
+    def content_width(self, container, max_width, **kwargs):
+        if self.get_style('float', container):
+            return self._flowed_width(container, max_width, **kwargs)
+        return super().content_width(container, max_width, **kwargs)
+
 
 class PageBreak(Flowable):
     def __init__(self, page_break=Break.ANY):
@@ -12,13 +12,13 @@ Classes for fonts and typefaces.
 
 from warnings import warn
 
-from .style import FontWeight, FontSlant, FontWidth
+from .style import FontVariant, FontWeight, FontSlant, FontWidth
 from ..resource import Resource, ResourceNotFound
-from ..util import NotImplementedAttribute
+from ..util import NotImplementedAttribute, cached
 from ..warnings import warn
 
 
-__all__ = ['Font', 'Typeface']
+__all__ = ['Font', 'ShapingPlan', 'Typeface']
 
 
 # TODO: provide predefined Font objects for known font filenames?
@@ -43,6 +43,90 @@ class GlyphMetrics(object):
         self.code = code
 
 
+class GlyphMetricsTable(dict):
+    """The metrics for all glyphs in a font, stored in compact arrays
+
+    Maps glyph keys to :class:`GlyphMetrics`. These are only created when a
+    glyph is first looked up, and are then reused, so that each glyph is
+    represented by a single object.
+
+    Args:
+        widths (array): the advance widths of the glyphs
+        names (list of str): the glyph names, which serve as the glyph keys;
+            if ``None``, glyphs are looked up by their index in the arrays
+        codes (array): the glyph codes; if ``None``, the index of the glyph
+            in the arrays is used
+        bounding_boxes (array): four values for each glyph
+
+    """
+
+    def __init__(self, widths, names=None, codes=None, bounding_boxes=None):
+        super().__init__()
+        self.widths = widths
+        self.names = names
+        self.codes = codes
+        self.bounding_boxes = bounding_boxes
+        self._indices = ({name: index for index, name in enumerate(names)}
+                         if names is not None else None)
+
+    def index(self, key):
+        if self._indices is not None:
+            return self._indices[key]
+        if not (isinstance(key, int) and 0 <= key < len(self.widths)):
+            raise KeyError(key)
+        return key
+
+    def __contains__(self, key):
+        try:
+            self.index(key)
+        except KeyError:
+            return False
+        return True
+
+    def __missing__(self, key):
+        glyph_metrics = self[key] = self.create_glyph_metrics(self.index(key))
+        return glyph_metrics
+
+    def create_glyph_metrics(self, index):
+        name = self.names[index] if self.names is not None else None
+        code = self.codes[index] if self.codes is not None else index
+        if self.bounding_boxes is not None:
+            bounding_box = tuple(self.bounding_boxes[4 * index:4 * index + 4])
+        else:
+            bounding_box = None
+        return GlyphMetrics(name, self.widths[index], bounding_box, code)
+
+
+class ShapingPlan(object):
+    """Looks up glyphs, ligatures and kerning for a font variant and a set of
+    font features
+
+    This plan simply defers to the font's methods. Font formats that support
+    features (see :class:`.OpenTypeShapingPlan`) resolve the features to the
+    font's lookup tables once, when the plan is created.
+
+    Args:
+        font (Font): the font to look up the glyphs in
+        variant (FontVariant): the font variant
+        features (tuple of str): the tags of the features to enable
+
+    """
+
+    def __init__(self, font, variant, features):
+        self.font = font
+        self.variant = variant
+        self.features = features
+
+    def get_glyph_metrics(self, char):
+        return self.font.get_glyph_metrics(char, self.variant)
+
+    def get_ligature(self, glyph, successor_glyph):
+        return self.font.get_ligature(glyph, successor_glyph)
+
+    def get_kerning(self, a, b):
+        return self.font.get_kerning(a, b)
+
+
 class Font(object):
     """A collection of glyphs in a particular style
 
@@ -82,6 +166,11 @@ class Font(object):
     x_height = NotImplementedAttribute()
     stem_v = NotImplementedAttribute()
 
+    #: the positional and keyword arguments the font was created with; set
+    #: by the subclasses and used to recreate the font in another process
+    #: (see :meth:`backend.pdf.Document.export_pages`)
+    arguments = None
+
     def __init__(self, filename, weight, slant, width):
         self.filename = filename
         self.weight = FontWeight.validate(weight)
@@ -98,6 +187,35 @@ class Font(object):
     def __hash__(self):
         return hash((self.name, self.filename))
 
+    #: the features enabled when no features are specified
+    DEFAULT_FEATURES = ('kern', 'liga')
+
+    def get_shaping_plan(self, variant=FontVariant.NORMAL, features=None,
+                         script='latn', language=None):
+        """Return the shaping plan for a font variant and set of features
+
+        Args:
+            variant (FontVariant): the variant of the glyphs to look up
+            features (iterable of str): the tags of the (OpenType) features
+                to enable; :attr:`DEFAULT_FEATURES` if ``None``
+            script (str): the OpenType script tag
+            language (str): the OpenType language system tag; the script's
+                default language system if ``None``
+
+        Returns:
+            ShapingPlan: the plan for looking up glyphs, ligatures and
+                kerning, shared by all text set with these settings
+
+        """
+        if features is None:
+            features = self.DEFAULT_FEATURES
+        return self._get_shaping_plan(variant, tuple(sorted(set(features))),
+                                      script, language)
+
+    @cached
+    def _get_shaping_plan(self, variant, features, script, language):
+        return ShapingPlan(self, variant, features)
+
     def get_glyph_metrics(self, char, variant):
         """Return the glyph metrics for a particular character
 
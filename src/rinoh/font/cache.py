@@ -0,0 +1,81 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Persistent cache of the metrics derived from font files.
+
+The font classes derive the glyph metrics, character mapping, ligatures and
+kerning pairs they need from the font file. These are stored in the user's
+cache directory, keyed by the hash of the font file's contents, so that later
+runs only need to unpickle them.
+
+"""
+
+import hashlib
+import pickle
+
+from array import array
+from pathlib import Path
+
+from .. import __version__
+from ..util import atomic_write, cache_dir
+
+
+__all__ = ['font_metrics', 'number_array']
+
+
+# directory holding the derived font metrics, named after the hash of the font
+# file they were derived from
+CACHE_PATH = cache_dir('fonts')
+
+CACHE_MAGIC = b'rinohFNT'
+CACHE_VERSION = 1
+
+
+def font_metrics(data, kind, derive, cache_path=None):
+    """Return the metrics derived from a font file
+
+    Args:
+        data (bytes-like): the contents of the font file
+        kind (str): identifies the type of font file and thereby the structure
+            of the derived metrics
+        derive (callable): returns the metrics derived from the font file as a
+            dictionary of picklable (plain) data; only called when the metrics
+            are not yet present in the cache or are outdated
+        cache_path (Path): the cache directory (:data:`CACHE_PATH` by default)
+
+    """
+    cache_path = Path(cache_path or CACHE_PATH)
+    digest = hashlib.sha256(data).hexdigest()
+    metrics_path = cache_path / '{}.{}'.format(digest, kind)
+    try:
+        with open(metrics_path, 'rb') as file:
+            if file.read(len(CACHE_MAGIC)) == CACHE_MAGIC:
+                version, rinoh_version, metrics = pickle.load(file)
+                if (version, rinoh_version) == (CACHE_VERSION, __version__):
+                    return metrics
+    except Exception:   # missing, unreadable or corrupt cache file
+        pass
+    metrics = derive()
+    data = pickle.dumps((CACHE_VERSION, __version__, metrics),
+                        pickle.HIGHEST_PROTOCOL)
+    try:
+        atomic_write(metrics_path, CACHE_MAGIC + data)
+    except OSError:         # the cache directory is not writable
+        pass
+    return metrics
+
+
+def number_array(values):
+    """Return an array holding `values`, integers if possible"""
+    values = list(values)
+    if all(isinstance(value, int) for value in values):
+        try:
+            return array('l', values)
+        except OverflowError:
+            pass
+    return array('d', values)
@@ -6,18 +6,222 @@
 # Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
 
 
+from array import array
+from bisect import bisect_left
+from io import BytesIO
 from logging import warning
 from warnings import warn
 
 from ...font.style import FontVariant, FontWeight, FontSlant, FontWidth
 from ...util import cached
 from ...warnings import RinohWarning
-from .. import Font, GlyphMetrics, LeafGetter, MissingGlyphException
+from .. import (Font, GlyphMetrics, GlyphMetricsTable, LeafGetter,
+                MissingGlyphException, ShapingPlan)
+from ..cache import font_metrics
 
+from .gpos import PairAdjustmentSubtable
+from .gsub import LigatureSubTable, SingleSubTable
 from .parse import OpenTypeParser
 from .ids import NAME_PS_NAME, PLATFORM_WINDOWS, LANGUAGE_WINDOWS_EN_US
 
 
+class OpenTypeGlyphMetrics(GlyphMetrics):
+    """Glyph metrics that look up the glyph's bounding box in the font's
+    glyph outline table only when it is accessed"""
+
+    __slots__ = ['font']
+
+    def __init__(self, font, width, code):
+        self.font = font
+        self.name = None
+        self.width = width
+        self.code = code
+
+    @property
+    def bounding_box(self):
+        # TODO: extract bboxes from CFF: www.tug.org/TUGboat/tb24-3/bella.pdf
+        if 'glyf' in self.font and self.code in self.font['glyf']:
+            return self.font['glyf'][self.code].bounding_box
+        return None
+
+
+class OpenTypeGlyphMetricsTable(GlyphMetricsTable):
+    """Maps glyph IDs to :class:`OpenTypeGlyphMetrics`"""
+
+    def __init__(self, font, widths):
+        super().__init__(widths)
+        self.font = font
+
+    def create_glyph_metrics(self, index):
+        return OpenTypeGlyphMetrics(self.font, self.widths[index], index)
+
+
+class CharacterMap(dict):
+    """Maps characters to glyph metrics
+
+    The glyph ID for a character is looked up in the arrays of character
+    ordinals (sorted) and corresponding glyph IDs when the character is first
+    looked up."""
+
+    def __init__(self, ordinals, glyph_ids, glyphs_by_code):
+        super().__init__()
+        self.ordinals = ordinals
+        self.glyph_ids = glyph_ids
+        self.glyphs_by_code = glyphs_by_code
+
+    def glyph_id(self, char):
+        ordinal = ord(char)
+        index = bisect_left(self.ordinals, ordinal)
+        if index == len(self.ordinals) or self.ordinals[index] != ordinal:
+            raise KeyError(char)
+        return self.glyph_ids[index]
+
+    def __contains__(self, char):
+        try:
+            self.glyph_id(char)
+        except KeyError:
+            return False
+        return True
+
+    def __missing__(self, char):
+        glyph = self[char] = self.glyphs_by_code[self.glyph_id(char)]
+        return glyph
+
+
+class KerningMatrix(dict):
+    """Kerning values for pairs of glyphs, indexed by glyph ID
+
+    Maps the ID of the first glyph in a pair to a row holding the kerning
+    values for each second glyph. A row is computed from the GPOS pair
+    adjustment subtables and the kern table's pairs when its glyph first
+    occurs as the first glyph of a pair, so that rows are only stored for the
+    glyphs used in the document. Looking up the kerning for a pair then boils
+    down to indexing two arrays."""
+
+    #: fonts with more glyphs look up the kerning for each pair instead
+    MAX_GLYPHS = 4096
+
+    def __init__(self, num_glyphs, subtables, kern_pairs=None):
+        super().__init__()
+        self.num_glyphs = num_glyphs
+        self.subtables = subtables
+        self.kern_pairs = kern_pairs or {}
+
+    def __missing__(self, a_id):
+        row = [None] * self.num_glyphs
+        for subtable in self.subtables:
+            subtable.fill_kerning_row(a_id, row)
+        for b_id, value in self.kern_pairs.get(a_id, {}).items():
+            if b_id < len(row) and row[b_id] is None:
+                row[b_id] = value
+        kerning_row = self[a_id] = array('d', (0.0 if value is None else value
+                                              for value in row))
+        return kerning_row
+
+
+def lookup_subtables(lookup_table, subtable_type):
+    """The subtables of type `subtable_type` in `lookup_table`
+
+    The subtables of extension lookups are unwrapped."""
+    for subtable in lookup_table['SubTable']:
+        subtable = getattr(subtable, 'subtable', subtable)    # extension
+        if isinstance(subtable, subtable_type):
+            yield subtable
+
+
+class OpenTypeShapingPlan(ShapingPlan):
+    """The lookups of a set of OpenType features, resolved once
+
+    The lookups of the enabled features (including the feature selected by
+    the font variant) are looked up in the GSUB and GPOS tables' feature lists
+    for the script and language system when the plan is created. Their
+    subtables are ordered as in the lookup lists and grouped by the type of
+    lookup:
+
+    - single substitutions (GSUB type 1) are applied in turn to each glyph
+    - the first matching ligature substitution (GSUB type 4) forms a ligature
+    - pair adjustments (GPOS type 2) and the kern table's pairs (when the
+      'kern' feature is enabled) provide the kerning
+
+    Other lookup types are not supported by the text layout and are ignored.
+
+    """
+
+    def __init__(self, font, variant, features, script, language):
+        super().__init__(font, variant, features)
+        gsub_features = set(features)
+        if variant in font._VARIANTS:
+            gsub_features.add(font._VARIANTS[variant])
+        self._substitutions = []    # a list of subtables for each lookup
+        self._ligatures = []
+        for lookup_table in font._get_feature_lookups('GSUB', gsub_features,
+                                                      script, language):
+            substitutions = list(lookup_subtables(lookup_table,
+                                                  SingleSubTable))
+            if substitutions:
+                self._substitutions.append(substitutions)
+            self._ligatures.extend(lookup_subtables(lookup_table,
+                                                    LigatureSubTable))
+        self._pair_adjustments = [subtable
+                                  for lookup_table
+                                  in font._get_feature_lookups('GPOS',
+                                                               features,
+                                                               script,
+                                                               language)
+                                  for subtable
+                                  in lookup_subtables(lookup_table,
+                                                      PairAdjustmentSubtable)]
+        self._kern_pairs = (font['kern'][0].pairs
+                            if ('kern' in features and 'kern' in font
+                                and 0 in font['kern']) else {})
+        num_glyphs = len(font._glyphs_by_code.widths)
+        self._kerning_matrix = (KerningMatrix(num_glyphs,
+                                              self._pair_adjustments,
+                                              self._kern_pairs)
+                                if num_glyphs <= KerningMatrix.MAX_GLYPHS
+                                else None)
+
+    @cached
+    def get_glyph_metrics(self, char):
+        glyph = self.font._get_glyph(char)
+        code = glyph.code
+        for substitutions in self._substitutions:
+            for subtable in substitutions:
+                try:
+                    code = subtable.lookup(code)
+                    break
+                except KeyError:
+                    pass
+        return self.font._glyphs_by_code[code] if code != glyph.code else glyph
+
+    @cached
+    def get_ligature(self, glyph, successor_glyph):
+        for subtable in self._ligatures:
+            try:
+                code = subtable.lookup(glyph.code, successor_glyph.code)
+                return self.font._glyphs_by_code[code]
+            except KeyError:
+                pass
+        return None
+
+    def get_kerning(self, a, b):
+        if self._kerning_matrix is not None:
+            return self._kerning_matrix[a.code][b.code]
+        return self._lookup_kerning(a, b)
+
+    @cached
+    def _lookup_kerning(self, a, b):
+        for subtable in self._pair_adjustments:
+            try:
+                return subtable.lookup(a.code, b.code)
+            except KeyError:
+                pass
+        try:
+            return self._kern_pairs[a.code][b.code]
+        except KeyError:
+            return 0.0
+
+
 class OpenTypeFont(Font, OpenTypeParser):
     units_per_em = LeafGetter('head', 'unitsPerEm')
     encoding = None
@@ -40,8 +244,12 @@ class OpenTypeFont(Font, OpenTypeParser):
     x_height = LeafGetter('OS/2', 'sxHeight')
     stem_v = 50
 
-    def __init__(self, filename, weight=None, slant=None, width=None):
-        OpenTypeParser.__init__(self, filename)
+    def __init__(self, filename, weight=None, slant=None, width=None,
+                 verify_checksums=False):
+        self.arguments = ((filename, ),
+                          dict(weight=weight, slant=slant, width=width,
+                               verify_checksums=verify_checksums))
+        OpenTypeParser.__init__(self, filename, verify_checksums)
         slant_ = (self['OS/2'].oblique and FontSlant.OBLIQUE
                   or self['OS/2'].italic and FontSlant.ITALIC
                   or FontSlant.UPRIGHT)
@@ -51,9 +259,14 @@ class OpenTypeFont(Font, OpenTypeParser):
         width = self._check('width', width, self['OS/2']['usWidthClass'],
                             FontWidth.to_name)
         super().__init__(filename, weight, slant, width)
-        self._glyphs_by_code = self._create_glyph_metrics()
-        self._encoding, self._glyphs = \
-            self._create_glyphs_by_char(self._glyphs_by_code)
+        data = (self._file.getbuffer() if isinstance(self._file, BytesIO)
+                else self._file)
+        metrics = font_metrics(data, 'otf', self._derive_metrics)
+        self._glyphs_by_code = OpenTypeGlyphMetricsTable(self,
+                                                         metrics['widths'])
+        self._encoding = metrics['encoding']
+        self._glyphs = CharacterMap(metrics['ordinals'], metrics['glyph_ids'],
+                                    self._glyphs_by_code)
         self._suffixes = {}
         self._ligatures = {}
         self._kerning_pairs = {}
@@ -67,64 +280,57 @@ class OpenTypeFont(Font, OpenTypeParser):
             return specified
         return determined
 
-    def _create_glyph_metrics(self):
-        glyphs_by_code = {}
-        # TODO: extract bboxes from CFF: www.tug.org/TUGboat/tb24-3/bella.pdf
-        advance_width_table = self['hmtx']['advanceWidth']
-        glyf_table = self['glyf'] if 'glyf' in self else None
-        for glyph_index, width in enumerate(advance_width_table):
-            bbox = (glyf_table[glyph_index].bounding_box
-                    if glyf_table and glyph_index in glyf_table
-                    else None)
-            glyph_metrics = GlyphMetrics(None, width, bbox, glyph_index)
-            glyphs_by_code[glyph_index] = glyph_metrics
-        return glyphs_by_code
-
-    def _create_glyphs_by_char(self, glyphs_by_code):
+    def _derive_metrics(self):
+        """The metrics derived from the font file (see :mod:`.font.cache`)"""
+        widths = array('H', self['hmtx']['advanceWidth'])
+        encoding, mapping = self._create_character_mapping(len(widths))
+        ordinals = sorted(mapping)
+        return dict(widths=widths, encoding=encoding,
+                    ordinals=array('L', ordinals),
+                    glyph_ids=array('H', (mapping[ordinal]
+                                          for ordinal in ordinals)))
+
+    def _create_character_mapping(self, num_glyphs):
         # TODO: properly handle encodings
-        glyphs_by_char = {}
+        mapping = {}
         cmap_tables = self['cmap']
         for encoding in [UNICODE_20_FULL, WINDOWS_UNICODE_FULL,
                          UNICODE_20_BMP, WINDOWS_UNICODE_BMP, UNICODE_ISO,
                          UNICODE_11, UNICODE_10, WINDOWS_SYMBOL]:
             try:
                 for ordinal, index in cmap_tables[encoding].mapping.items():
-                    glyphs_by_char[chr(ordinal)] = glyphs_by_code[index]
+                    if index >= num_glyphs:
+                        raise KeyError(index)
+                    mapping[ordinal] = index
                 break
             except KeyError:
                 continue
-        if encoding == WINDOWS_SYMBOL and ' ' not in glyphs_by_char:
+        if encoding == WINDOWS_SYMBOL and ord(' ') not in mapping:
             first_char_index = self['OS/2']['usFirstCharIndex']
-            index = cmap_tables[encoding].mapping[first_char_index]
-            glyphs_by_char[' '] = glyphs_by_code[index]
-        if not glyphs_by_char:
+            mapping[ord(' ')] = cmap_tables[encoding].mapping[first_char_index]
+        if not mapping:
             raise Exception
-        return encoding, glyphs_by_char
+        return encoding, mapping
 
     _VARIANTS = {FontVariant.SMALL_CAPITAL: 'smcp',
                  FontVariant.OLDSTYLE_FIGURES: 'onum'}
 
-    def get_glyph_metrics(self, char, variant):
+    @cached
+    def _get_shaping_plan(self, variant, features, script, language):
+        return OpenTypeShapingPlan(self, variant, features, script, language)
+
+    def _get_glyph(self, char):
         try:
-            glyph = self._glyphs[char]
+            return self._glyphs[char]
         except KeyError:
             warn('{} does not contain glyph for unicode index 0x{:04x} ({})'
                  .format(self.name, ord(char), char), RinohWarning)
             raise MissingGlyphException(char)
 
-        if variant in self._VARIANTS and 'GSUB' in self:
-            feature = self._VARIANTS[variant]
-            lookup_tables = self._get_lookup_tables('GSUB', feature, 'latn')
-            for lookup_table in lookup_tables:
-                try:
-                    code = lookup_table.lookup(glyph.code)
-                    return self._glyphs_by_code[code]
-                except KeyError:
-                    pass
-        return glyph
+    def get_glyph_metrics(self, char, variant):
+        return self.get_shaping_plan(variant).get_glyph_metrics(char)
 
-    def _get_lookup_tables(self, table, feature, script='DFLT', language=None):
-        lookup_tables = self[table]['LookupList']['Lookup']
+    def _get_lang_sys_table(self, table, script, language):
         try:
             script_table = self[table]['ScriptList'].by_tag[script][0]
         except KeyError:
@@ -132,59 +338,49 @@ class OpenTypeFont(Font, OpenTypeParser):
                 warn(f'{self.name} does not support the script "{script}". '
                      'Trying default script.', RinohWarning)
                 try:
-                    return self._get_lookup_tables(table, feature)
+                    return self._get_lang_sys_table(table, 'DFLT', None)
                 except KeyError:
-                    return []
+                    return None
             else:
                 warn(f'{self.name} has no default script defined.', RinohWarning)
                 raise
         if language:
             try:
-                lang_sys_table = script_table.by_tag[language][0]
+                return script_table.by_tag[language][0]
             except KeyError:
                 warn(f'{self.name} does not support the language "{language}". '
                      'Falling back to defaults.', RinohWarning)
-                lang_sys_table = script_table['DefaultLangSys']
-        else:
-            lang_sys_table = script_table['DefaultLangSys']
-        feature_indices = lang_sys_table['FeatureIndex']
-        for index in feature_indices:
-            record = self[table]['FeatureList']['Record'][index]
-            if record['Tag'] == feature:
-                lookup_list_indices = record['Value']['LookupListIndex']
-                return [lookup_tables[lookup_list_index]
-                        for lookup_list_index in lookup_list_indices]
-        return []
+        return script_table['DefaultLangSys']
+
+    def _get_feature_lookups(self, table, features, script='DFLT',
+                             language=None):
+        """The lookup tables of `features` for the script and language
+
+        The lookup tables are returned in lookup list order, which determines
+        the order in which they are applied."""
+        if table not in self:
+            return []
+        lang_sys_table = self._get_lang_sys_table(table, script, language)
+        if lang_sys_table is None:
+            return []
+        feature_records = self[table]['FeatureList']['Record']
+        lookup_indices = set()
+        for index in lang_sys_table['FeatureIndex']:
+            record = feature_records[index]
+            if record['Tag'] in features:
+                lookup_indices.update(record['Value']['LookupListIndex'])
+        lookup_tables = self[table]['LookupList']['Lookup']
+        return [lookup_tables[index] for index in sorted(lookup_indices)]
+
+    def _get_lookup_tables(self, table, feature, script='DFLT', language=None):
+        return self._get_feature_lookups(table, (feature, ), script, language)
 
-    @cached
     def get_ligature(self, glyph, successor_glyph):
-        if 'GSUB' in self:
-            lookup_tables = self._get_lookup_tables('GSUB', 'liga', 'latn')
-            for lookup_table in lookup_tables:
-                try:
-                    code = lookup_table.lookup(glyph.code, successor_glyph.code)
-                    return self._glyphs_by_code[code]
-                except KeyError:
-                    pass
-        return None
+        plan = self.get_shaping_plan()
+        return plan.get_ligature(glyph, successor_glyph)
 
-    @cached
     def get_kerning(self, a, b):
-        if 'GPOS' in self:
-            lookup_tables = self._get_lookup_tables('GPOS', 'kern', 'latn')
-            # TODO: 'kern' lookup list indices can point to pair adjustment (2)
-            #       or Chained Context positioning (8) lookup subtables
-            for lookup_table in lookup_tables:
-                try:
-                    return lookup_table.lookup(a.code, b.code)
-                except KeyError:
-                    pass
-        if 'kern' in self:
-            try:
-                return self['kern'][0].pairs[a.code][b.code]
-            except KeyError:
-                pass
-        return 0.0
+        return self.get_shaping_plan().get_kerning(a, b)
 
 
 # Platform/Encoding IDs
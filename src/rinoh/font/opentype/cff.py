@@ -145,7 +145,17 @@ class TopDict(Dict):
                  (12, 20): Operator('SyntheticBase', number), # synthetic base font index
                  (12, 21): Operator('PostScript', sid), # embedded PostScript language code
                  (12, 22): Operator('BaseFontName', sid), # (added as needed by Adobe-based technology)
-                 (12, 23): Operator('BaseFontBlend', delta)} # (added as needed by Adobe-based technology)
+                 (12, 23): Operator('BaseFontBlend', delta), # (added as needed by Adobe-based technology)
+                 # CIDFont operator extensions
+                 (12, 30): Operator('ROS', array),
+                 (12, 31): Operator('CIDFontVersion', number, 0),
+                 (12, 32): Operator('CIDFontRevision', number, 0),
+                 (12, 33): Operator('CIDFontType', number, 0),
+                 (12, 34): Operator('CIDCount', number, 8720),
+                 (12, 35): Operator('UIDBase', number),
+                 (12, 36): Operator('FDArray', number), # Font DICT INDEX offset
+                 (12, 37): Operator('FDSelect', number), # FDSelect offset
+                 (12, 38): Operator('FontName', sid)}
 
 
 class Index(list):
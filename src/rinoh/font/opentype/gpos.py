@@ -12,7 +12,7 @@ from .parse import OpenTypeTable, MultiFormatTable, Record
 from .parse import int16, uint16, ushort, ulong, Packed
 from .parse import array, context, context_array, indirect, indirect_array
 from .layout import LayoutTable, Coverage, ClassDefinition, Device
-from ...util import cached_property
+from ...util import cached, cached_property
 
 
 class ValueFormat(Packed):
@@ -180,6 +180,41 @@ class PairAdjustmentSubtable(MultiFormatTable):
             class_2_record = self['Class1Record'][a_class][b_class]
             return class_2_record['Value1']['XAdvance']
 
+    @cached
+    def _second_classes(self, num_glyphs):
+        """The class (ClassDef2) of each glyph ID in the font"""
+        class_number = self['ClassDef2'].class_number
+        return [class_number(glyph_id) for glyph_id in range(num_glyphs)]
+
+    def fill_kerning_row(self, a_id, row):
+        """Fill in the kerning for the pairs starting with glyph `a_id`
+
+        `row` is indexed by the second glyph's ID. Only the entries that are
+        ``None`` (not set by a preceding subtable) are filled in, so that the
+        result matches that of calling :meth:`lookup` for each pair."""
+        if self['PosFormat'] == 1:
+            try:
+                index = self['Coverage'].index(a_id)
+            except ValueError:
+                return
+            pair_set = self['PairSet'][index]
+            for b_id, pair_value_record in pair_set.by_second_glyph_id.items():
+                value_1 = pair_value_record['Value1']
+                if (b_id < len(row) and row[b_id] is None
+                        and 'XAdvance' in value_1):
+                    row[b_id] = value_1['XAdvance']
+        elif self['PosFormat'] == 2:
+            if not self['ValueFormat1']['XAdvance']:
+                return
+            a_class = self['ClassDef1'].class_number(a_id)
+            class_2_records = self['Class1Record'][a_class]
+            class_2_values = [class_2_record['Value1']['XAdvance']
+                              for class_2_record in class_2_records]
+            values = map(class_2_values.__getitem__,
+                         self._second_classes(len(row)))
+            row[:] = [value if current is None else current
+                      for current, value in zip(row, values)]
+
 
 class EntryExitRecord(OpenTypeTable):
     entries = [('EntryAnchor', indirect(Anchor)),
@@ -267,6 +302,11 @@ class ExtensionPositioning(OpenTypeTable):
     def lookup(self, *args, **kwargs):
         return self.subtable.lookup(*args, **kwargs)
 
+    def fill_kerning_row(self, a_id, row):
+        fill_kerning_row = getattr(self.subtable, 'fill_kerning_row', None)
+        if fill_kerning_row:
+            fill_kerning_row(a_id, row)
+
 
 class GposTable(LayoutTable):
     """Glyph positioning table"""
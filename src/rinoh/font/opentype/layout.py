@@ -6,8 +6,12 @@
 # Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
 
 
+from array import array as Array
+from bisect import bisect_right
+
 from .parse import OpenTypeTable, MultiFormatTable, Record, context_array
 from .parse import fixed, array, uint16, tag, glyph_id, offset, indirect, Packed
+from ...util import cached_property
 
 
 class ListRecord(Record):
@@ -76,6 +80,54 @@ class LookupFlag(Packed):
               ('MarkAttachmentType', 0xFF00, int)]
 
 
+class GlyphRanges(object):
+    """Looks up the value associated with a glyph ID in a set of glyph ranges
+
+    If the ranges span few glyph IDs, they are expanded into a dense array.
+    Otherwise, the range containing a glyph ID is found by bisection.
+
+    Args:
+        records (list): (start, end, value) tuples; the value for a glyph ID in
+            a range is `value` plus the offset of the glyph ID in the range if
+            `increment` is set, or `value` itself otherwise
+
+    """
+
+    DENSE_LIMIT = 4096
+    MISSING = -1
+
+    def __init__(self, records, increment=False):
+        self.increment = increment
+        self.first = min((start for start, _, _ in records), default=0)
+        last = max((end for _, end, _ in records), default=-1)
+        if last - self.first < self.DENSE_LIMIT:
+            dense = Array('l', [self.MISSING]) * (last - self.first + 1)
+            for start, end, value in reversed(records):  # first record wins
+                for glyph_id in range(start, end + 1):
+                    dense[glyph_id - self.first] = (value + glyph_id - start
+                                                    if increment else value)
+            self.dense = dense
+        else:
+            self.dense = None
+            self.records = sorted(records)
+            self.starts = [start for start, _, _ in self.records]
+
+    def get(self, glyph_id, default=None):
+        if self.dense is not None:
+            index = glyph_id - self.first
+            if 0 <= index < len(self.dense):
+                value = self.dense[index]
+                if value != self.MISSING:
+                    return value
+            return default
+        index = bisect_right(self.starts, glyph_id) - 1
+        if index >= 0:
+            start, end, value = self.records[index]
+            if glyph_id <= end:
+                return value + glyph_id - start if self.increment else value
+        return default
+
+
 class RangeRecord(OpenTypeTable):
     entries = [('Start', glyph_id),
                ('End', glyph_id),
@@ -89,15 +141,23 @@ class Coverage(MultiFormatTable):
                2: [('RangeCount', uint16),
                    ('RangeRecord', context_array(RangeRecord, 'RangeCount'))]}
 
-    def index(self, glyph_id):
+    @cached_property
+    def _indices(self):
+        """Maps glyph IDs to coverage indices (built on first lookup)"""
         if self['CoverageFormat'] == 1:
-            return self['GlyphArray'].index(glyph_id)
-        else:
-            for record in self['RangeRecord']:
-                if record['Start'] <= glyph_id <= record['End']:
-                    return (record['StartCoverageIndex']
-                            + glyph_id - record['Start'])
+            return {glyph_id: index
+                    for index, glyph_id in reversed(list(enumerate(
+                        self['GlyphArray'])))}
+        return GlyphRanges([(record['Start'], record['End'],
+                             record['StartCoverageIndex'])
+                            for record in self['RangeRecord']],
+                           increment=True)
+
+    def index(self, glyph_id):
+        index = self._indices.get(glyph_id)
+        if index is None:
             raise ValueError
+        return index
 
 
 class ClassRangeRecord(OpenTypeTable):
@@ -115,16 +175,19 @@ class ClassDefinition(MultiFormatTable):
                    ('ClassRangeRecord', context_array(ClassRangeRecord,
                                                       'ClassRangeCount'))]}
 
+    @cached_property
+    def _ranges(self):
+        """Index of the class ranges (built on first lookup)"""
+        return GlyphRanges([(record['Start'], record['End'], record['Class'])
+                            for record in self['ClassRangeRecord']])
+
     def class_number(self, glyph_id):
         if self['ClassFormat'] == 1:
             index = glyph_id - self['StartGlyph']
             if 0 <= index < self['GlyphCount']:
                 return self['ClassValueArray'][index]
-        else:
-            for record in self['ClassRangeRecord']:
-                if record['Start'] <= glyph_id <= record['End']:
-                    return record['Class']
-        return 0
+            return 0
+        return self._ranges.get(glyph_id, 0)
 
 
 def subtables(subtable_type, file, file_offset, offsets):
@@ -6,7 +6,7 @@
 # Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
 
 
-import math, io, struct
+import io, mmap, struct
 
 from datetime import datetime, timedelta
 from collections import OrderedDict
@@ -14,11 +14,17 @@ from collections import OrderedDict
 from ...util import all_subclasses
 
 
-def create_reader(data_format, process_struct=lambda data: data[0]):
+def first_item(data):
+    return data[0]
+
+
+def create_reader(data_format, process_struct=first_item):
     data_struct = struct.Struct('>' + data_format)
     def reader(file, **kwargs):
         data = data_struct.unpack(file.read(data_struct.size))
         return process_struct(data)
+    # arrays of plain values are unpacked in one go (see array)
+    reader.data_format = data_format if process_struct is first_item else None
     return reader
 
 
@@ -56,6 +62,12 @@ class Packed(OrderedDict):
 
 
 def array(reader, length):
+    data_format = getattr(reader, 'data_format', None)
+    if data_format:
+        data_struct = struct.Struct('>{}{}'.format(length, data_format))
+        def array_reader(file, **kwargs):
+            return list(data_struct.unpack(file.read(data_struct.size)))
+        return array_reader
     def array_reader(file, **kwargs):
         return [reader(file, **kwargs) for _ in range(length)]
     return array_reader
@@ -158,14 +170,14 @@ class TableRecord(OpenTypeTable):
                ('length', ulong)]
 
     def check_sum(self, file):
-        total = 0
         table_offset = self['offset']
+        length = self['length']
         file.seek(table_offset)
-        end_of_data = table_offset + 4 * math.ceil(self['length'] / 4)
-        while file.tell() < end_of_data:
-            value = ulong(file)
-            if not (self['tag'] == 'head' and file.tell() == table_offset + 12):
-                total += value
+        data = file.read(length) + bytes(-length % 4)   # pad to 4-byte units
+        values = struct.unpack('>{}L'.format(len(data) // 4), data)
+        total = sum(values)
+        if self['tag'] == 'head':   # skip checkSumAdjustment
+            total -= values[2]
         checksum = total % 2**32
         assert checksum == self['checkSum']
 
@@ -176,38 +188,69 @@ from . import truetype, gpos, gsub, other
 
 
 class OpenTypeParser(dict):
-    def __init__(self, filename):
-        disk_file = open(filename, 'rb')
-        file = io.BytesIO(disk_file.read())
-        disk_file.close()
+    """Maps OpenType table tags to the parsed tables
+
+    The font file is mapped into memory and the table directory is read on
+    initialization. The tables themselves are only parsed when they are first
+    accessed. The table checksums are verified only if `verify_checksums` is
+    set.
+
+    """
+
+    REQUIRED_TABLES = ('head', 'hhea', 'cmap', 'maxp', 'name', 'post', 'OS/2',
+                       'hmtx')
+    OPTIONAL_TABLES = ('kern', 'GPOS', 'GSUB')
+
+    def __init__(self, filename, verify_checksums=False):
+        super().__init__()
+        self._file = file = self._map_file(filename)
         offset_table = OffsetTable(file)
         table_records = OrderedDict()
         for i in range(offset_table['numTables']):
             record = TableRecord(file)
             table_records[record['tag']] = record
-        for tag, record in table_records.items():
-            record.check_sum(file)
-
-        for tag in ('head', 'hhea', 'cmap', 'maxp', 'name', 'post', 'OS/2'):
-            self[tag] = self._parse_table(file, table_records[tag])
-
-        self['hmtx'] = HmtxTable(file, table_records['hmtx']['offset'],
-                                 self['hhea']['numberOfHMetrics'],
-                                 self['maxp']['numGlyphs'])
-        try:
-            self['CFF'] = CompactFontFormat(file,
-                                            table_records['CFF']['offset'])
-        except KeyError:
-            self['loca'] = truetype.LocaTable(file,
-                                              table_records['loca']['offset'],
-                                              self['head']['indexToLocFormat'],
-                                              self['maxp']['numGlyphs'])
-            self['glyf'] = truetype.GlyfTable(file,
-                                              table_records['glyf']['offset'],
-                                              self['loca'])
-        for tag in ('kern', 'GPOS', 'GSUB'):
-            if tag in table_records:
-                self[tag] = self._parse_table(file, table_records[tag])
+        if verify_checksums:
+            for tag, record in table_records.items():
+                record.check_sum(file)
+        self._table_records = table_records
+        outline_tables = (('CFF', ) if 'CFF' in table_records
+                          else ('loca', 'glyf'))
+        optional_tables = [tag for tag in self.OPTIONAL_TABLES
+                           if tag in table_records]
+        self._available_tables = set(self.REQUIRED_TABLES + outline_tables
+                                     + tuple(optional_tables))
+
+    @staticmethod
+    def _map_file(filename):
+        with open(filename, 'rb') as disk_file:
+            try:
+                return mmap.mmap(disk_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):   # e.g. an empty file or a pipe
+                return io.BytesIO(disk_file.read())
+
+    def __contains__(self, tag):
+        return tag in self._available_tables
+
+    def __missing__(self, tag):
+        if tag not in self._available_tables:
+            raise KeyError(tag)
+        file, record = self._file, self._table_records[tag]
+        if tag == 'hmtx':
+            table = HmtxTable(file, record['offset'],
+                              self['hhea']['numberOfHMetrics'],
+                              self['maxp']['numGlyphs'])
+        elif tag == 'CFF':
+            table = CompactFontFormat(file, record['offset'])
+        elif tag == 'loca':
+            table = truetype.LocaTable(file, record['offset'],
+                                       self['head']['indexToLocFormat'],
+                                       self['maxp']['numGlyphs'])
+        elif tag == 'glyf':
+            table = truetype.GlyfTable(file, record['offset'], self['loca'])
+        else:
+            table = self._parse_table(file, record)
+        self[tag] = table
+        return table
 
     @staticmethod
     def _parse_table(file, table_record):
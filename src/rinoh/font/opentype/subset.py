@@ -0,0 +1,554 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+"""
+Subsetting of OpenType fonts for embedding
+
+:func:`subset_font` produces an OpenType font file that contains only the
+outlines of the given glyphs. Glyph IDs are preserved, so that the glyph codes
+written to the PDF content streams remain valid: the outlines of the unused
+glyphs are simply left out ('glyf' table) or replaced by an empty charstring
+('CFF ' table). Tables that are not needed for rendering the glyphs (such as
+the advanced typographic tables) are dropped.
+
+"""
+
+
+import struct
+
+from itertools import groupby
+
+
+__all__ = ['subset_font']
+
+
+TRUETYPE_TABLES = ('head', 'hhea', 'hmtx', 'maxp', 'loca', 'glyf', 'cvt ',
+                   'fpgm', 'prep', 'gasp', 'cmap', 'OS/2', 'name', 'post',
+                   'vhea', 'vmtx')
+CFF_TABLES = ('head', 'hhea', 'hmtx', 'maxp', 'CFF ', 'cmap', 'OS/2', 'name',
+              'post', 'vhea', 'vmtx')
+
+
+def subset_font(font, glyph_ids):
+    """Return the data for an OpenType font file containing only the
+    outlines of the glyphs in `glyph_ids`
+
+    Args:
+        font (OpenTypeFont): the font to subset
+        glyph_ids (set[int]): IDs of the glyphs to retain; the .notdef glyph
+            (ID 0) is always retained
+
+    Returns:
+        bytes: the OpenType font data
+
+    """
+    with open(font.filename, 'rb') as file:
+        data = file.read()
+    sfnt_version, tables = read_tables(data)
+    glyph_ids = set(glyph_ids) | {0}
+    if 'CFF ' in tables:
+        keep = CFF_TABLES
+        tables['CFF '] = subset_cff(tables['CFF '], glyph_ids)
+    else:
+        keep = TRUETYPE_TABLES
+        glyph_ids = glyf_closure(tables, glyph_ids)
+        subset_glyf(tables, glyph_ids)
+    subset_hmtx(tables, glyph_ids)
+    mapping = font['cmap'][font._encoding].mapping
+    tables['cmap'] = build_cmap({code: glyph_id
+                                 for code, glyph_id in mapping.items()
+                                 if glyph_id in glyph_ids})
+    tables['post'] = strip_post(tables['post'])
+    return write_tables(sfnt_version, {tag: table
+                                       for tag, table in tables.items()
+                                       if tag in keep})
+
+
+# sfnt container
+
+def read_tables(data):
+    """Return the sfnt version and a dictionary mapping table tags to the
+    table data"""
+    sfnt_version, num_tables = struct.unpack_from('>4sH', data)
+    tables = {}
+    for index in range(num_tables):
+        tag, _, offset, length = struct.unpack_from('>4sLLL', data,
+                                                    12 + 16 * index)
+        tables[tag.decode('latin-1')] = data[offset:offset + length]
+    return sfnt_version, tables
+
+
+def check_sum(data):
+    padded = data + b'\0' * (-len(data) % 4)
+    return sum(struct.unpack('>{}L'.format(len(padded) // 4),
+                             padded)) & 0xFFFFFFFF
+
+
+def write_tables(sfnt_version, tables):
+    """Assemble an sfnt font file from the table data in `tables`"""
+    num_tables = len(tables)
+    entry_selector = num_tables.bit_length() - 1
+    search_range = 16 * 2 ** entry_selector
+    header = struct.pack('>4sHHHH', sfnt_version, num_tables, search_range,
+                         entry_selector, num_tables * 16 - search_range)
+    head = bytearray(tables['head'])
+    head[8:12] = bytes(4)               # checkSumAdjustment
+    tables['head'] = bytes(head)
+    directory = bytearray()
+    body = bytearray()
+    offset = len(header) + 16 * num_tables
+    head_offset = None
+    for tag in sorted(tables):
+        table = tables[tag]
+        if tag == 'head':
+            head_offset = offset + len(body)
+        directory += struct.pack('>4sLLL', tag.encode('latin-1'),
+                                 check_sum(table), offset + len(body),
+                                 len(table))
+        body += table + b'\0' * (-len(table) % 4)
+    font_data = bytearray(header + directory + body)
+    adjustment = (0xB1B0AFBA - check_sum(bytes(font_data))) & 0xFFFFFFFF
+    font_data[head_offset + 8:head_offset + 12] = struct.pack('>L', adjustment)
+    return bytes(font_data)
+
+
+# TrueType outlines
+
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+def read_loca(tables):
+    num_glyphs, = struct.unpack_from('>H', tables['maxp'], 4)
+    index_to_loc_format, = struct.unpack_from('>h', tables['head'], 50)
+    if index_to_loc_format == 0:
+        offsets = struct.unpack_from('>{}H'.format(num_glyphs + 1),
+                                     tables['loca'])
+        return [offset * 2 for offset in offsets]
+    return list(struct.unpack_from('>{}L'.format(num_glyphs + 1),
+                                   tables['loca']))
+
+
+def composite_glyph_components(glyph):
+    """Yield the IDs of the component glyphs of a composite glyph"""
+    position = 10       # skip the glyph header
+    while True:
+        flags, glyph_id = struct.unpack_from('>HH', glyph, position)
+        yield glyph_id
+        position += 4 + (4 if flags & ARG_1_AND_2_ARE_WORDS else 2)
+        if flags & WE_HAVE_A_SCALE:
+            position += 2
+        elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+            position += 4
+        elif flags & WE_HAVE_A_TWO_BY_TWO:
+            position += 8
+        if not flags & MORE_COMPONENTS:
+            break
+
+
+def glyf_closure(tables, glyph_ids):
+    """Extend `glyph_ids` with the components of composite glyphs"""
+    glyf, offsets = tables['glyf'], read_loca(tables)
+    closure = set()
+    to_check = [glyph_id for glyph_id in glyph_ids
+                if glyph_id < len(offsets) - 1]
+    while to_check:
+        glyph_id = to_check.pop()
+        if glyph_id in closure:
+            continue
+        closure.add(glyph_id)
+        glyph = glyf[offsets[glyph_id]:offsets[glyph_id + 1]]
+        if glyph:
+            number_of_contours, = struct.unpack_from('>h', glyph)
+            if number_of_contours < 0:
+                to_check.extend(composite_glyph_components(glyph))
+    return closure
+
+
+def subset_glyf(tables, glyph_ids):
+    """Replace the 'glyf' and 'loca' tables with ones that only contain the
+    outlines for `glyph_ids`"""
+    glyf, offsets = tables['glyf'], read_loca(tables)
+    new_glyf = bytearray()
+    new_offsets = []
+    for glyph_id in range(len(offsets) - 1):
+        new_offsets.append(len(new_glyf))
+        if glyph_id in glyph_ids:
+            glyph = glyf[offsets[glyph_id]:offsets[glyph_id + 1]]
+            new_glyf += glyph + b'\0' * (-len(glyph) % 4)
+    new_offsets.append(len(new_glyf))
+    head = bytearray(tables['head'])
+    if len(new_glyf) < 0x20000:
+        loca = struct.pack('>{}H'.format(len(new_offsets)),
+                           *(offset // 2 for offset in new_offsets))
+        head[50:52] = struct.pack('>h', 0)
+    else:
+        loca = struct.pack('>{}L'.format(len(new_offsets)), *new_offsets)
+        head[50:52] = struct.pack('>h', 1)
+    tables['head'] = bytes(head)
+    tables['glyf'] = bytes(new_glyf)
+    tables['loca'] = loca
+
+
+def subset_hmtx(tables, glyph_ids):
+    """Zero the horizontal metrics of the glyphs not in `glyph_ids`
+
+    The PDF file specifies the glyph widths, so the metrics of the unused
+    glyphs are never looked up; zeroing them makes the table compress well.
+
+    """
+    number_of_h_metrics, = struct.unpack_from('>H', tables['hhea'], 34)
+    num_glyphs, = struct.unpack_from('>H', tables['maxp'], 4)
+    hmtx = bytearray(tables['hmtx'])
+    for glyph_id in range(num_glyphs):
+        if glyph_id in glyph_ids:
+            continue
+        if glyph_id < number_of_h_metrics:
+            hmtx[4 * glyph_id:4 * glyph_id + 4] = bytes(4)
+        else:
+            offset = 4 * number_of_h_metrics \
+                         + 2 * (glyph_id - number_of_h_metrics)
+            hmtx[offset:offset + 2] = bytes(2)
+    tables['hmtx'] = bytes(hmtx)
+
+
+def strip_post(post):
+    """Return a version 3.0 'post' table, which holds no glyph names"""
+    return struct.pack('>L', 0x00030000) + post[4:32]
+
+
+# character to glyph mapping
+
+def build_cmap(mapping):
+    """Return a 'cmap' table mapping the characters in `mapping` to their
+    glyph IDs
+
+    The table contains a Windows Unicode BMP subtable (format 4) and, when
+    `mapping` includes characters outside of the BMP, a Windows Unicode full
+    repertoire subtable (format 12).
+
+    """
+    bmp = {code: glyph_id for code, glyph_id in mapping.items()
+           if code < 0xFFFF}
+    subtables = [(3, 1, cmap_format_4(bmp))]
+    if any(code > 0xFFFF for code in mapping):
+        subtables.append((3, 10, cmap_format_12(mapping)))
+    cmap = bytearray(struct.pack('>HH', 0, len(subtables)))
+    offset = 4 + 8 * len(subtables)
+    for platform_id, encoding_id, subtable in subtables:
+        cmap += struct.pack('>HHL', platform_id, encoding_id, offset)
+        offset += len(subtable)
+    for _, _, subtable in subtables:
+        cmap += subtable
+    return bytes(cmap)
+
+
+def consecutive_runs(mapping):
+    """Yield `(first code, last code, first glyph ID)` for runs of consecutive
+    codes that map to consecutive glyph IDs"""
+    def key(item):
+        index, (code, glyph_id) = item
+        return code - index, glyph_id - index
+
+    items = sorted(mapping.items())
+    for _, run in groupby(enumerate(items), key):
+        run = [item for _, item in run]
+        yield run[0][0], run[-1][0], run[0][1]
+
+
+def cmap_format_4(mapping):
+    segments = list(consecutive_runs(mapping)) + [(0xFFFF, 0xFFFF, 1)]
+    seg_count = len(segments)
+    entry_selector = seg_count.bit_length() - 1
+    search_range = 2 * 2 ** entry_selector
+    end_codes = [end for _, end, _ in segments]
+    start_codes = [start for start, _, _ in segments]
+    id_deltas = [(glyph_id - start) & 0xFFFF
+                 for start, _, glyph_id in segments]
+    length = 16 + 8 * seg_count
+    return (struct.pack('>7H', 4, length, 0, 2 * seg_count, search_range,
+                        entry_selector, 2 * seg_count - search_range)
+            + struct.pack('>{}H'.format(seg_count), *end_codes)
+            + struct.pack('>H', 0)
+            + struct.pack('>{}H'.format(seg_count), *start_codes)
+            + struct.pack('>{}H'.format(seg_count), *id_deltas)
+            + struct.pack('>{}H'.format(seg_count), *[0] * seg_count))
+
+
+def cmap_format_12(mapping):
+    groups = list(consecutive_runs(mapping))
+    subtable = bytearray(struct.pack('>HHLLL', 12, 0, 16 + 12 * len(groups),
+                                     0, len(groups)))
+    for start, end, glyph_id in groups:
+        subtable += struct.pack('>LLL', start, end, glyph_id)
+    return bytes(subtable)
+
+
+# Compact Font Format (CFF) outlines
+
+ENDCHAR = b'\x0e'
+
+CHARSET = 15
+ENCODING = 16
+CHARSTRINGS = 17
+PRIVATE = 18
+SUBRS = 19
+FDARRAY = (12, 36)
+FDSELECT = (12, 37)
+
+
+def index_end(data, position):
+    """Return the position following the INDEX at `position`"""
+    count, = struct.unpack_from('>H', data, position)
+    if count == 0:
+        return position + 2
+    offset_size = data[position + 2]
+    last_offset = read_offset(data, position + 3 + count * offset_size,
+                              offset_size)
+    return position + 3 + (count + 1) * offset_size + last_offset - 1
+
+
+def read_offset(data, position, offset_size):
+    return int.from_bytes(data[position:position + offset_size], 'big')
+
+
+def read_index(data, position):
+    """Return the list of objects stored in the INDEX at `position`"""
+    count, = struct.unpack_from('>H', data, position)
+    if count == 0:
+        return []
+    offset_size = data[position + 2]
+    offsets = [read_offset(data, position + 3 + index * offset_size,
+                           offset_size)
+               for index in range(count + 1)]
+    data_start = position + 3 + (count + 1) * offset_size - 1
+    return [data[data_start + start:data_start + end]
+            for start, end in zip(offsets, offsets[1:])]
+
+
+def write_index(objects):
+    if not objects:
+        return struct.pack('>H', 0)
+    offsets = [1]
+    for obj in objects:
+        offsets.append(offsets[-1] + len(obj))
+    offset_size = max(1, (offsets[-1].bit_length() + 7) // 8)
+    index = bytearray(struct.pack('>HB', len(objects), offset_size))
+    for offset in offsets:
+        index += offset.to_bytes(offset_size, 'big')
+    for obj in objects:
+        index += obj
+    return bytes(index)
+
+
+def parse_dict(data):
+    """Return a list of `(operator, operands, raw bytes)` tuples for the CFF
+    DICT in `data`"""
+    entries = []
+    operands = []
+    start = position = 0
+    while position < len(data):
+        b0 = data[position]
+        if b0 <= 21:
+            if b0 == 12:
+                operator = (12, data[position + 1])
+                position += 2
+            else:
+                operator = b0
+                position += 1
+            entries.append((operator, operands, data[start:position]))
+            operands = []
+            start = position
+        elif b0 == 28:
+            operands.append(struct.unpack_from('>h', data, position + 1)[0])
+            position += 3
+        elif b0 == 29:
+            operands.append(struct.unpack_from('>l', data, position + 1)[0])
+            position += 5
+        elif b0 == 30:      # real number; skip the nibbles
+            position += 1
+            while (data[position] & 0x0F) != 0x0F \
+                    and (data[position] >> 4) != 0x0F:
+                position += 1
+            position += 1
+            operands.append(None)
+        elif b0 <= 246:
+            operands.append(b0 - 139)
+            position += 1
+        elif b0 <= 250:
+            operands.append((b0 - 247) * 256 + data[position + 1] + 108)
+            position += 2
+        elif b0 <= 254:
+            operands.append(- (b0 - 251) * 256 - data[position + 1] - 108)
+            position += 2
+        else:
+            raise ValueError('Invalid CFF DICT operand')
+    return entries
+
+
+def encode_operator(operator):
+    return bytes(operator) if isinstance(operator, tuple) else bytes([operator])
+
+
+def write_dict(entries, offsets):
+    """Encode a DICT; the operands for operators in `offsets` are replaced
+    with the given values, encoded as fixed-size integers"""
+    data = bytearray()
+    for operator, operands, raw in entries:
+        if operator in offsets:
+            for value in offsets[operator]:
+                data += b'\x1d' + struct.pack('>l', value)
+            data += encode_operator(operator)
+        else:
+            data += raw
+    return bytes(data)
+
+
+def dict_operands(entries):
+    return {operator: operands for operator, operands, _ in entries}
+
+
+def charset_size(data, offset, num_glyphs):
+    charset_format = data[offset]
+    if charset_format == 0:
+        return 1 + 2 * (num_glyphs - 1)
+    range_size = 3 if charset_format == 1 else 4
+    position = offset + 1
+    remaining = num_glyphs - 1
+    while remaining > 0:
+        n_left = read_offset(data, position + 2, range_size - 2)
+        remaining -= n_left + 1
+        position += range_size
+    return position - offset
+
+
+def encoding_size(data, offset):
+    encoding_format = data[offset]
+    if encoding_format & 0x7F == 0:
+        size = 2 + data[offset + 1]
+    else:
+        size = 2 + 2 * data[offset + 1]
+    if encoding_format & 0x80:      # supplements
+        size += 1 + 3 * data[offset + size]
+    return size
+
+
+def fdselect_size(data, offset, num_glyphs):
+    if data[offset] == 0:
+        return 1 + num_glyphs
+    num_ranges, = struct.unpack_from('>H', data, offset + 1)
+    return 1 + 2 + 3 * num_ranges + 2
+
+
+class PrivateDict(object):
+    """A Private DICT and the local subroutines that follow it"""
+
+    def __init__(self, data, size, offset):
+        entries = parse_dict(data[offset:offset + size])
+        subrs = dict_operands(entries).get(SUBRS)
+        if subrs:
+            subrs_offset = offset + subrs[0]
+            self.subrs = data[subrs_offset:index_end(data, subrs_offset)]
+            dict_size = len(write_dict(entries, {SUBRS: [0]}))
+            self.dict_data = write_dict(entries, {SUBRS: [dict_size]})
+        else:
+            self.subrs = b''
+            self.dict_data = data[offset:offset + size]
+
+    @property
+    def data(self):
+        return self.dict_data + self.subrs
+
+
+def subset_cff(data, glyph_ids):
+    """Return CFF data in which the charstrings of the glyphs not in
+    `glyph_ids` are replaced with an empty charstring
+
+    The layout of the CFF data is rebuilt, copying all other structures.
+
+    """
+    hdr_size = data[2]
+    top_dict_index_start = index_end(data, hdr_size)
+    top_dict, = read_index(data, top_dict_index_start)
+    strings_start = index_end(data, top_dict_index_start)
+    global_subrs_end = index_end(data, index_end(data, strings_start))
+    top_entries = parse_dict(top_dict)
+    top_operands = dict_operands(top_entries)
+    charstrings = read_index(data, top_operands[CHARSTRINGS][0])
+    num_glyphs = len(charstrings)
+
+    # the structures following the Global Subr INDEX, in order
+    parts = []
+    offsets = {}
+    charset_offset = top_operands.get(CHARSET, [0])[0]
+    if charset_offset > 2:      # not a predefined charset
+        size = charset_size(data, charset_offset, num_glyphs)
+        parts.append((CHARSET, data[charset_offset:charset_offset + size]))
+    encoding_offset = top_operands.get(ENCODING, [0])[0]
+    if encoding_offset > 1:     # not a predefined encoding
+        size = encoding_size(data, encoding_offset)
+        parts.append((ENCODING, data[encoding_offset:encoding_offset + size]))
+    if FDSELECT in top_operands:
+        fdselect_offset = top_operands[FDSELECT][0]
+        size = fdselect_size(data, fdselect_offset, num_glyphs)
+        parts.append((FDSELECT, data[fdselect_offset:fdselect_offset + size]))
+    parts.append((CHARSTRINGS,
+                  write_index([charstring if glyph_id in glyph_ids
+                               else ENDCHAR for glyph_id, charstring
+                               in enumerate(charstrings)])))
+    font_dicts = []
+    privates = []
+    if FDARRAY in top_operands:
+        for font_dict in read_index(data, top_operands[FDARRAY][0]):
+            entries = parse_dict(font_dict)
+            size, offset = dict_operands(entries)[PRIVATE]
+            font_dicts.append(entries)
+            privates.append(PrivateDict(data, size, offset))
+        fdarray_size = len(write_index([write_dict(entries, {PRIVATE: [0, 0]})
+                                        for entries in font_dicts]))
+        parts.append((FDARRAY, fdarray_size))
+    if PRIVATE in top_operands:
+        size, offset = top_operands[PRIVATE]
+        privates.append(PrivateDict(data, size, offset))
+
+    top_dict_offsets = {operator: [0] for operator, _ in parts}
+    if PRIVATE in top_operands:
+        top_dict_offsets[PRIVATE] = [0, 0]
+    top_dict_size = len(write_dict(top_entries, top_dict_offsets))
+    position = (top_dict_index_start + len(write_index([bytes(top_dict_size)]))
+                + global_subrs_end - strings_start)
+    for operator, part in parts:
+        offsets[operator] = position
+        position += part if isinstance(part, int) else len(part)
+    private_offsets = []
+    for private in privates:
+        private_offsets.append(position)
+        position += len(private.data)
+
+    top_dict_offsets = {operator: [offsets[operator]]
+                        for operator, _ in parts}
+    if PRIVATE in top_operands:
+        top_dict_offsets[PRIVATE] = [len(privates[-1].dict_data),
+                                     private_offsets[-1]]
+    output = bytearray(data[:top_dict_index_start])
+    output += write_index([write_dict(top_entries, top_dict_offsets)])
+    output += data[strings_start:global_subrs_end]
+    for operator, part in parts:
+        if operator == FDARRAY:
+            part = write_index([write_dict(entries,
+                                           {PRIVATE: [len(private.dict_data),
+                                                      offset]})
+                                for entries, private, offset
+                                in zip(font_dicts, privates, private_offsets)])
+        assert len(output) == offsets[operator]
+        output += part
+    for private in privates:
+        output += private.data
+    return bytes(output)
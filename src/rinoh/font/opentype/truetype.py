@@ -12,16 +12,28 @@ from .parse import OpenTypeTable, MultiFormatTable, short
 
 
 class GlyfTable(OpenTypeTable):
-    """Glyph outline table"""
+    """Glyph outline table
+
+    The glyph headers are only parsed when they are first looked up."""
     tag = 'glyf'
 
     def __init__(self, file, file_offset, loca_table):
         super().__init__(file, file_offset)
+        self._file = file
         self._file_offset = file_offset
-        for index, glyph_offset in enumerate(loca_table.offsets()):
-            if glyph_offset is not None:
-                self[index] = GlyphHeader(file, file_offset + glyph_offset)
-                # the glyph header is followed by the glyph description
+        self._glyph_offsets = list(loca_table.offsets())
+
+    def __contains__(self, index):
+        return (0 <= index < len(self._glyph_offsets)
+                and self._glyph_offsets[index] is not None)
+
+    def __missing__(self, index):
+        if index not in self:
+            raise KeyError(index)
+        glyph_offset = self._file_offset + self._glyph_offsets[index]
+        # the glyph header is followed by the glyph description
+        glyph_header = self[index] = GlyphHeader(self._file, glyph_offset)
+        return glyph_header
 
 
 class GlyphHeader(OpenTypeTable):
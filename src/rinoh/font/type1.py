@@ -11,11 +11,14 @@ import re
 import struct
 
 from binascii import unhexlify
-from io import BytesIO
+from io import BytesIO, StringIO
+from itertools import chain
 from warnings import warn
 
 
-from . import Font, GlyphMetrics, LeafGetter, MissingGlyphException
+from . import (Font, GlyphMetrics, GlyphMetricsTable, LeafGetter,
+               MissingGlyphException)
+from .cache import font_metrics, number_array
 from .mapping import UNICODE_TO_GLYPH_NAME, ENCODINGS
 from ..font.style import FontVariant, FontWeight, FontSlant, FontWidth
 from ..util import cached
@@ -150,6 +153,18 @@ class AdobeFontMetricsParser(dict):
             self._ligatures[name] = ligatures
         return GlyphMetrics(name, width, bbox, code)
 
+    def derived_metrics(self):
+        """The parsed font metrics as plain data (see :mod:`.font.cache`)"""
+        glyphs = list(self._glyphs.values())
+        return dict(sections=dict(self),
+                    names=[glyph.name for glyph in glyphs],
+                    widths=number_array(glyph.width for glyph in glyphs),
+                    codes=number_array(glyph.code for glyph in glyphs),
+                    bounding_boxes=number_array(chain.from_iterable(
+                        glyph.bounding_box for glyph in glyphs)),
+                    ligatures=self._ligatures,
+                    kerning_pairs=self._kerning_pairs)
+
 
 class AdobeFontMetrics(Font, AdobeFontMetricsParser):
     units_per_em = 1000
@@ -168,23 +183,31 @@ class AdobeFontMetrics(Font, AdobeFontMetricsParser):
 
     def __init__(self, file_or_filename, weight, slant, width,
                  unicode_mapping=None):
+        self.arguments = ((file_or_filename, weight, slant, width),
+                          dict(unicode_mapping=unicode_mapping))
         try:
             filename = file_or_filename
-            file = open(file_or_filename, 'rt', encoding='ascii')
-            close_file = True
+            with open(file_or_filename, 'rt', encoding='ascii') as file:
+                text = file.read()
         except TypeError:
             filename = None
-            file = file_or_filename
-            close_file = False
+            text = file_or_filename.read()
         self._suffixes = {FontVariant.NORMAL: ''}
         self._unicode_mapping = unicode_mapping
-        AdobeFontMetricsParser.__init__(self, file)
-        if close_file:
-            file.close()
+        metrics = font_metrics(text.encode('ascii'), 'afm',
+                               lambda: AdobeFontMetricsParser(StringIO(text))
+                                       .derived_metrics())
+        self.update(metrics['sections'])
+        self._glyphs = GlyphMetricsTable(metrics['widths'], metrics['names'],
+                                         metrics['codes'],
+                                         metrics['bounding_boxes'])
+        self._ligatures = metrics['ligatures']
+        self._kerning_pairs = metrics['kerning_pairs']
         if self.encoding_scheme == 'FontSpecific':
-            self.encoding = {glyph.name: glyph.code
-                             for glyph in self._glyphs.values()
-                             if glyph.code > -1}
+            self.encoding = {name: code
+                             for name, code in zip(metrics['names'],
+                                                   metrics['codes'])
+                             if code > -1}
         else:
             self.encoding = ENCODINGS[self.encoding_scheme]
         super().__init__(filename,  weight, slant, width)
@@ -335,6 +358,9 @@ class Type1Font(AdobeFontMetrics):
                  unicode_mapping=None, core=False):
         super().__init__(filename + '.afm', weight, slant, width,
                          unicode_mapping)
+        self.arguments = ((filename, ),
+                          dict(weight=weight, slant=slant, width=width,
+                               unicode_mapping=unicode_mapping, core=core))
         self.core = core
         if not core:
             if os.path.exists(filename + '.pfb'):
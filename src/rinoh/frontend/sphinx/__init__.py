@@ -6,6 +6,8 @@
 # Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
 
 
+import hashlib
+import json
 import os
 import re
 
@@ -25,9 +27,10 @@ from sphinx.util.console import darkgreen
 from sphinx.util.nodes import inline_all_toctrees
 from sphinx.util.osutil import ensuredir, os_path, SEP
 from sphinx.util import logging
+from sphinx.util.parallel import ParallelTasks
 from sphinx.util.i18n import format_date
 
-from rinoh.attribute import Source
+from rinoh.attribute import RuleSet, RuleSetFile, Source
 from rinoh.flowable import StaticGroupedFlowables
 from rinoh.index import IndexSection, IndexLabel, IndexEntry
 from rinoh.language import Language
@@ -110,6 +113,11 @@ class RinohBuilder(Builder, Source):
     format = 'pdf'
     supported_image_types = ['application/pdf', 'image/png', 'image/jpeg']
     supported_remote_images = False
+    allow_parallel = True
+
+    #: file in the output directory recording the inputs each target was
+    #: rendered from, used to skip targets that are up to date
+    BUILD_INFO_FILENAME = '.rinoh-buildinfo'
 
     @property
     def root(self):
@@ -250,22 +258,148 @@ class RinohBuilder(Builder, Source):
                     yield IndexSection(SingleStyledText(index_section_label),
                                        index_flowables(content))
 
-    def write(self, *ignored):
+    def write(self, build_docnames=None, updated_docnames=None,
+              method='update'):
+        """Render the targets listed in `rinoh_documents`
+
+        Unless all targets are to be rebuilt (``-a``), targets for which the
+        inputs (see :meth:`document_signature`) did not change since the last
+        build are skipped. When Sphinx is run with ``-j N``, the targets are
+        rendered in up to N processes.
+
+        """
         variable_removed_warnings(self.config, logger)
         document_data = self.document_data(logger)
+        build_info = self.read_build_info()
+        outdated = []
         for entry in document_data:
-            self.write_document(entry)
+            target = entry['target']
+            signature = self.document_signature(entry)
+            if (method == 'update' and build_info.get(target) == signature
+                    and path.isfile(self.output_filename(target) + '.pdf')):
+                logger.info("%s is up to date", target)
+            else:
+                outdated.append((entry, signature))
+        build_info = {entry['target']: build_info[entry['target']]
+                      for entry in document_data
+                      if entry['target'] in build_info}
+
+        def rendered(entry, signature, success):
+            if success:
+                build_info[entry['target']] = signature
+            else:
+                build_info.pop(entry['target'], None)
+
+        if self.parallel_ok and len(outdated) > 1:
+            tasks = ParallelTasks(self.sphinx_app.parallel)
+            for entry, signature in outdated:
+                tasks.add_task(self._write_document_task, entry,
+                               lambda entry, success, signature=signature:
+                                   rendered(entry, signature, success))
+            tasks.join()
+        else:
+            for entry, signature in outdated:
+                rendered(entry, signature, self.write_document(entry))
+        self.write_build_info(build_info)
+
+    def _write_document_task(self, document_data):
+        """Render a target in a worker process (see :meth:`write`)"""
+        return self.write_document(document_data, show_progress=False)
+
+    def write_document(self, document_data, show_progress=True):
+        """Render the target described by `document_data`
 
-    def write_document(self, document_data):
+        Returns:
+            bool: ``True`` if rendering completed without errors
+
+        """
         data = copy(document_data)
         target = data.pop('target')
         logger.info("processing %s... ", target, nonl=1)
         rinoh_document = self.construct_rinohtype_document(data)
-        outfilename = path.join(self.outdir, os_path(target))
+        rinoh_document.show_progress = show_progress
+        outfilename = self.output_filename(target)
         ensuredir(path.dirname(outfilename))
         logger.info("rendering... ")
-        rinoh_document.render(outfilename)
+        success = rinoh_document.render(outfilename)
         logger.info("done")
+        return success
+
+    @property
+    def sphinx_app(self):
+        try:
+            return self._app    # Sphinx >= 9 deprecates Builder.app
+        except AttributeError:
+            return self.app
+
+    def output_filename(self, target):
+        """The path of the output file for `target`, minus the extension"""
+        return path.join(self.outdir, os_path(target))
+
+    def read_build_info(self):
+        """Return the signatures of the targets rendered in the last build"""
+        try:
+            with open(path.join(self.outdir, self.BUILD_INFO_FILENAME)) as file:
+                build_info = json.load(file)
+        except (OSError, ValueError):   # missing or corrupt build info file
+            return {}
+        if build_info.get('version') != rinoh_version:
+            return {}
+        return build_info.get('targets', {})
+
+    def write_build_info(self, build_info):
+        ensuredir(self.outdir)
+        with open(path.join(self.outdir, self.BUILD_INFO_FILENAME), 'w') as file:
+            json.dump(dict(version=rinoh_version, targets=build_info), file,
+                      indent=2, sort_keys=True)
+
+    def document_signature(self, document_data):
+        """Return a hash of the inputs the target described by
+        `document_data` is rendered from
+
+        These are the `rinoh_documents` entry, the source documents included in
+        the target (as recorded in the Sphinx environment; the time they were
+        last read), the configuration values that end up in the document's
+        metadata and the template configuration and style sheet files (their
+        modification times and sizes). Changes to documents that are not part
+        of the target but affect it, for example the title of a section
+        referenced from the target, are not detected.
+
+        """
+        env = self.env
+        docnames = self.included_docnames(document_data['doc'])
+        template = document_data.get('template', 'book')
+        with logging.suppress_logging():
+            template_configuration = self.template_configuration(template,
+                                                                 logger)
+        stylesheet = template_configuration.get_attribute_value('stylesheet')
+        files = [*rule_set_files(template_configuration),
+                 *rule_set_files(stylesheet)]
+        logo = document_data.get('logo')
+        if logo:
+            files.append(file_key(Path(self.confdir) / logo))
+        metadata = {key: default(self.config)
+                    for key, default in METADATA_DEFAULTS.items()}
+        signature = (rinoh_version,
+                     sorted(document_data.items()),
+                     [(docname, env.all_docs.get(docname))
+                      for docname in sorted(docnames)],
+                     sorted(metadata.items()),
+                     self.config.language,
+                     files)
+        return hashlib.sha256(repr(signature).encode('utf-8')).hexdigest()
+
+    def included_docnames(self, docname):
+        """Return the names of the documents included in the target with root
+        document `docname` through (nested) toctrees"""
+        docnames = set()
+        to_visit = [docname]
+        while to_visit:
+            docname = to_visit.pop()
+            if docname not in docnames:
+                docnames.add(docname)
+                to_visit.extend(self.env.toctree_includes.get(docname, ()))
+        return docnames
 
     def construct_rinohtype_document(self, document_data):
         doc = document_data.pop('doc')
@@ -327,6 +461,24 @@ class RinohBuilder(Builder, Source):
                 rinoh_document.metadata[key] = default(self.config)
 
 
+def file_key(file_path):
+    """Identifies the version of the file at `file_path`"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return str(file_path), None
+    return str(file_path), stat.st_mtime_ns, stat.st_size
+
+
+def rule_set_files(rule_set):
+    """Yield the keys (see :func:`file_key`) of the files `rule_set` and its
+    base rule sets were loaded from"""
+    while isinstance(rule_set, RuleSet):
+        if isinstance(rule_set, RuleSetFile):
+            yield file_key(rule_set.filename)
+        rule_set = rule_set.base
+
+
 METADATA_DEFAULTS = dict(
     title=lambda cfg: '{} documentation'.format(cfg.project),
     subtitle=lambda cfg: '{} {}'.format(_('Release'), cfg.release),
@@ -398,4 +550,5 @@ def setup(app):
     app.add_config_value('rinoh_stylesheet', None, 'html')
     app.add_config_value('rinoh_paper_size', None, 'html')
     return dict(version=rinoh_version,
-                parallel_read_safe=True)
+                parallel_read_safe=True,
+                parallel_write_safe=True)
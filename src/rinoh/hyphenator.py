@@ -18,13 +18,32 @@ License: LGPL. More info: http://python-hyphenator.googlecode.com/
 
 """
 
-import sys
+import hashlib
+import mmap
 import re
+import struct
+import sys
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+from operator import itemgetter
+from pathlib import Path
+
+from .util import LRUCache, atomic_write, cache_dir
 
 __all__ = ("Hyphenator")
 
 # cache of per-file Hyph_dict objects
-hdcache = {}
+HDCACHE_SIZE = 8
+hdcache = LRUCache(HDCACHE_SIZE)
+
+# number of words for which each Hyph_dict caches the hyphenation positions
+WORD_CACHE_SIZE = 4096
+
+# directory holding the compiled pattern tables, named after the hash of the
+# *.dic file they were compiled from
+CACHE_PATH = cache_dir('hyphen')
 
 # precompile some stuff
 parse_hex = re.compile(r'\^{2}([0-9a-f]{2})').sub
@@ -75,15 +94,13 @@ class dint(int):
         return obj
 
 
-class Hyph_dict(object):
+def parse_dic_file(filename):
     """
-    Reads a hyph_*.dic file and stores the hyphenation patterns.
-    Parameters:
-    -filename : filename of hyph_*.dic to read
+    Parses a hyph_*.dic file and returns the hyphenation patterns as a
+    dictionary mapping each pattern's letters to a (start offset, values) tuple.
     """
-    def __init__(self, filename):
-        self.patterns = {}
-        f = open(filename, 'rb')
+    patterns = {}
+    with open(filename, 'rb') as f:
         charset = f.readline().strip().decode('ASCII')
         if charset.startswith('charset '):
             charset = charset[8:].strip()
@@ -106,10 +123,291 @@ class Hyph_dict(object):
             start, end = 0, len(value)
             while not value[start]: start += 1
             while not value[end-1]: end -= 1
-            self.patterns[''.join(tag)] = start, value[start:end]
-        f.close()
-        self.cache = {}
-        self.maxlen = max(map(len, self.patterns.keys()))
+            patterns[''.join(tag)] = start, value[start:end]
+    return patterns
+
+
+class CompiledPatterns(object):
+    """
+    Hyphenation patterns compiled into an Aho-Corasick automaton, stored in a
+    compact binary table.
+    Parameters:
+    -buffer : the compiled table (bytes or a read-only mmap)
+
+    The automaton's states are the nodes of the trie of pattern letters; state
+    0 is the root. The table consists of a header followed by arrays of
+    unsigned ints and a blob holding the pattern values:
+
+      header        : magic, format version, maxlen, flags, number of
+                      patterns (N), number of states (S) and transitions (T)
+      transitions   : S + 1 offsets into the labels/targets arrays
+      fail          : S failure links (state of the longest proper suffix)
+      output        : S indices of the pattern ending in the state, or NONE
+      dict links    : S links to the next state along the failure links that
+                      has an output, or 0 (the root has no output)
+      depth         : S pattern lengths (the depth of the state in the trie)
+      labels        : T code points; sorted for each state
+      targets       : T states
+      value offsets : N + 1 offsets into the values blob
+      values blob   : for each pattern, the start offset and number of values
+                      followed by the values. Values with the high bit set are
+                      followed by nonstandard hyphenation data: index, cut and
+                      the length and UTF-8 encoding of change.
+
+    The integers are stored in native byte order; a table written on a
+    machine with another byte order is rejected by its version check.
+    """
+    MAGIC = b'rinohHYP'
+    VERSION = 2
+    HEADER = struct.Struct('=8sHHHxxIII')
+    ALT = struct.Struct('=bBB')
+    NONE = 0xFFFFFFFF
+
+    # flags
+    NONSTANDARD = 0x1      # some patterns carry nonstandard hyphenation data
+
+    def __init__(self, buffer):
+        if len(buffer) < self.HEADER.size:
+            raise ValueError('Truncated hyphenation pattern table')
+        (magic, version, maxlen, flags,
+         count, num_states, num_trans) = self.HEADER.unpack_from(buffer)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError('Not a compiled hyphenation pattern table '
+                             '(version {})'.format(self.VERSION))
+        self.buffer = buffer
+        self.maxlen = maxlen
+        self.count = count
+        self.nonstandard = bool(flags & self.NONSTANDARD)
+        arrays_size = 4 * (5 * num_states + 1 + 2 * num_trans + count + 1)
+        self._values_start = self.HEADER.size + arrays_size
+        if len(buffer) < self._values_start:
+            raise ValueError('Truncated hyphenation pattern table')
+        view = memoryview(buffer)[self.HEADER.size:self._values_start]
+        arrays = view.cast('I')
+        sizes = (num_states + 1, num_states, num_states, num_states,
+                 num_states, num_trans, num_trans, count + 1)
+        offset = 0
+        slices = []
+        for size in sizes:
+            slices.append(arrays[offset:offset + size])
+            offset += size
+        (self._transitions, self._fail, self._output, self._dict_links,
+         self._depth, self._labels, self._targets,
+         self._value_offsets) = slices
+        if len(buffer) != self._values_start + self._value_offsets[count]:
+            raise ValueError('Truncated hyphenation pattern table')
+        # lazily filled, for each state: a dict mapping characters to the
+        # next state (following the failure links where needed) and the
+        # (shift, values, depth) tuples of the patterns matching in that state
+        self._delta = [None] * num_states
+
+    @classmethod
+    def compile(cls, patterns):
+        """
+        Returns the compiled table (bytes) for a dictionary of patterns as
+        returned by parse_dic_file.
+        """
+        children, output, depth = [{}], [cls.NONE], [0]
+        items = sorted(patterns.items())
+        for index, (key, _) in enumerate(items):
+            state = 0
+            for char in key:
+                next_state = children[state].get(char)
+                if next_state is None:
+                    next_state = children[state][char] = len(children)
+                    children.append({})
+                    output.append(cls.NONE)
+                    depth.append(depth[state] + 1)
+                state = next_state
+            output[state] = index
+        # breadth-first traversal; a state's failure link is determined by
+        # that of its parent, which is closer to the root
+        fail, dict_links = [0] * len(children), [0] * len(children)
+        queue = deque(children[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in children[state].items():
+                link = fail[state]
+                while char not in children[link] and link:
+                    link = fail[link]
+                if state and char in children[link]:
+                    fail[child] = children[link][char]
+                dict_links[child] = (fail[child]
+                                     if output[fail[child]] != cls.NONE
+                                     else dict_links[fail[child]])
+                queue.append(child)
+        transitions, labels, targets = [0], [], []
+        for state_children in children:
+            for char, child in sorted(state_children.items()):
+                labels.append(ord(char))
+                targets.append(child)
+            transitions.append(len(labels))
+        flags = 0
+        value_offsets = [0]
+        values = bytearray()
+        for _, (start, vals) in items:
+            values += bytes((start, len(vals)))
+            for val in vals:
+                data = getattr(val, 'data', None)
+                if data:
+                    change, index, cut = data
+                    change = change.encode('utf-8')
+                    values.append(val | 0x80)
+                    values += cls.ALT.pack(index, cut, len(change)) + change
+                    flags |= cls.NONSTANDARD
+                else:
+                    values.append(val)
+            value_offsets.append(len(values))
+        maxlen = max(depth)
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, maxlen, flags,
+                                 len(items), len(children), len(labels))
+        arrays = array('I', transitions + fail + output + dict_links + depth
+                            + labels + targets + value_offsets)
+        return header + arrays.tobytes() + values
+
+    @classmethod
+    def from_dic_file(cls, filename, cache_path=None):
+        """
+        Returns the compiled patterns for a hyph_*.dic file.
+
+        The compiled table is read from `cache_path` (CACHE_PATH by default)
+        and mapped into memory, so that processes using the same dictionary
+        share its pages. If the table is not yet present in the cache or is
+        outdated, it is compiled from the *.dic file and stored in the cache.
+        """
+        cache_path = Path(cache_path or CACHE_PATH)
+        with open(filename, 'rb') as dic_file:
+            digest = hashlib.sha256(dic_file.read()).hexdigest()
+        table_path = cache_path / (digest + '.pat')
+        try:
+            with open(table_path, 'rb') as table_file:
+                return cls(mmap.mmap(table_file.fileno(), 0,
+                                     access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            pass
+        table = cls.compile(parse_dic_file(filename))
+        try:
+            atomic_write(table_path, table)
+        except OSError:         # the cache directory is not writable
+            pass
+        return cls(table)
+
+    def __len__(self):
+        return self.count
+
+    def _value(self, index):
+        buffer = self.buffer
+        i = self._values_start + self._value_offsets[index]
+        start, length = buffer[i], buffer[i + 1]
+        i += 2
+        values = []
+        for _ in range(length):
+            val = buffer[i]
+            i += 1
+            if val & 0x80:
+                index, cut, change_length = self.ALT.unpack_from(buffer, i)
+                i += self.ALT.size
+                change = buffer[i:i + change_length].decode('utf-8')
+                i += change_length
+                val = dint(val & 0x7f, (change, index, cut))
+            values.append(val)
+        return start, tuple(values)
+
+    def _child(self, state, char):
+        """The trie node reached from `state` on `char`, or None"""
+        code_point = ord(char)
+        start, end = self._transitions[state], self._transitions[state + 1]
+        index = bisect_left(self._labels, code_point, start, end)
+        if index < end and self._labels[index] == code_point:
+            return self._targets[index]
+
+    def _step(self, state, char):
+        """
+        Returns the state following `state` on `char` and the patterns
+        matching in that state, and remembers these for the next lookup.
+        """
+        link = state
+        while True:
+            next_state = self._child(link, char)
+            if next_state is not None or not link:
+                break
+            link = self._fail[link]
+        next_state = next_state or 0
+        matches = []
+        match_state = (next_state if self._output[next_state] != self.NONE
+                       else self._dict_links[next_state])
+        while match_state:
+            offset, values = self._value(self._output[match_state])
+            depth = self._depth[match_state]
+            matches.append((offset - depth, values, depth))
+            match_state = self._dict_links[match_state]
+        step = next_state, tuple(matches)
+        if self._delta[state] is None:
+            self._delta[state] = {}
+        self._delta[state][char] = step
+        return step
+
+    def get(self, key, default=None):
+        state = 0
+        for char in key:
+            state = self._child(state, char)
+            if state is None:
+                return default
+        index = self._output[state]
+        return default if index == self.NONE else self._value(index)
+
+    def priorities(self, word):
+        """
+        Returns the list of hyphenation priorities between the letters of
+        `word`, resulting from all patterns matching `word` (one more than the
+        length of the word). The automaton finds all matching patterns in a
+        single pass over the word.
+        """
+        res = [0] * (len(word) + 1)
+        delta = self._delta
+        found = [] if self.nonstandard else None
+        state = 0
+        for end, char in enumerate(word, 1):
+            try:
+                state, matches = delta[state][char]
+            except (TypeError, KeyError):
+                state, matches = self._step(state, char)
+            if found is not None:
+                found.extend((end - depth, depth, end + shift, values)
+                             for shift, values, depth in matches)
+                continue
+            for shift, values, _ in matches:
+                i = end + shift
+                for value in values:
+                    if value > res[i]:
+                        res[i] = value
+                    i += 1
+        if found:
+            # to select the nonstandard hyphenation data when values are
+            # equal, apply the patterns in order of their position in the
+            # word and their length (the last one wins)
+            for _, _, i, values in sorted(found, key=itemgetter(0, 1)):
+                for value in values:
+                    if value >= res[i]:
+                        res[i] = value
+                    i += 1
+        return res
+
+
+class Hyph_dict(object):
+    """
+    Reads a hyph_*.dic file and stores the hyphenation patterns.
+    Parameters:
+    -filename : filename of hyph_*.dic to read
+    -cache_size : the number of words for which to remember the positions
+
+    The patterns are loaded from a compiled table cached on disk; see
+    CompiledPatterns.from_dic_file.
+    """
+    def __init__(self, filename, cache_size=WORD_CACHE_SIZE):
+        self.patterns = CompiledPatterns.from_dic_file(filename)
+        self.cache = LRUCache(cache_size)
+        self.maxlen = self.patterns.maxlen
 
     def positions(self, word):
         """
@@ -132,16 +430,7 @@ class Hyph_dict(object):
         word = word.lower()
         points = self.cache.get(word)
         if points is None:
-            prepWord = '.%s.' % word
-            res = [0] * (len(prepWord) + 1)
-            for i in range(len(prepWord) - 1):
-                for j in range(i + 1, min(i + self.maxlen, len(prepWord)) + 1):
-                    p = self.patterns.get(prepWord[i:j])
-                    if p:
-                        offset, value = p
-                        s = slice(i + offset, i + offset + len(value))
-                        res[s] = map(max, value, res[s])
-
+            res = self.patterns.priorities('.%s.' % word)
             points = [dint(i - 1, ref=r) for i, r in enumerate(res) if r % 2]
             self.cache[word] = points
         return points
@@ -164,9 +453,10 @@ class Hyphenator(object):
     def __init__(self, filename, left=2, right=2, cache=True):
         self.left  = left
         self.right = right
-        if not cache or filename not in hdcache:
-            hdcache[filename] = Hyph_dict(filename)
-        self.hd = hdcache[filename]
+        hd = hdcache.get(filename) if cache else None
+        if hd is None:
+            hd = hdcache[filename] = Hyph_dict(filename)
+        self.hd = hd
 
     def positions(self, word):
         """
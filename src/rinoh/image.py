@@ -9,6 +9,7 @@
 import os
 
 from ast import literal_eval
+from collections import OrderedDict
 from pathlib import Path
 from token import LPAR, RPAR, NAME, EQUAL, NUMBER, ENDMARKER,  STRING, COMMA
 
@@ -81,6 +82,76 @@ class Filename(str):
         return not (self == other)
 
 
+class ImageCache(object):
+    """Cache for the images placed in a document
+
+    Each image file is opened and decoded only once, no matter how often it
+    is placed in the document or how many rendering passes are required. This
+    also ensures that the image is embedded in the output only once. The
+    cache is keyed by the resolved path of the image file along with its
+    modification time and size. Images passed as file objects are not cached.
+
+    When the image data held by the cache exceeds `max_size` bytes, the least
+    recently used images are evicted. The image data is measured as the
+    encoded image streams kept in memory by the backend (the decoded pixel
+    data is not retained). Images registered with the backend document that
+    is being rendered are never evicted; that document holds on to them
+    anyway, and opening them again would embed them a second time.
+
+    Args:
+        backend: the backend used for rendering the document
+        max_size (int): the maximum number of bytes of encoded image data to
+            hold
+
+    """
+
+    MAX_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, backend, max_size=MAX_SIZE):
+        self.backend = backend
+        self.max_size = max_size
+        self.size = 0
+        self._images = OrderedDict()    # key -> (image, image data size)
+
+    def __len__(self):
+        return len(self._images)
+
+    def get(self, filename_or_file, backend_document=None):
+        """Return the backend image for `filename_or_file`
+
+        `filename_or_file` is opened only if it is not found in the cache.
+        The images registered with `backend_document` are not evicted.
+
+        """
+        if not isinstance(filename_or_file, Path):
+            return self.backend.Image(filename_or_file)
+        path = filename_or_file.resolve()
+        stat = path.stat()
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        try:
+            image, _ = self._images[key]
+            self._images.move_to_end(key)
+        except KeyError:
+            image = self.backend.Image(path)
+            data_size = image.data_size
+            self._images[key] = image, data_size
+            self.size += data_size
+            self._evict(key, backend_document)
+        return image
+
+    def _evict(self, keep_key, backend_document):
+        """Evict the least recently used images (except for the one stored
+        at `keep_key`) until the image data fits in :attr:`max_size`"""
+        registered = (backend_document.image_numbers
+                      if backend_document is not None else {})
+        for key, (image, data_size) in list(self._images.items()):
+            if self.size <= self.max_size:
+                break
+            if key != keep_key and image not in registered:
+                del self._images[key]
+                self.size -= data_size
+
+
 class RequiredArg(Attribute):
     def __init__(self, accepted_type, description):
         super().__init__(accepted_type, None, description)
@@ -253,7 +324,9 @@ class ImageBase(Flowable):
     def render(self, container, last_descender, state, **kwargs):
         try:
             filename_or_file = self._absolute_path_or_file()
-            image = container.document.backend.Image(filename_or_file)
+            document = container.document
+            image = document.image_cache.get(filename_or_file,
+                                             document.backend_document)
         except OSError as err:
             container.document.error = True
             message = "Error opening image file: {}".format(err)
@@ -219,6 +219,13 @@ class Container(object):
         for child in self.children:
             child.before_placing(preallocate)
 
+    def discard_canvas(self):
+        """Free the memory held by the canvases of this container and its
+        children, after they have been placed on the page."""
+        for child in self.children:
+            child.discard_canvas()
+        self.canvas.close()
+
 
 BACKGROUND = 'background'
 CONTENT = 'content'
@@ -619,6 +626,26 @@ class Chain(FlowableTarget):
         self._state = self._fresh_page_state = None
         self._rerendering = False
 
+    def save_state(self):
+        """Return a copy of this chain's rendering state
+
+        The returned object can be passed to :meth:`restore_state` to continue
+        rendering from this point later on, for example in a following
+        rendering pass. Containers added to this chain after saving the state
+        are discarded when restoring it."""
+        return (copy(self._state), copy(self._fresh_page_state),
+                self._rerendering, self.done, len(self.containers))
+
+    def restore_state(self, saved_state):
+        """Reset the rendering state to `saved_state`, as returned by
+        :meth:`save_state`"""
+        state, fresh_page_state, rerendering, done, num_containers = saved_state
+        self._state = copy(state)
+        self._fresh_page_state = copy(fresh_page_state)
+        self._rerendering = rerendering
+        self.done = done
+        del self.containers[num_containers:]
+
     @property
     def last_container(self):
         return self.containers[-1]
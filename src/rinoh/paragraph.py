@@ -13,7 +13,9 @@ Classes for representing and typesetting paragraphs
 
 import re
 
+from array import array
 from ast import literal_eval
+from bisect import bisect_right
 from collections.abc import Iterable
 from copy import copy
 from functools import partial
@@ -29,12 +31,12 @@ from .flowable import Flowable, FlowableStyle, FlowableState, FlowableWidth
 from .font import MissingGlyphException
 from .hyphenator import Hyphenator
 from .inline import InlineFlowable, InlineFlowableException
-from .layout import EndOfContainer, ContainerOverflow
+from .layout import EndOfContainer, ContainerOverflow, VirtualContainer
 from .number import NumberStyle, Label, format_number
 from .strings import StringField
 from .text import (TextStyle, StyledText, SingleStyledText, MixedStyledText,
                    ESCAPE, LANGUAGE_DEFAULT)
-from .util import all_subclasses, ReadAliasAttribute, consumer
+from .util import all_subclasses, ReadAliasAttribute, consumer, LRUCache
 
 
 __all__ = ['Paragraph', 'ParagraphStyle', 'TabStop',
@@ -373,13 +375,71 @@ class ParagraphStyle(FlowableStyle, NumberStyle, TextStyle):
                                             'absolute, negative: relative)')
 
 
-class Glyph(object):
-    __slots__ = ('metrics', 'width', 'char')
+class GlyphRun(object):
+    """The glyphs produced by shaping a piece of text
+
+    Instead of creating an object for each glyph, the glyphs are stored in
+    parallel arrays: the glyph metrics (objects shared by all text set in the
+    same font), the advance widths in points (including kerning and character
+    spacing) and the text. A glyph can represent several characters (a
+    ligature); `char_counts` then holds the number of characters for each
+    glyph.
+
+    The space glyphs in the run are set using the width of the
+    :class:`GlyphsSpan` holding the run (see :attr:`GlyphsSpan.space_width`).
+    Glyph runs are shared (see :class:`ShapingCache`) and should not be
+    modified.
+
+    Args:
+        metrics (iterable of GlyphMetrics): the metrics of the glyphs
+        advances (iterable of float): the advance width of each glyph
+        text (str): the characters represented by the glyphs
+        char_counts (bytes or None): the number of characters represented by
+            each glyph, or ``None`` if each glyph represents one character
+
+    """
+
+    __slots__ = ('metrics', 'advances', 'text', 'char_counts',
+                 'space_indices', 'non_space_width')
+
+    def __init__(self, metrics, advances, text, char_counts=None):
+        self.metrics = tuple(metrics)
+        self.advances = array('d', advances)
+        self.text = text
+        self.char_counts = char_counts
+        self.space_indices = tuple(index for index, char
+                                   in enumerate(self.chars()) if char == ' ')
+        self.non_space_width = (sum(self.advances)
+                                - sum(self.advances[index]
+                                      for index in self.space_indices))
+
+    def __len__(self):
+        return len(self.metrics)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"{type(self).__name__}('{self.text}')"
+
+    @property
+    def number_of_spaces(self):
+        return len(self.space_indices)
+
+    def chars(self):
+        """Iterate over the characters represented by each of the glyphs"""
+        if self.char_counts is None:
+            return iter(self.text)
+        return self._ligature_chars()
+
+    def _ligature_chars(self):
+        text, index = self.text, 0
+        for char_count in self.char_counts:
+            yield text[index:index + char_count]
+            index += char_count
 
-    def __init__(self, metrics, width, char):
-        self.metrics = metrics
-        self.width = width
-        self.char = char
+
+EMPTY_RUN = GlyphRun((), (), '')
 
 
 def form_ligatures(chars_and_glyphs, get_ligature):
@@ -403,31 +463,105 @@ def kern(chars_and_glyphs, get_kerning):
     yield prev_char, prev_glyph, 0.0
 
 
+class ShapingCache(object):
+    """Cache for the glyph runs produced by shaping text
+
+    Shaping a piece of text (looking up the glyph metrics for each character,
+    forming ligatures and applying kerning) yields the same glyph run each
+    time it is performed for the same text and font settings. Since words
+    repeat a lot in natural language, the glyph runs are cached and shared
+    between the paragraphs and the rendering passes of a document. Each
+    document holds its own cache (:attr:`Document.shaped_text`), so that the
+    fonts and glyph runs are freed along with the document.
+
+    The cache is keyed by the font, font size, font variant, the kerning,
+    ligatures and character spacing settings, and the text. The glyph runs
+    (:class:`GlyphRun`) should not be modified. When the cache holds more than
+    `max_size` glyph runs, the least recently used are evicted.
+
+    Args:
+        max_size (int): the maximum number of glyph runs to hold
+
+    """
+
+    MAX_SIZE = 32 * 1024
+
+    def __init__(self, max_size=MAX_SIZE):
+        self._glyph_runs = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._glyph_runs)
+
+    @property
+    def hit_rate(self):
+        """The fraction of lookups that were served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key, shape):
+        """Return the glyph run for `key`
+
+        If the glyph run is not found in the cache, it is created by calling
+        `shape` (which takes no arguments).
+
+        """
+        try:
+            glyph_run = self._glyph_runs[key]
+            self.hits += 1
+        except KeyError:
+            glyph_run = self._glyph_runs[key] = shape()
+            self.misses += 1
+        return glyph_run
+
+    def clear(self):
+        self._glyph_runs.clear()
+        self.hits = self.misses = 0
+
+
 def create_lig_kern(span, flowable_target):
     font = span.font(flowable_target)
-    scale = span.height(flowable_target) / font.units_per_em
+    size = span.height(flowable_target)
+    scale = size / font.units_per_em
     variant = span.get_style('font_variant', flowable_target)
     kerning = span.get_style('kerning', flowable_target)
     ligatures = span.get_style('ligatures', flowable_target)
     char_spacing = float(span.get_style('character_spacing', flowable_target))
-    get_glyph_metrics = partial(font.get_glyph_metrics, variant=variant)
+    features = span.get_style('font_features', flowable_target)
+    plan = font.get_shaping_plan(variant, [*features,
+                                           *(['kern'] if kerning else []),
+                                           *(['liga'] if ligatures else [])])
+    get_glyph_metrics = plan.get_glyph_metrics
+    shape_key = (font, size, variant, plan.features, kerning, ligatures,
+                 char_spacing)
+    shaped_text = flowable_target.document.shaped_text
     # TODO: handle ligatures at span borders
-    def lig_kern(chars, glyph_metrics=None):
-        if glyph_metrics is None:
-            glyph_metrics = (get_glyph_metrics(char) for char in chars)
+    def shape(chars):
+        glyph_metrics = (get_glyph_metrics(char) for char in chars)
         chars_and_glyph_metrics = zip(chars, glyph_metrics)
         if ligatures:
             chars_and_glyph_metrics = form_ligatures(chars_and_glyph_metrics,
-                                                     font.get_ligature)
+                                                     plan.get_ligature)
         if kerning:
-            glyphs_kern = kern(chars_and_glyph_metrics, font.get_kerning)
+            glyphs_kern = kern(chars_and_glyph_metrics, plan.get_kerning)
         else:
             glyphs_kern = [(char, glyph, 0.0)
                            for char, glyph in chars_and_glyph_metrics]
-        return [Glyph(glyph_metrics, scale * (glyph_metrics.width
-                                              + kern_adjust)
-                                     + char_spacing, char)
-                for char, glyph_metrics, kern_adjust in glyphs_kern]
+        glyph_chars, metrics, advances = [], [], []
+        for char, glyph_metrics, kern_adjust in glyphs_kern:
+            glyph_chars.append(char)
+            metrics.append(glyph_metrics)
+            advances.append(scale * (glyph_metrics.width + kern_adjust)
+                            + char_spacing)
+        text = ''.join(glyph_chars)
+        char_counts = (bytes(len(char) for char in glyph_chars)
+                       if len(glyph_chars) != len(text) else None)
+        return GlyphRun(metrics, advances, text, char_counts)
+
+    def lig_kern(chars):
+        """Return the (cached) glyph run for the string `chars`"""
+        return shaped_text.get(shape_key + (chars, ), partial(shape, chars))
 
     return get_glyph_metrics, lig_kern
 
@@ -484,6 +618,11 @@ class SpecialCharacter(LinePart):
     def __init__(self, span, chars_to_glyphs):
         self.glyphs_span = GlyphsSpan(span, chars_to_glyphs)
 
+    def __copy__(self):
+        copy_ = self.__class__.__new__(self.__class__)
+        copy_.glyphs_span = copy(self.glyphs_span)
+        return copy_
+
     def __iter__(self):
         yield self.glyphs_span
 
@@ -624,7 +763,7 @@ class ParagraphState(FlowableState):
             if no_break_after == LANGUAGE_DEFAULT:
                 no_break_after = self.language.no_break_after
             try:
-                get_glyph_metrics, lig_kern = create_lig_kern(span, container)
+                _, lig_kern = create_lig_kern(span, container)
                 groups = groupby(iter(span.text(container)), WHITESPACE.get)
                 for _ in range(self.group_index):
                     next(groups)
@@ -653,8 +792,7 @@ class ParagraphState(FlowableState):
                     if word and word[-1].span is span:
                         prev_glyphs_span = word.pop()
                         part = str(prev_glyphs_span) + part
-                    glyphs = [get_glyph_metrics(char) for char in part]
-                    glyphs = lig_kern(part, glyphs)
+                    glyphs = lig_kern(part)
                     glyphs_span = GlyphsSpan(span, lig_kern, glyphs)
                     word.append(glyphs_span)
                 self.group_index = 0
@@ -667,6 +805,31 @@ class ParagraphState(FlowableState):
     def prepend_word(self, word):
         self._first_word = word
 
+    @property
+    def position(self):
+        """Identifies the point in the paragraph's text where this state
+        continues, or `None` if this state is in the middle of generating words
+        """
+        if self._words or self.nested_flowable_state is not None:
+            return None
+        first_word = str(self._first_word) if self._first_word else None
+        return self.span_index, self.group_index, first_word
+
+    def snapshot(self):
+        """Return a copy of this state that does not share its first word"""
+        snapshot = copy(self)
+        snapshot._first_word = copy(self._first_word)
+        return snapshot
+
+    def continue_from(self, other):
+        """Continue from the position of `other`, a state of the same
+        paragraph as returned by :meth:`snapshot`"""
+        self._words = None
+        self._first_word = copy(other._first_word)
+        self.span_index = other.span_index
+        self.group_index = other.group_index
+        self.nested_flowable_state = copy(other.nested_flowable_state)
+
     def save(self):
         self._saved = (self._first_word, self.span_index, self.group_index,
                        copy(self.nested_flowable_state), self.initial)
@@ -808,10 +971,7 @@ class ParagraphBase(Flowable, Label):
         line_width = float(container.width)
         line_spacing = self.get_style('line_spacing', container)
         text_align = self.get_style('text_align', container)
-        tab_stops = self.get_style('tab_stops', container)
-        if not tab_stops:
-            tab_width = 2 * self.get_style('font_size', container)
-            tab_stops = DefaultTabStops(tab_width)
+        tab_stops = self._tab_stops(container)
 
         initial_state = copy(state)
         # `saved_state` is updated after successfully rendering each line, so
@@ -822,19 +982,15 @@ class ParagraphBase(Flowable, Label):
         lines_typeset = 0
         split_minimum_lines = self.get_style('split_minimum_lines', container)
 
-        def typeset_line(line, wrapped_line=True, last_line=False):
+        def typeset_line(line, last_line=False):
             """Typeset `line` and, if no exception is raised, update the
             paragraph's internal rendering state.
 
             Args:
                 line (Line): the line to typeset
-                wrapped_line (bool): True if this line is wrapped
                 last_line (bool): True if this is the paragraph's last line or
                   a line explicitly ended by a newline character
 
-            Returns:
-                Line: a new, empty line
-
             """
             nonlocal state, saved_state, max_line_width, descender, space_below
             nonlocal lines_typeset
@@ -858,46 +1014,15 @@ class ParagraphBase(Flowable, Label):
             state.initial = False
             lines_typeset += 1
             saved_state = copy(state)
-            return Line(tab_stops, line_width, container,
-                        significant_whitespace=self.significant_whitespace,
-                        continued=wrapped_line)
-
-        first_line = line = Line(tab_stops, line_width, container, indent_first,
-                                 self.significant_whitespace, continued=False)
-        state.save()
-        wrapped = False
-        while True:
-            try:
-                word = state.next_word(container)
-            except StopIteration:
-                break
-            try:
-                wrapped = not line.append_word(word)
-            except NewLineException:
-                if wrapped: # last line was wrapped
-                    continue
-                line.append(word.glyphs_span)
-            else:
-                if not wrapped: # word fits one line; continue with next word
-                    state.save()
-                    continue
-                for first, second, is_last in word.hyphenate(container):
-                    if line.append_word(first, force=is_last):
-                        state.prepend_word(second)
-                        break
-                else:   # three possibilities:
-                        # - shortest hyphenated part of the word doesn't fit
-                        # - word cannot be hyphenated
-                        # - hyphenation is off
-                    if not line:    # first word on line, so typeset it anyway
-                        line.append_word(word, True)
-                    else:
-                        state.restore()
-            line = typeset_line(line, wrapped_line=wrapped, last_line=not wrapped)
+
+        first_line_advance = 0
+        for line, last_line in self._layout_lines(state, container, line_width,
+                                                  indent_first, tab_stops):
+            typeset_line(line, last_line=last_line)
+            if lines_typeset == 1:
+                first_line_advance = line.advance
             if first_line_only:
                 break
-        if line:
-            typeset_line(line, wrapped_line=True, last_line=True)
 
         # Correct the horizontal text placement for auto-width paragraphs
         if self._width(container) == FlowableWidth.AUTO:
@@ -906,7 +1031,161 @@ class ParagraphBase(Flowable, Label):
             if text_align == TextAlign.RIGHT:
                 container.left -= float(container.width - max_line_width)
 
-        return max_line_width, first_line.advance, descender
+        return max_line_width, first_line_advance, descender
+
+    def _tab_stops(self, container):
+        tab_stops = self.get_style('tab_stops', container)
+        if not tab_stops:
+            tab_width = 2 * self.get_style('font_size', container)
+            tab_stops = DefaultTabStops(tab_width)
+        return tab_stops
+
+    def _layout_lines(self, state, container, line_width, indent_first,
+                      tab_stops):
+        """Generator yielding the lines of this paragraph, like :meth:`_lines`
+
+        The lines are stored in the document's paragraph layout cache, keyed by
+        this paragraph, the line width, the first line's indent and the
+        position `state` starts from. A stored layout is only reused if the
+        paragraph's resolved style and text still match. See
+        :class:`ParagraphLayout`.
+
+        """
+        position = state.position
+        if position is None:
+            yield from self._lines(state, container, line_width, indent_first,
+                                   tab_stops)
+            return
+        layouts = container.document.paragraph_layouts
+        style = self.style_digest(LINE_BREAKING_STYLE, container)
+        key = id(self), line_width, indent_first, position
+        layout = layouts.get(key)
+        if layout is None or not layout.matches(self, style, container):
+            layout = layouts[key] = ParagraphLayout(self, style)
+        yield from layout.lines(state, container, line_width, indent_first,
+                                tab_stops)
+
+    def _lines(self, state, container, line_width, indent_first, tab_stops,
+               continued=False):
+        """Generator breaking the paragraph's text into lines
+
+        Words are taken from `state` by a :class:`LineBreaker`. Yields each
+        line once it is complete, together with a flag indicating whether it
+        is the paragraph's last line or a line explicitly ended by a newline
+        character. The lines are not typeset; that is left to the caller.
+        `continued` indicates that the first line continues a line that was
+        wrapped.
+
+        """
+        breaker = LineBreaker(state, container, line_width, tab_stops,
+                              self.significant_whitespace)
+        yield from breaker.lines(indent_first, continued)
+
+    def _content_width(self, container, width, **kwargs):
+        buffer = VirtualContainer(container, width=width, never_placed=True)
+        state = self.initial_state(buffer)
+        indent_first = float(self.get_style('indent_first', buffer))
+        lines = self._layout_lines(state, buffer, float(width), indent_first,
+                                   self._tab_stops(buffer))
+        return max((line.cursor for line, _ in lines), default=0)
+
+
+#: the style attributes affecting how a paragraph's text is broken into lines
+LINE_BREAKING_STYLE = ('typeface', 'font_weight', 'font_slant', 'font_width',
+                       'font_size', 'font_variant', 'position', 'kerning',
+                       'ligatures', 'character_spacing', 'font_features',
+                       'hyphenate', 'hyphen_chars', 'hyphen_lang',
+                       'no_break_after')
+
+
+class ParagraphLayout(object):
+    """The lines a paragraph was broken into
+
+    A paragraph is typeset several times: in each rendering pass, in virtual
+    containers to measure its size, and again when a reflow is required. If
+    this happens starting from the same position in the paragraph's text, with
+    the same line width and the same resolved text (including the values of
+    references and fields), the line breaks are identical. The lines are
+    stored the first time the paragraph is broken into lines, and are replayed
+    from then on. The words they hold are copied to fresh lines, so that
+    no shaping, hyphenation and line breaking is needed. Typesetting the lines
+    (positioning them, justification) is done as usual.
+
+    The stored lines are only replayed while the paragraph's resolved style
+    (see :data:`LINE_BREAKING_STYLE`) and its text, with references and fields
+    resolved, are unchanged. The text is determined when lines are first
+    stored and when checking whether they can be replayed. Lines holding
+    inline flowables are not stored, since these are flowed into a specific
+    container.
+
+    Args:
+        paragraph (ParagraphBase): the paragraph whose lines are stored
+        style (tuple): the paragraph's resolved line breaking style (see
+            :meth:`Styled.style_digest`)
+
+    """
+
+    def __init__(self, paragraph, style):
+        self.paragraph = paragraph
+        self.style = style
+        self.text = None    # set when the first line is stored
+        self.cacheable = True
+        self.complete = False
+        self._lines = []    # (parts, last_line, state after the line)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def matches(self, paragraph, style, container):
+        """Return whether the stored lines can be replayed for `paragraph`,
+        given its resolved `style` and its text when rendered in
+        `container`"""
+        return (self.paragraph is paragraph and self.style == style
+                and (self.text is None
+                     or self.text == paragraph.to_string(container)))
+
+    def lines(self, state, container, line_width, indent_first, tab_stops):
+        """Generator yielding the lines of the paragraph, like
+        :meth:`ParagraphBase._lines`
+
+        The stored lines are yielded first, advancing `state` past each line.
+        If the paragraph was not broken completely into lines before, the
+        remaining lines are produced by :meth:`ParagraphBase._lines` and
+        stored.
+
+        """
+        paragraph = self.paragraph
+        significant_whitespace = paragraph.significant_whitespace
+        indent, continued = indent_first, False
+        for parts, last_line, end_state in self._lines:
+            line = Line(tab_stops, line_width, container, indent,
+                        significant_whitespace, continued)
+            for part in parts:
+                part = copy(part)
+                if isinstance(part, NewLine):
+                    line.append(part.glyphs_span)
+                    line.parts.append(part)
+                else:
+                    line.append_word(part, force=True)
+            state.continue_from(end_state)
+            yield line, last_line
+            indent, continued = 0, not last_line
+        if self.complete:
+            return
+        if self.cacheable and self.text is None:
+            self.text = paragraph.to_string(container)
+        for line, last_line in paragraph._lines(state, container, line_width,
+                                                indent, tab_stops, continued):
+            if self.cacheable:
+                if all(isinstance(glyphs_span, GlyphsSpan)
+                       for part in line.parts for glyphs_span in part):
+                    parts = [copy(part) for part in line.parts]
+                    self._lines.append((parts, last_line, state.snapshot()))
+                else:
+                    self.cacheable = False
+                    self._lines.clear()
+            yield line, last_line
+        self.complete = self.cacheable
 
 
 class StaticParagraph(ParagraphBase):
@@ -988,59 +1267,116 @@ def create_hyphenate(span, container):
     return hyphenate
 
 
-class GlyphsSpan(list):
-    def __init__(self, span, chars_to_glyphs, glyphs=[]):
-        super().__init__()
+class GlyphsSpan(object):
+    """The glyphs set in a single span, as part of a word or line
+
+    The glyphs obtained by shaping the text are held in a :class:`GlyphRun`.
+    These can be followed by spaces (see :meth:`append_space`) or a tab (see
+    :meth:`append_tab`). All spaces in the span are set using `space_width`,
+    which is increased when justifying the line the span is placed on.
+
+    Args:
+        span (SingleStyledText): the span the glyphs belong to
+        chars_to_glyphs (callable): shapes a string into a :class:`GlyphRun`
+        glyphs (GlyphRun): the shaped text
+
+    """
+
+    __slots__ = ('span', 'chars_to_glyphs', 'run', 'space_metrics',
+                 'space_width', 'appended_spaces', 'tab_width', 'tab_fill')
+
+    def __init__(self, span, chars_to_glyphs, glyphs=EMPTY_RUN):
         self.span = span
-        self.filled_tabs = {}
         self.chars_to_glyphs = chars_to_glyphs
-        self.space, = chars_to_glyphs(' ')
-        super().__init__(self.space if glyph.char == ' ' else glyph
-                         for glyph in glyphs)
+        self.run = glyphs
+        # the space width is widened when justifying, so it cannot be shared
+        space = chars_to_glyphs(' ')
+        self.space_metrics, = space.metrics
+        self.space_width, = space.advances
+        self.appended_spaces = 0
+        self.tab_width = None       # the width of the trailing tab, if any
+        self.tab_fill = None
+
+    def __copy__(self):
+        copy_ = self.__class__.__new__(self.__class__)
+        for attribute in self.__slots__:
+            setattr(copy_, attribute, getattr(self, attribute))
+        return copy_
+
+    def __len__(self):
+        return (len(self.run) + self.appended_spaces
+                + (self.tab_width is not None))
 
     def __str__(self):
-        return ''.join(glyph.char for glyph in self)
+        return (self.run.text + ' ' * self.appended_spaces
+                + ('\t' if self.tab_width is not None else ''))
+
+    def __repr__(self):
+        return f"{type(self).__name__}('{self}')"
 
     @property
     def width(self):
-        return sum(glyph.width for glyph in self)
+        return (self.run.non_space_width
+                + self.number_of_spaces * self.space_width
+                + (self.tab_width or 0))
 
     @property
     def number_of_spaces(self):
-        return self.count(self.space)
+        return self.run.number_of_spaces + self.appended_spaces
 
     @property
     def ends_with_space(self):
-        return self[-1] == self.space
+        if self.tab_width is not None:
+            return False
+        if self.appended_spaces:
+            return True
+        space_indices = self.run.space_indices
+        return bool(space_indices) and space_indices[-1] == len(self.run) - 1
 
     def append_space(self):
-        self.append(self.space)
-
-    def _fill_tabs(self):
-        for index, glyph in enumerate(super().__iter__()):
-            if index in self.filled_tabs:
-                fill_string = self.filled_tabs[index]
-                fill_glyphs = self.chars_to_glyphs(fill_string)
-                fill_string_width = sum(glyph.width for glyph in fill_glyphs)
-                number, rest = divmod(glyph.width, fill_string_width)
-                yield Glyph(glyph.metrics, rest, glyph.char)
-                for i in range(int(number)):
-                    for fill_glyph in fill_glyphs:
-                        yield fill_glyph
-            else:
-                yield glyph
-
-    def __iter__(self):
-        if self.filled_tabs:
-            return self._fill_tabs()
+        assert self.tab_width is None
+        self.appended_spaces += 1
+
+    def append_tab(self, width, fill=None):
+        """End this span with a tab of `width`, filled with the string `fill`
+        (repeated) if given"""
+        assert self.tab_width is None
+        self.tab_width = width
+        self.tab_fill = fill
+
+    def glyphs(self):
+        """Iterate over the glyphs to show: (glyph metrics, advance width)"""
+        run = self.run
+        if run.space_indices:
+            advances = array('d', run.advances)
+            for index in run.space_indices:
+                advances[index] = self.space_width
         else:
-            return super().__iter__()
+            advances = run.advances
+        yield from zip(run.metrics, advances)
+        for _ in range(self.appended_spaces):
+            yield self.space_metrics, self.space_width
+        if self.tab_width is not None:
+            yield from self._tab_glyphs()
+
+    def _tab_glyphs(self):
+        if not self.tab_fill:
+            yield self.space_metrics, self.tab_width
+            return
+        fill = self.chars_to_glyphs(self.tab_fill)
+        number, rest = divmod(self.tab_width, sum(fill.advances))
+        yield self.space_metrics, rest
+        for i in range(int(number)):
+            yield from zip(fill.metrics, fill.advances)
 
 
 class Word(LinePart, list):
     def __init__(self, glyphs_spans=()):
         super().__init__(glyphs_spans)
 
+    def __copy__(self):
+        return self.__class__(copy(glyphs_span) for glyphs_span in self)
+
     def __str__(self):
         return ''.join(str(glyphs_span) for glyphs_span in self)
 
@@ -1094,6 +1430,7 @@ class Line(list):
         self.container = container
         self.cursor = indent
         self.advance = 0
+        self.parts = []     # the words and special characters appended
         self.significant_whitespace = significant_whitespace
         self.wrapped_line = continued
         self._has_tab = False
@@ -1112,14 +1449,11 @@ class Line(list):
             tab_position = tab_stop.get_position(self.width)
             if self.cursor < tab_position:
                 tab_width = tab_position - self.cursor
-                tab = Glyph(glyphs_span.space.metrics, tab_width, '\t')
-                if tab_stop.fill:
-                    glyphs_span.filled_tabs[len(glyphs_span)] = tab_stop.fill
-                glyphs_span.append(tab)
+                glyphs_span.append_tab(tab_width, tab_stop.fill)
                 self.cursor = tab_position
                 self._current_tab_stop = tab_stop
                 if tab_stop.align in (TabAlign.RIGHT, TabAlign.CENTER):
-                    self._current_tab = tab
+                    self._current_tab = glyphs_span
                     self._current_tab_stop = tab_stop
                 else:
                     self._current_tab = None
@@ -1140,21 +1474,22 @@ class Line(list):
             empty_glyphs_span = copy(word_or_inline.glyphs_span)
             self._handle_tab(empty_glyphs_span)
             self.append(empty_glyphs_span)
+            self.parts.append(word_or_inline)
             return True
 
         width = word_or_inline.width
         if self._current_tab:
             current_tab = self._current_tab
-            tab_width = current_tab.width
+            tab_width = current_tab.tab_width
             factor = (2 if self._current_tab_stop.align == TabAlign.CENTER
                       else 1)
             item_width = width / factor
             if item_width < tab_width:
-                current_tab.width -= item_width
+                current_tab.tab_width -= item_width
             else:
                 first_glyphs_span.span.warn('Tab space exceeded.',
                                             self.container)
-                current_tab.width = 0
+                current_tab.tab_width = 0
                 self._current_tab = None
             self.cursor -= item_width
         if self.cursor + width > self.width:
@@ -1166,13 +1501,33 @@ class Line(list):
         self.cursor += width
         for glyphs_span in word_or_inline:
             self.append(glyphs_span)
+        self.parts.append(word_or_inline)
         return True
 
+    def append_parts(self, parts, cursor):
+        """Append words and spaces that are known to fit on this line
+
+        Unlike :meth:`append_word`, this does not check whether `parts` fit
+        and does not handle tabs or spaces at the start of the line. `cursor`
+        is the cursor position following the last part, as determined by the
+        :class:`LineBreaker`.
+
+        """
+        for part in parts:
+            self.extend(part)
+        self.parts.extend(parts)
+        self.cursor = cursor
+
+    def _spans(self):
+        """The distinct spans the glyph spans in this line belong to"""
+        return {id(glyph_span.span): glyph_span.span
+                for glyph_span in self}.values()
+
     def descender(self, container):
-        return min(glyph_span.span.descender(container) for glyph_span in self)
+        return min(span.descender(container) for span in self._spans())
 
     def ascender(self, container):
-        return max(glyph_span.span.ascender(container) for glyph_span in self)
+        return max(span.ascender(container) for span in self._spans())
 
     def typeset(self, container, text_align, last_line=False):
         """Typeset the line in `container` below its current cursor position.
@@ -1190,7 +1545,7 @@ class Line(list):
         while len(self) > 0:
             last_span = self[-1]
             if last_span and last_span.ends_with_space:
-                self.cursor -= last_span.space.width
+                self.cursor -= last_span.space_width
                 self.pop()
             else:
                 break
@@ -1219,7 +1574,7 @@ class Line(list):
                 add_to_spaces = extra_space / nr_spaces
                 for glyph_span in self:
                     if glyph_span.number_of_spaces > 0:
-                        glyph_span.space.width += add_to_spaces
+                        glyph_span.space_width += add_to_spaces
         elif text_align == TextAlign.CENTER:
             left += extra_space / 2.0
         elif text_align == TextAlign.RIGHT:
@@ -1246,22 +1601,201 @@ class Line(list):
         current_annotation.place_if_any()
 
 
+class LineBreaker(object):
+    """Breaks the words produced by a paragraph state into lines
+
+    The parts of the paragraph (words and special characters) taken from
+    `state` are buffered together with their widths, which are held in an
+    array. For each line, the cursor positions following the buffered parts
+    (the prefix sums of their widths, starting from the cursor position on the
+    line) are stored in a second array, and the end of the line is found by
+    bisecting these. Parts are only taken from `state` until one does not fit
+    on the line, since taking a part flows its span, registering it with the
+    container (placing a footnote on the container's page, for example).
+
+    The parts that fit are appended to a :class:`Line` in one go, once the end
+    of the line is known. The part that does not fit is hyphenated if possible
+    and continues on the next line. Tabs, the parts following a right or
+    center aligned tab (which move back the cursor) and spaces at the start
+    of a line are placed using :meth:`Line.append_word`. A newline ends the
+    line.
+
+    `state` is advanced past the parts placed on a line before the line is
+    yielded, so that a copy of `state` continues at the start of the next
+    line.
+
+    Args:
+        state (ParagraphState): the state the paragraph's words are taken from
+        container (Container): the container the lines are laid out in
+        line_width (float): the available width for each line
+        tab_stops (TabStopList): the tab stops to align tabs to
+        significant_whitespace (bool): see :class:`Line`
+
+    """
+
+    def __init__(self, state, container, line_width, tab_stops,
+                 significant_whitespace=False):
+        self.state = state
+        self.container = container
+        self.line_width = line_width
+        self.tab_stops = tab_stops
+        self.significant_whitespace = significant_whitespace
+        self._parts = []            # taken from state but not placed yet
+        self._widths = array('d')   # the widths of these parts
+        self._positions = []        # state's position following each part
+        self._position = state.span_index, state.group_index
+        self._end = None            # state's position when out of words
+
+    def lines(self, indent_first=0, continued=False):
+        """Generator yielding the lines, like :meth:`ParagraphBase._lines`"""
+        indent, wrapped = indent_first, continued
+        while True:
+            line = Line(self.tab_stops, self.line_width, self.container,
+                        indent, self.significant_whitespace, wrapped)
+            wrapped = self._fill(line, wrapped)
+            if wrapped is None:     # out of words
+                if line:
+                    yield line, True
+                return
+            yield line, not wrapped
+            indent = 0
+
+    def _fill(self, line, wrapped):
+        """Place parts on `line` until it is full
+
+        `wrapped` indicates whether the previous line was wrapped. Returns
+        whether `line` is wrapped, or `None` if the paragraph's words ran out.
+
+        """
+        while True:
+            if not self._parts and not self._take():
+                return None
+            part = self._parts[0]
+            if isinstance(part, NewLine):
+                self._place(1)
+                if wrapped:     # directly following a wrapped line; drop it
+                    continue
+                line.append(part.glyphs_span)
+                line.parts.append(part)
+                return False
+            if (isinstance(part, Tab) or line._current_tab
+                    or (not line and isinstance(part, Space))):
+                fits = line.append_word(part)
+            else:
+                ends = self._measure(line.cursor, line.width)
+                count = bisect_right(ends, line.width)
+                if count:
+                    line.append_parts(self._parts[:count], ends[count - 1])
+                    self._place(count)
+                    wrapped = False
+                    continue
+                fits = False
+            if fits:
+                self._place(1)
+                wrapped = False
+                continue
+            self._wrap(line, part)
+            return True
+
+    def _measure(self, cursor, width):
+        """Return the cursor positions following the buffered parts, starting
+        from `cursor`
+
+        Parts are taken from the state as needed. Stops at the first part that
+        extends beyond `width`, at a tab or newline, or when the paragraph's
+        words run out.
+
+        """
+        ends = array('d')
+        index = 0
+        while cursor <= width:
+            if index == len(self._parts) and not self._take():
+                break
+            if isinstance(self._parts[index], (Tab, NewLine)):
+                break
+            cursor += self._widths[index]
+            ends.append(cursor)
+            index += 1
+        return ends
+
+    def _wrap(self, line, part):
+        """Handle `part` not fitting on `line`
+
+        The longest hyphenated first part of `part` that fits is placed on
+        `line`, leaving the rest for the next line. If `part` cannot be
+        hyphenated, it is left for the next line, unless `line` is empty.
+
+        """
+        for first, second, is_last in part.hyphenate(self.container):
+            if line.append_word(first, force=is_last):
+                self._place(1)
+                self.state.prepend_word(second)
+                break
+        else:   # three possibilities:
+                # - shortest hyphenated part of the word doesn't fit
+                # - word cannot be hyphenated
+                # - hyphenation is off
+            if not line:    # first word on line, so typeset it anyway
+                line.append_word(part, True)
+                self._place(1)
+
+    def _take(self):
+        """Take the next part from the state and add it to the buffer
+
+        Returns `False` if the paragraph's words ran out.
+
+        """
+        state = self.state
+        if self._end is not None:
+            return False
+        if self._parts:     # the word generator continues after these
+            state.span_index, state.group_index = self._positions[-1]
+        try:
+            part = state.next_word(self.container)
+        except StopIteration:
+            self._end = state.span_index, state.group_index
+            if not self._parts:
+                self._position = self._end
+            state.span_index, state.group_index = self._position
+            return False
+        self._parts.append(part)
+        self._widths.append(part.width)
+        self._positions.append((state.span_index, state.group_index))
+        state.span_index, state.group_index = self._position
+        return True
+
+    def _place(self, count):
+        """Remove the first `count` parts, which have been placed on a line,
+        from the buffer and advance the state past them"""
+        self._position = self._positions[count - 1]
+        del self._parts[:count]
+        del self._widths[:count]
+        del self._positions[:count]
+        if not self._parts and self._end is not None:
+            self._position = self._end
+        self.state.span_index, self.state.group_index = self._position
+
+
 def group_spans(line):
+    """Group consecutive glyph spans belonging to the same span
+
+    Yields each span along with the list of its :class:`GlyphsSpan`. Inline
+    flowables are yielded by themselves, with ``None`` instead of a list."""
     span = None
-    glyphs = []
+    glyphs_spans = []
     for glyph_span in line:
         if glyph_span.span is not span:
             if span:
-                yield span, glyphs
+                yield span, glyphs_spans
             span = glyph_span.span
-            glyphs = []
-        try:
-            glyphs += glyph_span
-        except TypeError:   # InlineFlowable
+            glyphs_spans = []
+        if isinstance(glyph_span, GlyphsSpan):
+            glyphs_spans.append(glyph_span)
+        else:   # InlineFlowable
             yield glyph_span, None
             span = None
     if span:
-        yield span, glyphs
+        yield span, glyphs_spans
 
 
 class AnnotationRect(object):
@@ -237,6 +237,12 @@ class Note(LabeledFlowable):
             return 0, 0, last_descender
         return super().flow(container, last_descender, state, **kwargs)
 
+    def content_width(self, container, max_width, footnote=False, **kwargs):
+        location = self.get_style('location', container)
+        if not footnote and location == NoteLocation.FOOTER:
+            return 0
+        return super().content_width(container, max_width, **kwargs)
+
 
 class NoteMarkerStyle(ReferenceStyle):
     type = OverrideDefault(ReferenceType.NUMBER)
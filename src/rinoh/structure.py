@@ -150,6 +150,11 @@ class Heading(StaticParagraph):
             result = super().flow(container, last_descender, state, **kwargs)
         return result
 
+    def content_width(self, container, max_width, **kwargs):
+        if self.level == 1 and container.page.chapter_title:
+            return self._flowed_width(container, max_width, **kwargs)
+        return super().content_width(container, max_width, **kwargs)
+
     def flow_inner(self, container, descender, state=None, **kwargs):
         result = super().flow_inner(container, descender, state=state, **kwargs)
         if not state.initial:
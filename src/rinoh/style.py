@@ -32,7 +32,7 @@ from .attribute import (WithAttributes, AttributesDictionary,
 from .element import DocumentElement
 from .resource import DynamicEntryPoint, Resource, ResourceNotFound
 from .util import (cached, all_subclasses, NotImplementedAttribute,
-                   class_property)
+                   class_property, WeakMutableKeyDictionary)
 from .warnings import warn
 
 
@@ -186,6 +186,11 @@ class Selector(object):
     def flatten(self, stylesheet):
         raise NotImplementedError
 
+    def observed_attributes(self, stylesheet):
+        """Yield (styled class, attribute name) tuples for the attributes of
+        document elements this selector inspects when matching"""
+        raise NotImplementedError
+
     def match(self, styled, stylesheet, document):
         raise NotImplementedError
 
@@ -216,6 +221,9 @@ class SelectorWithPriority(Selector):
         flattened_selector = self.selector.flatten(stylesheet)
         return flattened_selector.pri(self.priority)
 
+    def observed_attributes(self, stylesheet):
+        return self.selector.observed_attributes(stylesheet)
+
     def match(self, styled, stylesheet, document):
         score = self.selector.match(styled, stylesheet, document)
         if score:
@@ -236,6 +244,10 @@ class EllipsisSelector(Selector):
     def flatten(self, stylesheet):
         return self
 
+    def observed_attributes(self, stylesheet):
+        return
+        yield
+
 
 class SingleSelector(Selector):
     @property
@@ -254,6 +266,9 @@ class SelectorByName(SingleSelector):
     def flatten(self, stylesheet):
         return stylesheet.get_selector(self.name)
 
+    def observed_attributes(self, stylesheet):
+        return self.flatten(stylesheet).observed_attributes(stylesheet)
+
     def get_styled_class(self, stylesheet_or_matcher):
         selector = stylesheet_or_matcher.get_selector(self.name)
         return selector.get_styled_class(stylesheet_or_matcher)
@@ -279,6 +294,10 @@ class ClassSelectorBase(SingleSelector):
     def flatten(self, stylesheet):
         return self
 
+    def observed_attributes(self, stylesheet):
+        for attr in self.attributes:
+            yield self.cls, attr
+
     def get_style_name(self, matcher):
         return self.style_name
 
@@ -337,6 +356,10 @@ class ContextSelector(Selector):
     def get_style_name(self, matcher):
         return self.selectors[-1].get_style_name(matcher)
 
+    def observed_attributes(self, stylesheet):
+        for selector in self.selectors:
+            yield from selector.observed_attributes(stylesheet)
+
     def match(self, styled, stylesheet, document):
         def styled_and_parents(element):
             while element is not None:
@@ -506,6 +529,16 @@ class Styled(DocumentElement, Configurable, metaclass=StyledMeta):
     def get_style(self, attribute, container):
         return self.get_config_value(attribute, container.document)
 
+    def style_digest(self, attributes, container):
+        """Return the values of the style `attributes` as resolved for this
+        element
+
+        Caches holding results derived from this element's style store the
+        digest along with the result, and only reuse the result if the digest
+        is still the same."""
+        return tuple(self.get_style(attribute, container)
+                     for attribute in attributes)
+
     @property
     def has_id(self):
         """Filter selection on an ID of this :class:`Styled`"""
@@ -619,6 +652,126 @@ class StyledMatcher(dict):
                         yield Match(name, specificity)
 
 
+class CompiledMatcher(object):
+    """Selector matcher compiled for a style sheet and its base style sheets
+
+    The selectors of all style sheets in the chain are flattened once. For
+    each styled class and style name, the candidate selectors are collected
+    from the matchers of the style sheet chain, following the class' MRO.
+    These candidate lists are further indexed by the ID or class the
+    selector's last element selector requires (``has_id`` or ``has_class``),
+    so that matching an element only considers selectors that can match it.
+
+    :meth:`match` yields the matches ordered by the position of the style
+    sheet in the chain, the position of the selector's class in the MRO and
+    the order the selectors were defined in. :meth:`.Document.get_matches`
+    relies on this to order matches of equal specificity.
+
+    Args:
+        stylesheet (StyleSheet): the top-most style sheet of the chain
+
+    """
+
+    def __init__(self, stylesheet):
+        # (stylesheet, {cls: {style_name: [(name, flattened selector,
+        #                                   index key), ...]}})
+        self._matchers = [(stylesheet, self._compile(stylesheet))
+                          for stylesheet in stylesheet.chain]
+        self._candidates = {}   # (styled type, style name) -> Candidates
+
+    @staticmethod
+    def _compile(stylesheet):
+        compiled = {}
+        for cls, style_selectors in stylesheet.matcher.items():
+            compiled_cls = compiled[cls] = {}
+            for style_name, selectors in style_selectors.items():
+                compiled_cls[style_name] = [
+                    (name, flattened, CompiledMatcher._index_key(flattened))
+                    for name, flattened in ((name, selector.flatten(stylesheet))
+                                            for name, selector
+                                            in selectors.items())]
+        return compiled
+
+    @staticmethod
+    def _index_key(selector):
+        """Return the ID or class required by the selector for the element
+        itself, or ``None``"""
+        selector = selector.selectors[-1]
+        if isinstance(selector, SelectorWithPriority):
+            selector = selector.selector
+        attributes = getattr(selector, 'attributes', {})
+        if 'has_id' in attributes:
+            return 'id', attributes['has_id']
+        if 'has_class' in attributes:
+            return 'class', attributes['has_class']
+        return None
+
+    def candidates(self, styled_type, style_name):
+        """Return the :class:`Candidates` for elements of type `styled_type`
+        with style name `style_name`"""
+        key = styled_type, style_name
+        try:
+            return self._candidates[key]
+        except KeyError:
+            pass
+        candidates = self._candidates[key] = Candidates()
+        style_names = (style_name, None) if style_name is not None else (None, )
+        for stylesheet, compiled in self._matchers:
+            for cls in styled_type.__mro__:
+                if cls not in compiled:
+                    continue
+                for name in style_names:
+                    for entry in compiled[cls].get(name, ()):
+                        candidates.add(stylesheet, *entry)
+        return candidates
+
+    def match(self, styled, document):
+        style = styled.style if isinstance(styled.style, str) else None
+        candidates = self.candidates(type(styled), style)
+        for name, selector, stylesheet in candidates.for_element(styled):
+            specificity = selector.match(styled, stylesheet, document)
+            if specificity:
+                yield Match(name, specificity)
+
+
+class Candidates(object):
+    """The selectors that can match elements of a particular type and style
+
+    Candidates requiring a particular ID or class are only returned for
+    elements that have this ID or class."""
+
+    def __init__(self):
+        self.count = 0
+        self.general = []       # [(position, name, selector, stylesheet)]
+        self.by_id = {}         # id -> [(position, name, ...)]
+        self.by_class = {}      # class -> [(position, name, ...)]
+
+    def add(self, stylesheet, name, selector, index_key):
+        entry = (self.count, name, selector, stylesheet)
+        self.count += 1
+        if index_key is None:
+            self.general.append(entry)
+        else:
+            kind, value = index_key
+            index = self.by_id if kind == 'id' else self.by_class
+            index.setdefault(value, []).append(entry)
+
+    def for_element(self, styled):
+        """Yield (name, selector, stylesheet) for the candidate selectors"""
+        entries = self.general
+        extra = []
+        if self.by_id:
+            for id in chain((styled.id, ), styled.secondary_ids):
+                extra.extend(self.by_id.get(id, ()))
+        if self.by_class:
+            for class_name in set(styled.classes):
+                extra.extend(self.by_class.get(class_name, ()))
+        if extra:
+            entries = sorted(chain(entries, extra))
+        for _, name, selector, stylesheet in entries:
+            yield name, selector, stylesheet
+
+
 class StyleSheet(RuleSet, Resource):
     """Dictionary storing a collection of related styles by name.
 
@@ -729,10 +882,53 @@ class StyleSheet(RuleSet, Resource):
                 raise KeyError("No selector found for style '{}'".format(name))
 
     def find_matches(self, styled, document):
-        for match in self.matcher.match(styled, self, document):
-            yield match
-        if self.base is not None:
-            yield from self.base.find_matches(styled, document)
+        return self.compiled_matcher.match(styled, document)
+
+    @property
+    def compiled_matcher(self):
+        """The :class:`CompiledMatcher` for this and the base style sheets
+
+        It is rebuilt when selectors have been added to one of the matchers
+        since it was last built."""
+        chain_state = tuple((id(stylesheet.matcher),
+                             len(stylesheet.matcher.by_name))
+                            for stylesheet in self.chain)
+        try:
+            compiled_state, compiled_matcher = self._compiled_matcher
+            if compiled_state == chain_state:
+                return compiled_matcher
+        except AttributeError:
+            pass
+        compiled_matcher = CompiledMatcher(self)
+        self._compiled_matcher = chain_state, compiled_matcher
+        return compiled_matcher
+
+    @property
+    def chain(self):
+        """This style sheet followed by its base style sheets"""
+        stylesheet = self
+        while stylesheet is not None:
+            yield stylesheet
+            stylesheet = stylesheet.base
+
+    def observed_attributes(self):
+        """Return the attributes of document elements inspected by the
+        selectors in this and the base style sheets
+
+        Returns:
+            dict: maps styled classes to the set of attribute names inspected
+                for instances of those classes
+
+        Raises:
+            NotImplementedError: if a selector does not report the attributes
+                it inspects
+
+        """
+        observed = {} if self.base is None else self.base.observed_attributes()
+        for selector in self.matcher.by_name.values():
+            for cls, attr in selector.observed_attributes(self):
+                observed.setdefault(cls, set()).add(attr)
+        return observed
 
     def write(self, base_filename):
         from configparser import ConfigParser
@@ -781,9 +977,15 @@ class StyleSheetFile(RuleSetFile, StyleSheet):
 
     """
 
+    persistent_caches = RuleSetFile.persistent_caches + ('_parse_selector', )
+
+    @cached
+    def _parse_selector(self, string):
+        return parse_selector(string)
+
     def process_section(self, style_name, selector, items):
         if selector:
-            selector = parse_selector(selector)
+            selector = self._parse_selector(selector)
             styled_class = selector.get_styled_class(self)
             if not isinstance(selector, StyledMeta):
                 self.matcher[style_name] = selector
@@ -1012,6 +1214,85 @@ ZERO_SPECIFICITY = Specificity(0, 0, 0, 0, 0)
 NO_MATCH = Match(None, ZERO_SPECIFICITY)
 
 
+class MatchSignatures(object):
+    """Determines match signatures for document elements
+
+    A selector can only inspect the type and the style name of an element
+    and of its parents, and the attributes passed to :meth:`StyledMeta.like`
+    (``has_class``, ``level``, ...). Elements for which these are all
+    equal are matched by the same selectors, so they can share the list of
+    matches. The match signature of an element collects these properties
+    for the element and all of its parents.
+
+    No signature is determined (:meth:`get` returns ``None``) when an
+    attribute value cannot be determined or is unhashable, or when the
+    style sheet contains selectors that do not report the attributes they
+    inspect. Such elements need to be matched individually.
+
+    Args:
+        stylesheet (StyleSheet): the style sheet providing the selectors
+
+    """
+
+    MISSING = object()      # value for attributes an element doesn't have
+
+    def __init__(self, stylesheet):
+        try:
+            self.observed = stylesheet.observed_attributes()
+        except (NotImplementedError, KeyError):
+            self.observed = None
+        self._attributes = {}   # styled type -> names of observed attributes
+        self._signatures = WeakMutableKeyDictionary()
+
+    def get(self, element, document):
+        """Return the match signature for `element` or ``None``"""
+        if self.observed is None or element is None:
+            return None
+        try:
+            return self._signatures[element]
+        except KeyError:
+            parent = element.parent
+            parent_signature = () if parent is None else self.get(parent,
+                                                                  document)
+            signature = None
+            if parent_signature is not None:
+                own_signature = self._element_signature(element, document)
+                if own_signature is not None:
+                    signature = (own_signature, parent_signature)
+            self._signatures[element] = signature
+            return signature
+
+    def _element_signature(self, element, document):
+        element_type = type(element)
+        style = getattr(element, 'style', None)
+        try:
+            attributes = self._attributes[element_type]
+        except KeyError:
+            attributes = self._attributes[element_type] = sorted(
+                {attr for cls, attrs in self.observed.items()
+                 if issubclass(element_type, cls) for attr in attrs})
+        try:
+            values = tuple(self._attribute_value(element, attr, document)
+                           for attr in attributes)
+            signature = (element_type, style if isinstance(style, str)
+                                       else None, values)
+            hash(signature)
+        except Exception:   # selectors will raise this when matching, if ever
+            return None
+        return signature
+
+    def _attribute_value(self, element, attr, document):
+        if attr in ('has_class', 'has_classes'):
+            return tuple(element.classes)
+        elif attr == 'has_id':
+            return element.id, tuple(element.secondary_ids)
+        try:
+            value = getattr(element, attr)
+        except AttributeError:
+            return self.MISSING
+        return value(document) if callable(value) else value
+
+
 class StyleLogEntry(object):
     def __init__(self, styled, container, matches, continued,
                  custom_message=None):
@@ -1045,92 +1326,116 @@ class StyleLog(object):
         with log_path.open('w', encoding='utf-8') as log:
             current_page = None
             current_container = None
-            for entry in self.entries:
-                if entry.page_number != current_page:
-                    current_page = entry.page_number
+            for (page_number, container, container_heading,
+                 text) in self.formatted_entries(document_source_root):
+                if page_number != current_page:
+                    current_page = page_number
                     log.write('{line} page {} {line}\n'.format(current_page,
                                                                line='-' * 34))
-                container = entry.container
-                if container.top_level_container is not current_container:
-                    current_container = container.top_level_container
-                    log.write("#### {}('{}')\n"
-                              .format(type(current_container).__name__,
-                                      current_container.name))
-                styled = entry.styled
-                level = styled.nesting_level
-                attrs = OrderedDict()
-                style = None
-                indent = '  ' * level
-                loc = ''
-                if styled.source:
+                if container != current_container:
+                    current_container = container
+                    log.write(container_heading)
+                log.write(text)
+
+    def formatted_entries(self, document_source_root):
+        """Yield the log entries formatted as text
+
+        Yields:
+            tuple: the entry's page number, a key identifying the top-level
+                container, the heading for the top-level container and the
+                text for the entry. Entries formatted in another process
+                (see :meth:`Document._render_part_group`) are stored as such
+                tuples in :attr:`entries`.
+
+        """
+        for entry in self.entries:
+            if isinstance(entry, tuple):
+                yield entry
+                continue
+            container = entry.container.top_level_container
+            heading = "#### {}('{}')\n".format(type(container).__name__,
+                                               container.name)
+            yield (entry.page_number, id(container), heading,
+                   self._format_entry(entry, document_source_root))
+
+    def _format_entry(self, entry, document_source_root):
+        log = []
+        container = entry.container
+        styled = entry.styled
+        level = styled.nesting_level
+        attrs = OrderedDict()
+        style = None
+        indent = '  ' * level
+        loc = ''
+        if styled.source:
+            try:
+                filename, line, tag_name = styled.source.location
+            except ValueError:
+                loc = f'   {styled.source.location}'
+            else:
+                if filename:
                     try:
-                        filename, line, tag_name = styled.source.location
+                        filename, extra = filename.split(':')
                     except ValueError:
-                        loc = f'   {styled.source.location}'
+                        extra = None
+                    file_path = Path(filename)
+                    if file_path.is_absolute():
+                        try:
+                            file_path = file_path.relative_to(
+                                document_source_root)
+                        except ValueError:
+                            pass
+                    loc = f'   {file_path}'
+                    if line:
+                        loc += f':{line}'
+                    if extra:
+                        loc += f' ({extra})'
+                if tag_name:
+                    classes = (f" classes='{' '.join(styled.classes)}'"
+                               if styled.classes else '')
+                    loc += f'   <{tag_name}{classes}>'
+        continued_text = '(continued) ' if entry.continued else ''
+        log.append('  {}{}{}{}'.format(indent, continued_text,
+                                      styled.short_repr(container), loc))
+        if entry.custom_message:
+            log.append('\n      {} ! {}\n'.format(indent,
+                                                  entry.custom_message))
+            return ''.join(log)
+        first = True
+        if style is not None:
+            first = False
+            style_attrs = ', '.join(key + '=' + value
+                                    for key, value in style.items())
+            log.append('\n      {} > {}({})'
+                       .format(indent, attrs['style'], style_attrs))
+        if entry:
+            for match in entry.matches:
+                base = ''
+                stylesheet = match.stylesheet
+                if stylesheet:
+                    if first:
+                        label = '>'
+                        first = False
                     else:
-                        if filename:
-                            try:
-                                filename, extra = filename.split(':')
-                            except ValueError:
-                                extra = None
-                            file_path = Path(filename)
-                            if file_path.is_absolute():
-                                try:
-                                    file_path = file_path.relative_to(
-                                        document_source_root)
-                                except ValueError:
-                                    pass
-                            loc = f'   {file_path}'
-                            if line:
-                                loc += f':{line}'
-                            if extra:
-                                loc += f' ({extra})'
-                        if tag_name:
-                            classes = (f" classes='{' '.join(styled.classes)}'"
-                                       if styled.classes else '')
-                            loc += f'   <{tag_name}{classes}>'
-                continued_text = '(continued) ' if entry.continued else ''
-                log.write('  {}{}{}{}'
-                          .format(indent, continued_text,
-                                  styled.short_repr(container), loc))
-                if entry.custom_message:
-                    log.write('\n      {} ! {}\n'.format(indent,
-                                                         entry.custom_message))
-                    continue
-                first = True
-                if style is not None:
-                    first = False
-                    style_attrs = ', '.join(key + '=' + value
-                                            for key, value in style.items())
-                    log.write('\n      {} > {}({})'
-                              .format(indent, attrs['style'], style_attrs))
-                if entry:
-                    for match in entry.matches:
-                        base = ''
-                        stylesheet = match.stylesheet
-                        if stylesheet:
-                            if first:
-                                label = '>'
-                                first = False
-                            else:
-                                label = ' '
-                            name = match.style_name
-                            style = self.stylesheet.get_configuration(name)
-                            base_name = ("DEFAULT" if style.base is None
-                                         else str(style.base))
-                            base = f' > {base_name}'
-                            stylesheet_path = Path(stylesheet)
-                            if stylesheet_path.is_absolute():
-                                stylesheet = stylesheet_path.relative_to(
-                                    document_source_root)
-                        else:
-                            label = 'x'
-                        specificity = ','.join(str(score)
-                                               for score in match.specificity)
-
-                        log.write('\n      {} {} ({}) {}{}{}'
-                                  .format(indent, label, specificity,
-                                          match.style_name,
-                                          f' [{stylesheet}]' if stylesheet
-                                          else '', base))
-                log.write('\n')
+                        label = ' '
+                    name = match.style_name
+                    style = self.stylesheet.get_configuration(name)
+                    base_name = ("DEFAULT" if style.base is None
+                                 else str(style.base))
+                    base = f' > {base_name}'
+                    stylesheet_path = Path(stylesheet)
+                    if stylesheet_path.is_absolute():
+                        stylesheet = stylesheet_path.relative_to(
+                            document_source_root)
+                else:
+                    label = 'x'
+                specificity = ','.join(str(score)
+                                       for score in match.specificity)
+
+                log.append('\n      {} {} ({}) {}{}{}'
+                           .format(indent, label, specificity,
+                                   match.style_name,
+                                   f' [{stylesheet}]' if stylesheet
+                                   else '', base))
+        log.append('\n')
+        return ''.join(log)
@@ -36,5 +36,6 @@ from .structure import Admonition, AdmonitionFlowables, AdmonitionTitleParagraph
 from .structure import TableOfContents, TableOfContentsEntry
 from .structure import OutOfLineFlowables
 from .table import TableWithCaption, Table, TableSection, TableHead, TableBody
+from .table import StreamingTable, StreamingTableBody
 from .table import TableRow, TableCell, TableCellBackground, TableCellBorder
 from .table import ListOfTables, ListOfTablesSection
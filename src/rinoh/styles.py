@@ -10,6 +10,6 @@ from .structure import HeadingStyle
 from .structure import HorizontalRuleStyle
 from .structure import ListStyle
 from .structure import TableOfContentsStyle
-from .table import TableStyle, TableCellStyle
+from .table import TableStyle, StreamingTableStyle, TableCellStyle
 from .table import TableCellBorderStyle, TableCellBackgroundStyle
 from .text import TextStyle
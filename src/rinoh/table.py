@@ -6,10 +6,14 @@
 # Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
 
 
-from collections.abc import Iterable
-from itertools import chain
+import csv
+
+from collections import deque
+from collections.abc import Iterable, Mapping
+from itertools import chain, islice
 from functools import partial
 from math import sqrt
+from operator import eq
 from token import NAME
 
 from .attribute import (Attribute, OptionSet, OverrideDefault, Integer, Bool,
@@ -19,20 +23,29 @@ from .draw import Line, Rectangle, ShapeStyle, LineStyle
 from .flowable import (Flowable, FlowableStyle, FlowableState, FlowableWidth,
                        Float, FloatStyle)
 from .layout import MaybeContainer, VirtualContainer, EndOfContainer
+from .paragraph import Paragraph
 from .structure import (StaticGroupedFlowables, GroupedFlowablesStyle,
                         ListOf, ListOfSection)
 from .style import Styled
+from .text import StyledText
 from .util import ReadAliasAttribute, INF
 
 
 __all__ = ['Table', 'TableStyle', 'TableWithCaption', 'TableWithCaptionStyle',
-           'TableSection', 'TableHead', 'TableBody', 'TableRow',
+           'StreamingTable', 'StreamingTableStyle',
+           'TableSection', 'TableHead', 'TableBody', 'StreamingTableBody',
+           'TableRow',
            'TableCell', 'TableCellStyle',
            'TableCellBorder', 'TableCellBorderStyle',
            'TableCellBackground', 'TableCellBackgroundStyle', 'VerticalAlign',
            'ListOfTables', 'ListOfTablesSection']
 
 
+# the style attributes that determine a table cell's width given its content
+CELL_WIDTH_STYLE = ('margin_left', 'margin_right', 'padding', 'padding_left',
+                    'padding_right', 'border', 'border_left', 'border_right')
+
+
 class TableState(FlowableState):
     table = ReadAliasAttribute('flowable')
 
@@ -107,6 +120,12 @@ class TableStyle(FlowableStyle):
                                                'split across pages')
     repeat_head = Attribute(Bool, False, 'Repeat the head when the table is '
                                          'split across pages')
+    column_sizing_rows = Attribute(Integer, 0, 'The maximum number of body '
+                                               'rows to measure for sizing '
+                                               'the columns; longer tables '
+                                               'are sampled at regular '
+                                               'intervals. 0 measures all '
+                                               'rows')
 
 
 NEVER_SPLIT = float('+inf')
@@ -155,7 +174,7 @@ class Table(Flowable):
         get_style = partial(self.get_style, container=container)
         with MaybeContainer(container) as maybe_container:
             def render_rows(section, next_row_index=0):
-                rows = section[next_row_index:]
+                rows = section.iter_rows(next_row_index)
                 rendered_spans = self._render_section(container, rows,
                                                       state.column_widths)
                 for rendered_rows, is_last_span in rendered_spans:
@@ -177,7 +196,7 @@ class Table(Flowable):
             # body rows
             if self.body:
                 next_row_index = render_rows(self.body, state.body_row_index)
-                rows_left = len(self.body) - next_row_index
+                rows_left = self.body.num_rows - next_row_index
                 if rows_left > 0:
                     split_minimum_rows = get_style('split_minimum_rows')
                     if min(next_row_index, rows_left) >= split_minimum_rows:
@@ -224,8 +243,9 @@ class Table(Flowable):
                       ' available width')
 
         # minimum (wrap content) and maximum (non wrapping) column widths
-        min_widths = self._widths_from_content(final, 0, container)
-        max_widths = self._widths_from_content(final, INF, container)
+        rows = self._sizing_rows(container)
+        min_widths = self._widths_from_content(final, 0, rows, container)
+        max_widths = self._widths_from_content(final, INF, rows, container)
 
         # calculate max column widths respecting the specified relative
         #   column widths (padding columns with whitespace)
@@ -297,20 +317,45 @@ class Table(Flowable):
                 final[i] += per_column_surplus
         return final
 
-    def _widths_from_content(self, fixed, max_cell_width, container):
-        """Calculate required column widths given a maximum cell width"""
+    def _sizing_rows(self, container):
+        """The rows measured for sizing the columns: the head rows and the
+        body rows, or a sample of these (see `column_sizing_rows`)"""
+        body = self.body or []
+        num_rows = self.get_style('column_sizing_rows', container)
+        if num_rows and len(body) > num_rows:
+            body = [body[index * len(body) // num_rows]
+                    for index in range(num_rows)]
+        return list(chain(self.head or [], body))
+
+    def _widths_from_content(self, fixed, max_cell_width, rows, container):
+        """Calculate required column widths given a maximum cell width
+
+        The content widths of the cells are stored in the document, so that
+        they are only measured once (unless they depend on references or the
+        cell's resolved style changes)."""
+        document = container.document
+
         def cell_content_width(cell):
-            buffer = VirtualContainer(container, width=max_cell_width,
-                                      never_placed=True)
-            width, _, _ = cell.flow(buffer, None)
-            return float(width)
+            style = cell.style_digest(CELL_WIDTH_STYLE, container)
+            try:
+                cell_widths = document.content_widths[cell]
+            except KeyError:
+                cell_widths = document.content_widths[cell] = {}
+            width_style, width = cell_widths.get(max_cell_width, (None, None))
+            if width is not None and width_style == style:
+                return width
+            read_count = document.dependencies.read_count
+            width = cell.content_width(container, max_cell_width)
+            if document.dependencies.read_count == read_count:
+                cell_widths[max_cell_width] = style, width
+            return width
 
         widths = [width if width else 0 for width in fixed]
         fixed_width_cols = set(i for i, width in enumerate(widths) if width)
 
         # find the maximum content width for all non-column-spanning cells for
         #   each non-fixed-width column
-        for row in chain(self.head or [], self.body or []):
+        for row in rows:
             for cell in (cell for cell in row if cell.colspan == 1):
                 col = int(cell.column_index)
                 if col not in fixed_width_cols:
@@ -318,7 +363,7 @@ class Table(Flowable):
 
         # divide the extra space needed for column-spanning cells equally over
         #   the spanned columns (skipping fixed-width columns)
-        for row in chain(self.head or [], self.body or []):
+        for row in rows:
             for cell in (cell for cell in row if cell.colspan > 1):
                 c = int(cell.column_index)
                 c_end = c + cell.colspan
@@ -335,12 +380,12 @@ class Table(Flowable):
     def _render_section(cls, container, rows, column_widths):
         rendered_rows = []
         rows_left_in_span = 0
-        for row in rows:
+        for row, is_last in rows:
             rows_left_in_span = max(row.maximum_rowspan, rows_left_in_span) - 1
             rendered_row = cls._render_row(column_widths, container, row)
             rendered_rows.append(rendered_row)
             if rows_left_in_span == 0:
-                is_last_span = row == rows[-1]
+                is_last_span = is_last()
                 yield cls._vertically_size_cells(rendered_rows), is_last_span
                 rendered_rows = []
         assert not rendered_rows
@@ -425,6 +470,97 @@ class TableWithCaption(Float, StaticGroupedFlowables):
     category = 'table'
 
 
+class StreamingTableStyle(TableStyle):
+    column_sizing_rows = OverrideDefault(100)
+
+
+class StreamingTable(Table):
+    """A table whose body rows are created only as they are rendered
+
+    Meant for very long tables generated from a database query or read from a
+    file. Only the rows that are being rendered and the rows measured for
+    sizing the columns are kept in memory (see :class:`StreamingTableBody`).
+    Automatic-width columns are sized based on the first
+    `column_sizing_rows` body rows (all rows if set to 0); specify the
+    `column_widths` to avoid measuring cell contents altogether.
+
+    Args:
+        rows (iterable or callable): the body rows; see
+            :class:`StreamingTableBody`
+        head (TableHead or None): the table's head, repeated on each page
+            when the `repeat_head` style attribute is set
+
+    See :class:`Table` for the other arguments.
+
+    """
+
+    style_class = StreamingTableStyle
+
+    def __init__(self, rows, head=None, align=None, width=None,
+                 column_widths=None, id=None, style=None, parent=None):
+        super().__init__(None, head=head, align=align, width=width,
+                         column_widths=column_widths, id=id, style=style,
+                         parent=parent)
+        self.body = StreamingTableBody(rows, parent=self)
+
+    @classmethod
+    def from_csv(cls, filename, head=True, encoding='utf-8', dialect='excel',
+                 **kwargs):
+        """Create a table displaying the records in a CSV file
+
+        The file is read while the table is rendered.
+
+        Args:
+            filename (str or Path): the CSV file
+            head (bool): use the first record as the table's head
+            encoding (str): the text encoding of the file
+            dialect (str or csv.Dialect): passed to :func:`csv.reader`
+            kwargs: passed to the :class:`StreamingTable` constructor
+
+        """
+        def read(skip_head):
+            with open(filename, newline='', encoding=encoding) as file:
+                records = csv.reader(file, dialect)
+                if skip_head:
+                    next(records, None)
+                yield from records
+
+        if head:
+            titles = next(read(False), [])
+            kwargs['head'] = TableHead([TableRow.from_values(titles)])
+        return cls(partial(read, head), **kwargs)
+
+    @classmethod
+    def from_columns(cls, columns, **kwargs):
+        """Create a table from column-oriented data
+
+        Args:
+            columns (Mapping or Sequence): the table's columns, each an
+                iterable of cell values (a list or an Arrow or NumPy array,
+                for example). If this is a mapping, its keys serve as the
+                column titles in the table's head.
+            kwargs: passed to the :class:`StreamingTable` constructor
+
+        """
+        if isinstance(columns, Mapping):
+            head_row = TableRow.from_values(columns.keys())
+            kwargs.setdefault('head', TableHead([head_row]))
+            columns = list(columns.values())
+        return cls(partial(zip, *columns), **kwargs)
+
+    def render(self, container, last_descender, state, **kwargs):
+        # the preceding rows have been placed in preceding containers
+        self.body.discard_rows(state.body_row_index)
+        split_minimum_rows = self.get_style('split_minimum_rows', container)
+        self.body.lookahead = max(split_minimum_rows, 1)
+        return super().render(container, last_descender, state, **kwargs)
+
+    def _sizing_rows(self, container):
+        num_rows = self.get_style('column_sizing_rows', container)
+        return list(chain(self.head or [],
+                          self.body.pinned_rows(num_rows or None)))
+
+
 class TableSection(Styled, list):
     def __init__(self, rows, style=None, parent=None):
         Styled.__init__(self, style=style, parent=parent)
@@ -440,6 +576,24 @@ class TableSection(Styled, list):
     def num_columns(self):
         return sum(cell.colspan for cell in self[0])
 
+    @property
+    def num_rows(self):
+        return len(self)
+
+    def iter_rows(self, start=0):
+        """Iterate over the rows in this section, starting at index `start`
+
+        Yields each row together with a callable that returns whether the row
+        is the section's last row.
+
+        """
+        rows = self[start:]
+        for row in rows:
+            yield row, partial(eq, row, rows[-1])
+
+    def _row_index(self, row):
+        return next(i for i, item in enumerate(self) if item is row)
+
 
 class TableHead(TableSection):
     pass
@@ -449,6 +603,147 @@ class TableBody(TableSection):
     pass
 
 
+class StreamingTableBody(TableBody):
+    """A table body that creates its rows as they are needed
+
+    Only the rows that are being flowed into the current container are kept
+    in memory, together with the first rows that are measured for sizing the
+    table's columns. Cells spanning multiple rows are not supported.
+
+    Args:
+        rows (iterable or callable): the body rows; each row is either a
+            :class:`TableRow` or a sequence of cell contents
+            (:class:`TableCell`, :class:`.Flowable`, :class:`.StyledText` or
+            any other value, which is converted to a string). The rows are
+            iterated over again when rows that have been discarded are needed
+            again, in a following rendering pass for example. A one-shot
+            iterator is therefore not accepted; pass a callable returning a
+            new iterator instead (one that executes a database query, for
+            example).
+
+    """
+
+    def __init__(self, rows, style=None, parent=None):
+        if not callable(rows) and iter(rows) is rows:
+            raise TypeError('The rows of a streaming table body need to be '
+                            'iterable more than once; pass a callable that '
+                            'returns an iterator over the rows instead')
+        super().__init__([], style=style, parent=parent)
+        self.rows = rows
+        self.lookahead = 1          # minimum number of records read ahead
+        self._pinned = []           # the first rows, kept for column sizing
+        self._flowable_target = None
+        self._records = None
+        self._pending = deque()     # records read ahead
+        self._offset = 0            # the index of the first row in the list
+        self._exhausted = False
+
+    def __bool__(self):
+        try:
+            self._row(0)
+        except IndexError:
+            return False
+        return True
+
+    def prepare(self, flowable_target):
+        self._flowable_target = flowable_target
+        super().prepare(flowable_target)    # the rows created so far
+
+    @property
+    def num_columns(self):
+        return sum(cell.colspan for cell in self._row(0))
+
+    @property
+    def num_rows(self):
+        """The number of rows, or a lower bound when not all records have
+        been read yet"""
+        return self._offset + len(self) + len(self._pending)
+
+    def iter_rows(self, start=0):
+        index = start
+        while True:
+            try:
+                row = self._row(index)
+            except IndexError:
+                return
+            index += 1
+            yield row, partial(self._is_last_row, index)
+
+    def _is_last_row(self, next_index):
+        try:
+            self._row(next_index)
+        except IndexError:
+            return True
+        return False
+
+    def pinned_rows(self, num_rows=None):
+        """Return the first `num_rows` rows (all rows if ``None``); these
+        are kept in memory from then on"""
+        rows = [row for row, _ in islice(self.iter_rows(), num_rows)]
+        self._pinned[len(self._pinned):] = rows[len(self._pinned):]
+        return rows
+
+    def discard_rows(self, index):
+        """Release the rows preceding the row at `index`"""
+        if index > self._offset:
+            num_discarded = min(index - self._offset, len(self))
+            del self[:num_discarded]
+            self._offset += num_discarded
+
+    def _row_index(self, row):
+        for rows, offset in ((self, self._offset), (self._pinned, 0)):
+            for i, item in enumerate(rows):
+                if item is row:
+                    return offset + i
+        raise ValueError('{} is not a row in this table body'.format(row))
+
+    def _row(self, index):
+        if index < len(self._pinned):
+            return self._pinned[index]
+        if self._records is None or index < self._offset:
+            self._restart(index)
+        while self._offset + len(self) <= index:
+            if not self._read_ahead():
+                raise IndexError('table body row index out of range')
+            row = self._create_row(self._pending.popleft())
+            self.append(row)
+            if self._flowable_target:
+                row.prepare(self._flowable_target)
+        return self[index - self._offset]
+
+    def _restart(self, index):
+        """Iterate over the rows from the start, skipping the records up to
+        `index` (except for those to be pinned)"""
+        self._records = iter(self.rows() if callable(self.rows) else self.rows)
+        self._pending.clear()
+        self._exhausted = False
+        del self[:]
+        for _ in range(index):
+            if not self._read_ahead():
+                break
+            self._pending.popleft()
+        self._offset = index
+
+    def _read_ahead(self):
+        """Read records until `lookahead` records are pending; returns
+        ``False`` if there are no more records"""
+        while not self._exhausted and len(self._pending) <= self.lookahead:
+            try:
+                self._pending.append(next(self._records))
+            except StopIteration:
+                self._exhausted = True
+        return bool(self._pending)
+
+    def _create_row(self, record):
+        row = (record if isinstance(record, TableRow)
+               else TableRow.from_values(record))
+        if any(cell.rowspan > 1 for cell in row):
+            raise ValueError('Cells in a streaming table body cannot span'
+                             ' multiple rows')
+        row.parent = self
+        return row
+
+
 class TableRow(Styled, list):
     def __init__(self, cells, style=None, parent=None):
         Styled.__init__(self, style=style, parent=parent)
@@ -456,6 +751,26 @@ class TableRow(Styled, list):
         for cell in cells:
             cell.parent = self
 
+    @classmethod
+    def from_values(cls, values, style=None):
+        """Create a row with a cell for each of `values`
+
+        Each value is a :class:`TableCell`, a :class:`.Flowable` or the text
+        for a paragraph: :class:`.StyledText` or any other value, which is
+        converted to a string (``None`` yields an empty cell).
+
+        """
+        def cell(value):
+            if isinstance(value, TableCell):
+                return value
+            if not isinstance(value, Flowable):
+                if not isinstance(value, StyledText):
+                    value = '' if value is None else str(value)
+                value = Paragraph(value)
+            return TableCell([value])
+
+        return cls([cell(value) for value in values], style=style)
+
     @property
     def maximum_rowspan(self):
         return max((cell.rowspan for cell in self), default=1)
@@ -466,7 +781,7 @@ class TableRow(Styled, list):
 
     @property
     def _index(self):
-        return next(i for i, item in enumerate(self.parent) if item is self)
+        return self.parent._row_index(self)
 
     def get_rowspanned_columns(self):
         """Return a dictionary mapping column indices to the number of columns
@@ -548,8 +863,7 @@ class Index(object):
 
 class RowIndex(Index):
     def __int__(self):
-        return next(i for i, row in enumerate(self.table_section)
-                    if row is self.row)
+        return self.row._index
 
     def __iter__(self):
         index = int(self)
@@ -557,7 +871,7 @@ class RowIndex(Index):
 
     @property
     def num_items(self):
-        return len(self.table_section)
+        return self.table_section.num_rows
 
 
 class ColumnIndex(Index):
@@ -410,20 +410,45 @@ class DocumentPart(Templated, metaclass=DocumentLocationType):
     @property
     def number_of_pages(self):
         try:
-            return self.document.part_page_counts[self.template.name].count
+            count = self.document.part_page_counts[self.template.name].count
         except KeyError:
-            return 0
+            count = 0
+        self.document.dependencies.register_read(self.template.name,
+                                                 NUMBER_OF_PAGES, count)
+        return count
 
     def prepare(self):
         for flowable in self._flowables(self.document):
             flowable.prepare(self)
 
-    def render(self, first_page_number):
-        self.chain.init_state()
-        self.add_page(self.first_page(first_page_number))
-        page_number = first_page_number
-        sideways_chain = None
-        for page in self.pages:
+    def render(self, first_page_number, resume_at=None):
+        """Render the flowables of this document part to pages
+
+        Args:
+            first_page_number (int): the page number for the first page
+            resume_at (PageSnapshot): continue rendering from the state saved
+                in this snapshot instead of starting from the first page; the
+                pages preceding it are kept
+
+        Returns:
+            int: the number of pages in this document part
+
+        """
+        if resume_at:
+            create_page, page_number, sideways_chain = \
+                resume_at.restore_part(self)
+        else:
+            self.chain.init_state()
+            create_page = partial(self.first_page, first_page_number)
+            page_number = first_page_number
+            sideways_chain = None
+        while create_page:
+            self.document.save_page_state(self, create_page, page_number,
+                                          sideways_chain)
+            page = create_page()
+            self.add_page(page)
+            self.document.dependencies.start_page(page)
+            create_page = None
             restart = None
             page_number += 1
             try:
@@ -436,21 +461,24 @@ class DocumentPart(Templated, metaclass=DocumentLocationType):
             except PageBreakException as pbe:
                 break_type = None
             page.place()
+            if self.document.stream_output:
+                self.document.backend_document.flush_page(page.backend_page)
+                page.discard_canvas()
             next_page_type = 'left' if page.number % 2 else 'right'
             if not sideways_chain or sideways_chain.done:
                 sideways_float = self.document.next_sideways_float()
                 sideways_chain = (Chain(self) << sideways_float
                                   if sideways_float else None)
             if sideways_chain:
-                page = self.new_page(page_number, sideways_chain,
-                                     new_chapter=False, sideways=True)
-                self.add_page(page)
+                create_page = partial(self.new_page, page_number,
+                                      sideways_chain, new_chapter=False,
+                                      sideways=True)
             elif self.chain and not self.chain.done:
                 next_page_breaks = next_page_type == break_type
                 if restart and next_page_breaks:
                     page_number = 1
-                page = self.new_page(page_number, self.chain, next_page_breaks)
-                self.add_page(page)     # this grows self.pages!
+                create_page = partial(self.new_page, page_number, self.chain,
+                                      next_page_breaks)
         next_page_type = 'right' if page_number % 2 else 'left'
         end_at_page = self.get_config_value('end_at_page', self.document)
         if next_page_type == end_at_page:
@@ -805,4 +833,7 @@ class DocumentTemplate(Document, AttributesDictionary, Resource,
 
     def prepare(self, flowable_target):
         for part_template in self.part_templates:
+            first_section = len(self._sections)
             part_template.prepare(flowable_target)
+            self._part_sections[part_template.name] = \
+                self._sections[first_section:]
@@ -99,6 +99,32 @@ class NoBreakAfter(AttributeType, list):
         return f'``{LANGUAGE_DEFAULT}``, or a space-separated list of words'
 
 
+class FontFeatures(AttributeType, list):
+    """List of OpenType feature tags"""
+
+    def __str__(self):
+        return ' '.join(self)
+
+    @classmethod
+    def check_type(cls, value):
+        return (isinstance(value, (list, tuple))
+                and all(isinstance(item, str) and 0 < len(item) <= 4
+                        for item in value))
+
+    @classmethod
+    def from_string(cls, string, source=None):
+        tags = string.split()
+        if not cls.check_type(tags):
+            raise ParseError("'{}' is not a space-separated list of OpenType "
+                             "feature tags".format(string))
+        return tags
+
+    @classmethod
+    def doc_format(cls):
+        return ('a space-separated list of OpenType feature tags such as '
+                '``smcp onum``')
+
+
 class InlineStyled(Styled):
     """"""
 
@@ -340,6 +366,8 @@ class TextStyle(InlineStyle):
     kerning = Attribute(Bool, True, 'Improve inter-letter spacing')
     ligatures = Attribute(Bool, True, 'Run letters together where possible')
     character_spacing = Attribute(Dimension, 0*PT, 'Additional spacing between characters')
+    font_features = Attribute(FontFeatures, FontFeatures(),
+                              'Additional OpenType features to enable')
     hyphenate = Attribute(Bool, True, 'Allow words to be broken over two lines')
     hyphen_chars = Attribute(Integer, 2, 'Minimum number of characters in a '
                                          'hyphenated part of a word')
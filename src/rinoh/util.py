@@ -29,8 +29,12 @@ from collections import OrderedDict
 from collections.abc import MutableMapping
 from functools import wraps, partial
 from itertools import tee
+from pathlib import Path
+from tempfile import NamedTemporaryFile
 from weakref import ref
 
+from appdirs import AppDirs
+
 
 __all__ = ['INF', 'all_subclasses', 'clamp', 'intersperse', 'itemcount',
            'PeekIterator', 'posix_path',
@@ -38,8 +42,8 @@ __all__ = ['INF', 'all_subclasses', 'clamp', 'intersperse', 'itemcount',
            'class_property', 'timed', 'Decorator', 'ReadAliasAttribute',
            'NotImplementedAttribute', 'NamedDescriptor',
            'WithNamedDescriptors', 'ContextManager',
-           'WeakMutableKeyDictionary',
-           'VersionError']
+           'WeakMutableKeyDictionary', 'LRUCache', 'cache_dir',
+           'atomic_write', 'VersionError']
 
 
 # constants
@@ -302,6 +306,8 @@ class ContextManager(object):
         raise NotImplementedError
 
 
+# containers
+
 # http://stackoverflow.com/a/3387975/438249
 class WeakMutableKeyDictionary(MutableMapping):
     """A dictionary that accepts mutable keys and references them weakly
@@ -339,6 +345,65 @@ class WeakMutableKeyDictionary(MutableMapping):
         return len(self.store)
 
 
+class LRUCache(OrderedDict):
+    """A dictionary holding at most `maxsize` items
+
+    Looking up or storing an item marks it as the most recently used item.
+    When the dictionary grows beyond `maxsize` items, the least recently used
+    item is discarded."""
+
+    def __init__(self, maxsize):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            del self[next(iter(self))]  # popitem() looks up the item first
+
+
+# cache files
+
+def cache_dir(name):
+    """Return the path to the `name` subdirectory of rinohtype's cache
+    directory (the directory is not created)"""
+    return Path(AppDirs("rinohtype", "opqode").user_cache_dir) / name
+
+
+def atomic_write(path, data):
+    """Write `data` to the file at `path`, creating its parent directory
+
+    The data is first written to a temporary file in the same directory,
+    which then replaces `path`, so that other processes never see a partially
+    written file. When writing fails, the temporary file is removed and the
+    :class:`OSError` is propagated."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = NamedTemporaryFile(dir=path.parent, delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+    except BaseException:
+        try:
+            os.remove(tmp.name)
+        except OSError:
+            pass
+        raise
+
+
 # exceptions
 
 class VersionError(Exception):
@@ -0,0 +1,147 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+import multiprocessing
+
+import pytest
+
+from rinoh.backend.pdf.reader import PDFReader
+from rinoh.document import DependencyGraph
+from rinoh.frontend.rst import ReStructuredTextReader
+from rinoh.reference import ReferenceType, NUMBER_OF_PAGES
+from rinoh.templates import Book
+
+
+class FakePage(object):
+    def __init__(self, formatted_number):
+        self.formatted_number = formatted_number
+
+
+class FakeDocument(object):
+    def __init__(self, page_references, number_of_pages):
+        self.page_references = page_references
+        self.number_of_pages = number_of_pages
+        self.page_elements = {}
+
+    def read_value(self, id, type):
+        if type == NUMBER_OF_PAGES:
+            return self.number_of_pages
+        return self.page_references.get(id, 'XX')
+
+
+def render_pages(graph, reads_per_page):
+    pages = []
+    for number, reads in enumerate(reads_per_page, start=1):
+        page = FakePage(str(number))
+        graph.start_page(page)
+        for id, type, value in reads:
+            graph.register_read(id, type, value)
+        pages.append(page)
+    graph.end_pass()
+    return pages
+
+
+PAGE = ReferenceType.PAGE
+
+
+def test_dependency_graph_invalidated_pages():
+    graph = DependencyGraph()
+    page1, page2, page3 = render_pages(graph, [
+        [('intro', PAGE, '1')],
+        [('appendix', PAGE, 'XX'), ('intro', PAGE, '1')],
+        [('contents', NUMBER_OF_PAGES, 0)],
+    ])
+    document = FakeDocument({'intro': '1', 'appendix': '3'}, 3)
+    document.page_elements = {'intro': page1, 'appendix': page3}
+    assert graph.pages == [page1, page2, page3]
+    assert graph.invalidated_pages(document) == [page2, page3]
+    assert graph.changed_references(document) == {('appendix', PAGE),
+                                                  ('contents', NUMBER_OF_PAGES)}
+    assert graph.dependents('intro') == [page1, page2]
+    assert graph.dependents('appendix', PAGE) == [page2]
+    assert graph.dependencies(page2) == {('appendix', PAGE): 'XX',
+                                         ('intro', PAGE): '1'}
+    assert graph.forward_references(page1, document) == set()
+    assert graph.forward_references(page2, document) == {('appendix', PAGE)}
+    assert list(graph.summary(document)) == [
+        'page 2 depends on 1 forward reference',
+        'page 3 depends on 1 forward reference']
+
+
+def test_dependency_graph_inconsistent_reads():
+    graph = DependencyGraph()
+    page, = render_pages(graph, [[('target', PAGE, 'XX'),
+                                  ('target', PAGE, '1')]])
+    document = FakeDocument({'target': '1'}, 1)
+    assert graph.invalidated_pages(document) == [page]
+
+
+def test_dependency_graph_discard_pages():
+    graph = DependencyGraph()
+    page1, page2, page3 = render_pages(graph, [[], [], []])
+    graph.register_read('target', PAGE, 'XX')  # not rendering; ignored
+    graph.discard_pages(1)
+    assert graph.pages == [page1]
+    assert graph.dependencies(page1) == {}
+    graph.clear()
+    assert graph.pages == []
+
+
+RST = """\
+=====
+Title
+=====
+
+.. contents::
+
+{}
+"""
+
+SECTION = """\
+Section {0}
+=========
+
+Section {0} links to `section-{1}`_.
+
+.. _section-{0}:
+
+Target {0}
+--------
+
+{2}
+"""
+
+
+def render_book(tmp_path, name, processes):
+    sections = '\n'.join(SECTION.format(index, (index + 1) % 5,
+                                        'Lorem ipsum dolor sit amet. ' * 50)
+                         for index in range(5))
+    rst_path = tmp_path / 'book.rst'
+    rst_path.write_text(RST.format(sections))
+    document = Book(ReStructuredTextReader().parse(rst_path))
+    document._processes = processes
+    document.render(tmp_path / name)
+    reader = PDFReader(tmp_path / (name + '.pdf'))
+    return document, reader.catalog
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason="requires the 'fork' start method")
+def test_render_parallel(tmp_path, monkeypatch):
+    monkeypatch.setenv('RINOH_NO_CACHE', '1')
+    sequential, seq_catalog = render_book(tmp_path, 'sequential', 0)
+    parallel, par_catalog = render_book(tmp_path, 'parallel', 2)
+    assert len(parallel._part_groups()) > 1
+    assert (par_catalog['Pages']['Count']
+            == seq_catalog['Pages']['Count'])
+    assert (named_references(parallel.page_references)
+            == named_references(sequential.page_references))
+
+
+def named_references(page_references):
+    return {id: value for id, value in page_references.items()
+            if isinstance(id, str)}     # unique IDs are assigned differently
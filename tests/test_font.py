@@ -6,12 +6,18 @@
 # Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
 
 
+import os
+
 import pytest
 
 from rinoh.font import Typeface, MissingGlyphException
+from rinoh.font.opentype import OpenTypeFont
 from rinoh.font.style import FontWeight, FontSlant, FontWidth
 
 
+DIR = os.path.dirname(__file__)
+
+
 def test_missingglyph_type1():
     times = Typeface('Times')
     font = times.get_font(weight=FontWeight.REGULAR)
@@ -43,3 +49,93 @@ def test_find_closest_font():
 
     assert extra_choice(FontWeight, FontWeight.REGULAR, FontWeight.REGULAR + 5)
     assert extra_choice(FontWeight, FontWeight.MEDIUM, FontWeight.MEDIUM - 20)
+
+
+def test_opentype_lazy_tables():
+    font = OpenTypeFont(os.path.join(DIR, 'texgyretermes-regular.otf'))
+    assert 'GPOS' in font and 'CFF' in font and 'glyf' not in font
+    assert 'GPOS' not in dict.keys(font)
+    a, v = (font.get_glyph_metrics(char, 'normal') for char in 'AV')
+    assert font.get_kerning(a, v) < 0
+    assert 'GPOS' in dict.keys(font)
+    assert a.bounding_box is None    # not extracted from CFF outlines
+    with pytest.raises(KeyError):
+        font['DSIG']
+
+
+def test_opentype_verify_checksums(tmp_path):
+    data = bytearray(open(os.path.join(DIR, 'Cuprum.otf'), 'rb').read())
+    font = OpenTypeFont(os.path.join(DIR, 'Cuprum.otf'),
+                        verify_checksums=True)
+    name_offset = font._table_records['name']['offset']
+    data[name_offset + 20] ^= 0xFF
+    corrupt_path = tmp_path / 'corrupt.otf'
+    corrupt_path.write_bytes(data)
+    OpenTypeFont(corrupt_path)
+    with pytest.raises(AssertionError):
+        OpenTypeFont(corrupt_path, verify_checksums=True)
+
+
+def test_font_metrics_cache(tmp_path, monkeypatch):
+    from rinoh.fonts import FONTS_PATH
+    from rinoh.font.type1 import Type1Font
+
+    monkeypatch.setattr('rinoh.font.cache.CACHE_PATH', tmp_path)
+    times_path = os.path.join(FONTS_PATH, 'adobe14', 'Times-Roman')
+    otf_path = os.path.join(DIR, 'texgyretermes-regular.otf')
+    derived = Type1Font(times_path, core=True), OpenTypeFont(otf_path)
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == ['.afm',
+                                                                  '.otf']
+    cached = Type1Font(times_path, core=True), OpenTypeFont(otf_path)
+    for derived_font, cached_font in zip(derived, cached):
+        f, i = (cached_font.get_glyph_metrics(char, 'normal') for char in 'fi')
+        assert cached_font.get_glyph_metrics('f', 'normal') is f
+        assert f.width == derived_font.get_glyph_metrics('f', 'normal').width
+        assert cached_font.get_ligature(f, i) is not None
+    times, termes = cached
+    a, v = (times.get_glyph_metrics(char, 'normal') for char in 'AV')
+    assert (a.name, a.code, a.bounding_box) == ('A', 65, (15, 0, 706, 674))
+    assert times.get_kerning(a, v) == -135
+    assert times.encoding == derived[0].encoding
+    assert termes._encoding == derived[1]._encoding
+    assert 'A' in termes._glyphs and '\U0001F600' not in termes._glyphs
+
+
+def test_glyph_ranges():
+    from rinoh.font.opentype.layout import GlyphRanges
+
+    records = [(10, 12, 0), (3, 5, 3), (20, 20, 6)]
+    dense = GlyphRanges(records, increment=True)
+    sparse = GlyphRanges(records + [(60000, 60001, 7)], increment=True)
+    assert dense.dense is not None and sparse.dense is None
+    for ranges in (dense, sparse):
+        assert [ranges.get(glyph_id) for glyph_id in range(2, 14)] \
+            == [None, 3, 4, 5, None, None, None, None, 0, 1, 2, None]
+        assert ranges.get(20) == 6 and ranges.get(21, 0) == 0
+    assert sparse.get(60001) == 8
+
+
+def test_kerning_matrix():
+    font = OpenTypeFont(os.path.join(DIR, 'Cuprum.otf'))
+    glyphs = [font.get_glyph_metrics(char, 'normal')
+              for char in 'AVTWYavoe.,']
+    kerning = [font.get_kerning(a, b) for a in glyphs for b in glyphs]
+    assert any(kerning)
+    plan = font.get_shaping_plan()
+    assert set(plan._kerning_matrix) == {glyph.code for glyph in glyphs}
+    assert kerning == [plan._lookup_kerning(a, b)
+                       for a in glyphs for b in glyphs]
+
+
+def test_shaping_plan():
+    font = OpenTypeFont(os.path.join(DIR, 'texgyretermes-regular.otf'))
+    plan = font.get_shaping_plan('normal', ['onum', 'liga', 'kern', 'liga'])
+    assert plan.features == ('kern', 'liga', 'onum')
+    assert font.get_shaping_plan('normal', ['kern', 'onum', 'liga']) is plan
+    assert font.get_shaping_plan() is not plan
+    oldstyle_one = font.get_glyph_metrics('1', 'oldstyle figures')
+    assert font.get_glyph_metrics('1', 'normal') is not oldstyle_one
+    assert plan.get_glyph_metrics('1') is oldstyle_one
+    f, i = (plan.get_glyph_metrics(char) for char in 'fi')
+    assert plan.get_ligature(f, i) is font.get_ligature(f, i) is not None
+    assert font.get_shaping_plan('normal', []).get_ligature(f, i) is None
@@ -0,0 +1,107 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+
+import mmap
+
+from pathlib import Path
+
+import pytest
+
+from rinoh import DATA_PATH
+from rinoh.hyphenator import CompiledPatterns, Hyph_dict, parse_dic_file
+
+
+EN_US = Path(DATA_PATH) / 'hyphen' / 'hyph_en_US.dic'
+
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.setattr('rinoh.hyphenator.CACHE_PATH', tmp_path)
+    return tmp_path
+
+
+def test_compiled_patterns():
+    patterns = parse_dic_file(EN_US)
+    compiled = CompiledPatterns(CompiledPatterns.compile(patterns))
+    assert len(compiled) == len(patterns)
+    assert compiled.maxlen == max(map(len, patterns))
+    for key, (start, values) in patterns.items():
+        assert compiled.get(key) == (start, values)
+    assert compiled.get('qqqq') is None
+
+
+def test_compiled_patterns_nonstandard(tmp_path):
+    dic_path = tmp_path / 'hyph_xx.dic'
+    dic_path.write_text('UTF-8\nc1k/k=k,1,2\n', encoding='utf-8')
+    patterns = parse_dic_file(dic_path)
+    compiled = CompiledPatterns(CompiledPatterns.compile(patterns))
+    assert compiled.get('ck') == patterns['ck']
+    start, (value, ) = compiled.get('ck')
+    assert (start, value) == (1, 1)
+    assert value.data == patterns['ck'][1][0].data == ('k=k', -1, 3)
+
+
+def test_priorities(tmp_path):
+    dic_path = tmp_path / 'hyph_xx.dic'
+    dic_path.write_text('UTF-8\n.ab1\n2bc\na3bcd\ncd4\nd1\n',
+                        encoding='utf-8')
+    compiled = CompiledPatterns(CompiledPatterns.compile(
+        parse_dic_file(dic_path)))
+    assert compiled.maxlen == 4
+    #                                    .  a  b  c  d  .
+    assert compiled.priorities('.abcd.') == [0, 0, 3, 1, 0, 4, 0]
+    assert compiled.priorities('.xbcx.') == [0, 0, 2, 0, 0, 0, 0]
+    assert compiled.priorities('') == [0]
+
+
+@pytest.mark.parametrize('other, data', [('ac1ke', ('k=k', -1, 3)),
+                                         ('c1ke', None)])
+def test_priorities_nonstandard(tmp_path, other, data):
+    # patterns are applied in order of their position in the word and their
+    # length; the last one determines the nonstandard hyphenation data
+    dic_path = tmp_path / 'hyph_xx.dic'
+    dic_path.write_text('UTF-8\nc1k/k=k,1,2\n{}\n'.format(other),
+                        encoding='utf-8')
+    compiled = CompiledPatterns(CompiledPatterns.compile(
+        parse_dic_file(dic_path)))
+    priorities = compiled.priorities('.acke.')
+    assert priorities == [0, 0, 0, 1, 0, 0, 0]
+    assert getattr(priorities[3], 'data', None) == data
+
+
+def test_compiled_patterns_invalid():
+    with pytest.raises(ValueError):
+        CompiledPatterns(b'rinohHYP\xff\xff')
+    table = CompiledPatterns.compile(parse_dic_file(EN_US))
+    with pytest.raises(ValueError):
+        CompiledPatterns(table[:-1])
+
+
+def test_compiled_patterns_cache(cache_path):
+    hyph_dict = Hyph_dict(EN_US)
+    table_path, = cache_path.glob('*.pat')
+    assert not isinstance(hyph_dict.patterns.buffer, mmap.mmap)
+    cached = Hyph_dict(EN_US)
+    assert isinstance(cached.patterns.buffer, mmap.mmap)
+    assert cached.positions('hyphenation') == [2, 6]
+
+
+def test_compiled_patterns_stale_cache(cache_path):
+    Hyph_dict(EN_US)
+    table_path, = cache_path.glob('*.pat')
+    table_path.write_bytes(b'garbage')
+    hyph_dict = Hyph_dict(EN_US)
+    assert hyph_dict.positions('hyphenation') == [2, 6]
+    assert table_path.read_bytes().startswith(CompiledPatterns.MAGIC)
+
+
+def test_word_cache_size(cache_path):
+    hyph_dict = Hyph_dict(EN_US, cache_size=2)
+    for word in ('hyphenation', 'taxonomically', 'dictionary'):
+        hyph_dict.positions(word)
+    assert list(hyph_dict.cache) == ['taxonomically', 'dictionary']
@@ -0,0 +1,122 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+
+import struct
+import zlib
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from rinoh.backend import pdf
+from rinoh.backend.pdf.xobject import png, purepng
+from rinoh.image import ImageCache
+
+
+def png_chunk(chunk_type, data):
+    chunk = chunk_type + data
+    return (struct.pack('>I', len(data)) + chunk
+            + struct.pack('>I', zlib.crc32(chunk)))
+
+
+def write_png(path, width, height):
+    """Write a grayscale PNG image of `width` x `height` pixels to `path`"""
+    rows = b''.join(b'\0' + bytes(range(width)) for _ in range(height))
+    with open(path, 'wb') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+        file.write(png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                                  8, 0, 0, 0, 0)))
+        file.write(png_chunk(b'IDAT', zlib.compress(rows)))
+        file.write(png_chunk(b'IEND', b''))
+
+
+def test_image_cache(tmpdir):
+    path = Path(tmpdir.join('image.png').strpath)
+    write_png(path, 4, 4)
+    cache = ImageCache(pdf)
+    image = cache.get(path)
+    assert cache.get(path) is image
+    assert cache.get(path.parent / '.' / path.name) is image
+    assert len(cache) == 1
+
+    write_png(path, 8, 4)                   # modified image file
+    modified_image = cache.get(path)
+    assert modified_image is not image
+    assert modified_image.width == 8
+    assert len(cache) == 2
+
+    with open(path, 'rb') as file:          # file objects are not cached
+        assert cache.get(BytesIO(file.read())) is not modified_image
+    assert len(cache) == 2
+
+
+def test_image_cache_eviction(tmpdir):
+    paths = []
+    for index in range(3):
+        path = Path(tmpdir.join('image{}.png'.format(index)).strpath)
+        write_png(path, 4, 4)
+        paths.append(path)
+    cache = ImageCache(pdf)
+    first = cache.get(paths[0])
+    cache.max_size = 2 * cache.size
+    second = cache.get(paths[1])
+    assert cache.get(paths[0]) is first     # paths[1] is least recently used
+    cache.get(paths[2])
+    assert len(cache) == 2
+    assert cache.get(paths[0]) is first
+    assert cache.get(paths[1]) is not second
+
+
+def test_image_cache_keeps_registered_images(tmpdir):
+    paths = []
+    for index in range(3):
+        path = Path(tmpdir.join('image{}.png'.format(index)).strpath)
+        write_png(path, 4, 4)
+        paths.append(path)
+    backend_document = pdf.Document('test')
+    cache = ImageCache(pdf)
+    first = cache.get(paths[0], backend_document)
+    backend_document.get_image_number(first)    # placed on a page
+    cache.max_size = 2 * cache.size
+    second = cache.get(paths[1], backend_document)
+    cache.get(paths[2], backend_document)
+    assert len(cache) == 2
+    assert cache.get(paths[0], backend_document) is first
+    assert cache.get(paths[1], backend_document) is not second
+
+
+def decode(xobject):
+    xobject.reset()
+    data = xobject.read()
+    xobject.reset()
+    return data
+
+
+@pytest.mark.parametrize('bitdepth, alpha, interlace',
+                         [(2, False, True), (8, False, True),
+                          (8, True, False), (16, True, True)])
+def test_png_numpy(bitdepth, alpha, interlace, tmpdir, monkeypatch):
+    numpy = pytest.importorskip('numpy')
+    width, height = 13, 11
+    planes = 4 if alpha else 1
+    rows = [[(x * y + plane) % 2**bitdepth
+             for x in range(width) for plane in range(planes)]
+            for y in range(height)]
+    writer = purepng.Writer(width, height, greyscale=not alpha, alpha=alpha,
+                            bitdepth=bitdepth, interlace=interlace)
+    path = Path(tmpdir.join('image.png').strpath)
+    with open(path, 'wb') as file:
+        writer.write(file, rows)
+    monkeypatch.setattr(png, 'numpy', None)
+    expected = png.PNGReader(path)
+    monkeypatch.setattr(png, 'numpy', numpy)
+    image = png.PNGReader(path)
+    assert decode(image) == decode(expected)
+    if alpha:
+        assert decode(image['SMask']) == decode(expected['SMask'])
@@ -0,0 +1,217 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+
+import re
+
+import pytest
+
+from copy import copy
+
+from rinoh.document import DocumentTree
+from rinoh.layout import VirtualContainer
+from rinoh.paragraph import GlyphRun, GlyphsSpan, ShapingCache
+from rinoh.paragraph import Line, LineBreaker, NewLine, Space, Word
+from rinoh.paragraph import DefaultTabStops, Paragraph, ParagraphBase
+from rinoh.paragraph import ParagraphLayout
+from rinoh.templates import Article
+
+
+def shape(text):
+    return GlyphRun([None] * len(text), [5.0] * len(text), text)
+
+
+def test_shaping_cache():
+    cache = ShapingCache(max_size=2)
+    assert cache.hit_rate == 0
+    run = cache.get(('font', 10, 'word'), lambda: shape('word'))
+    assert cache.get(('font', 10, 'word'), lambda: shape('word')) is run
+    assert cache.get(('font', 12, 'word'), lambda: shape('word')) is not run
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate == pytest.approx(1 / 3)
+    cache.get(('font', 10, 'other'), lambda: shape('other'))
+    assert len(cache) == 2
+    assert cache.get(('font', 10, 'word'), lambda: shape('word')) is not run
+    cache.clear()
+    assert len(cache) == 0 and cache.hit_rate == 0
+
+
+def test_glyphs_span_space_not_shared():
+    cache = ShapingCache()
+    def chars_to_glyphs(chars):
+        return cache.get(chars, lambda: shape(chars))
+
+    first = GlyphsSpan(None, chars_to_glyphs, chars_to_glyphs('a b'))
+    second = GlyphsSpan(None, chars_to_glyphs, chars_to_glyphs('a b'))
+    first.space_width += 1      # justification
+    assert second.space_width == 5.0
+    assert [width for _, width in first.glyphs()] == [5.0, 6.0, 5.0]
+    assert first.width == 16.0 and second.width == 15.0
+    assert chars_to_glyphs(' ').advances[0] == 5.0
+
+
+def test_glyph_run_ligatures():
+    run = GlyphRun([None] * 3, [5.0, 8.0, 0.5], 'ffi ', bytes([1, 2, 1]))
+    assert list(run.chars()) == ['f', 'fi', ' ']
+    assert run.space_indices == (2, )
+    assert run.non_space_width == 13.0
+
+
+def test_glyphs_span_tab():
+    def chars_to_glyphs(chars):
+        return shape(chars)
+
+    glyphs_span = GlyphsSpan(None, chars_to_glyphs)
+    glyphs_span.append_tab(22.0, fill='.')
+    assert str(glyphs_span) == '\t' and not glyphs_span.ends_with_space
+    assert [width for _, width in glyphs_span.glyphs()] == [2.0] + [5.0] * 4
+    space = GlyphsSpan(None, chars_to_glyphs)
+    space.append_space()
+    assert space.ends_with_space and space.width == 5.0
+
+
+HYPHENATIONS = {'abcdefgh': [('abcde-', 'fgh', False),
+                             ('ab-', 'cdefgh', True)]}
+
+
+class TextWord(Word):
+    """A word holding a single glyphs span, hyphenated as listed in
+    :data:`HYPHENATIONS`"""
+
+    def __init__(self, text):
+        super().__init__([GlyphsSpan(None, shape, shape(text))])
+
+    def hyphenate(self, container):
+        for first, second, is_last in HYPHENATIONS.get(str(self), ()):
+            yield TextWord(first), TextWord(second), is_last
+
+
+class WordsState(object):
+    """Stands in for a :class:`ParagraphState`, producing the words and
+    special characters in `text`"""
+
+    def __init__(self, text):
+        self.parts = iter(re.split('([ \n])', text))
+        self.span_index = self.group_index = 0
+        self._first_word = None
+
+    def next_word(self, container):
+        if self._first_word:
+            word, self._first_word = self._first_word, None
+            return word
+        part = next(self.parts)
+        while not part:
+            part = next(self.parts)
+        self.group_index += 1
+        special = {' ': Space, '\n': NewLine}.get(part)
+        return special(None, shape) if special else TextWord(part)
+
+    def prepend_word(self, word):
+        self._first_word = word
+
+
+def break_into_lines(text, line_width):
+    """Break `text` into lines using :class:`LineBreaker`
+
+    Returns the text of each line, its width, whether it is the last line,
+    and the position of the state and its first word following the line.
+
+    """
+    state = WordsState(text)
+    breaker = LineBreaker(state, None, line_width, DefaultTabStops(20))
+    return [(str(line), line.cursor, last_line, state.group_index,
+             str(state._first_word) if state._first_word else None)
+            for line, last_line in breaker.lines()]
+
+
+def test_line_breaker():
+    # all glyphs, including spaces, are 5 points wide
+    assert break_into_lines('aaaa bbbb  cccc\ndd eeeeeeeee', 50) == [
+        ('aaaa bbbb ', 50, False, 4, None),     # the second space wraps
+        ('cccc', 20, True, 7, None),            # the first space is dropped
+        ('dd ', 15, False, 9, None),
+        ('eeeeeeeee', 45, True, 10, None)]
+
+
+def test_line_breaker_hyphenates():
+    assert break_into_lines('xxxx abcdefgh', 50) == [
+        ('xxxx ab-', 40, False, 3, 'cdefgh'),
+        ('cdefgh', 30, True, 3, None)]
+    assert break_into_lines('abcdefgh', 30) == [
+        ('abcde-', 30, False, 1, 'fgh'),
+        ('fgh', 15, True, 1, None)]
+
+
+def create_paragraphs():
+    words = ('a couple of words, some of them quite long: '
+             'incomprehensibilities').split()
+    return [Paragraph(' '.join(words[(index * 3) % len(words)]
+                               for index in range(count)))
+            for count in (5, 300, 600)]
+
+
+def render_lines(tmp_path, monkeypatch):
+    """Render an article holding the paragraphs returned by
+    :func:`create_paragraphs`
+
+    Returns the document, the text of the lines typeset on the pages and the
+    number of lines produced by :meth:`ParagraphBase._lines`.
+
+    """
+    def typeset(line, container, *args, **kwargs):
+        if not container.never_placed:
+            lines.append(str(line))
+        return line_typeset(line, container, *args, **kwargs)
+
+    def count_lines(paragraph, *args, **kwargs):
+        nonlocal generated
+        for line in break_lines(paragraph, *args, **kwargs):
+            generated += 1
+            yield line
+
+    lines, generated = [], 0
+    line_typeset = Line.typeset
+    break_lines = ParagraphBase._lines
+    with monkeypatch.context() as patch:
+        patch.setattr(ParagraphBase, '_lines', count_lines)
+        patch.setattr(Line, 'typeset', typeset)
+        document = Article(DocumentTree(create_paragraphs()))
+        document.render(tmp_path / 'paragraphs')
+    return document, lines, generated
+
+
+def test_paragraph_layouts_reused(tmp_path, monkeypatch):
+    def render(paragraph, container, descender, state, *args, **kwargs):
+        # break the paragraph into lines in a virtual container first, as
+        # done when measuring a flowable
+        buffer = VirtualContainer(container, width=container.width,
+                                  never_placed=True)
+        paragraph_render(paragraph, buffer, descender, copy(state),
+                         *args, **kwargs)
+        return paragraph_render(paragraph, container, descender, state,
+                                *args, **kwargs)
+
+    paragraph_render = ParagraphBase.render
+    monkeypatch.setenv('RINOH_NO_CACHE', '1')
+    monkeypatch.setattr(ParagraphBase, 'render', render)
+    document, lines, cached_generated = render_lines(tmp_path, monkeypatch)
+    assert len(document.paragraph_layouts) > 0
+    monkeypatch.setattr(ParagraphBase, '_layout_lines',
+                        lambda paragraph, *args: paragraph._lines(*args))
+    _, uncached_lines, uncached_generated = render_lines(tmp_path,
+                                                         monkeypatch)
+    assert len(lines) > 40
+    assert lines == uncached_lines
+    assert cached_generated < uncached_generated
+
+
+def test_paragraph_layout_matches_style():
+    paragraph = Paragraph('some text')
+    layout = ParagraphLayout(paragraph, ('typeface', 10))
+    assert layout.matches(paragraph, ('typeface', 10), None)
+    assert not layout.matches(paragraph, ('typeface', 12), None)
+    assert not layout.matches(Paragraph('some text'), ('typeface', 10), None)
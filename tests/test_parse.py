@@ -28,7 +28,8 @@ from rinoh.style import (SelectorByName, parse_selector, parse_selector_args,
                          parse_class_selector, parse_keyword, parse_string,
                          parse_number, StyleParseError, CharIterator)
 from rinoh.table import ColumnWidths, VerticalAlign
-from rinoh.text import StyledText, SingleStyledText, MixedStyledText, Tab
+from rinoh.text import (StyledText, SingleStyledText, MixedStyledText, Tab,
+                        FontFeatures)
 
 
 def test_optionset_from_string():
@@ -120,6 +121,14 @@ def test_fontwidth_from_string():
         FontWidth.from_string('11')
 
 
+def test_fontfeatures_from_string():
+    assert FontFeatures.from_string('smcp') == ['smcp']
+    assert FontFeatures.from_string(' onum  ss01 ') == ['onum', 'ss01']
+    assert FontFeatures.from_string('') == []
+    with pytest.raises(ParseError):
+        FontFeatures.from_string('onum oldstyle')
+
+
 def test_numberformat_from_string():
     assert NumberFormat.from_string('none') == None
     assert NumberFormat.from_string('number') == NumberFormat.NUMBER
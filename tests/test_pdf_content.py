@@ -0,0 +1,44 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+
+from rinoh.backend.pdf.content import (ContentStream, format_number,
+                                       literal_string, hex_string)
+
+
+def test_format_number():
+    assert format_number(12.5, 6) == b'12.5'
+    assert format_number(10.0, 6) == b'10'
+    assert format_number(7, 3) == b'7'
+    assert format_number(1 / 3, 3) == b'0.333'
+    assert format_number(-1e-9, 6) == b'0'
+    assert format_number(1e-5, 6) == b'0.00001'
+
+
+def test_literal_string():
+    assert literal_string(b'a(b)c\\') == b'a\\(b\\)c\\\\'
+    assert literal_string([10, 200]) == b'\\012\\310'
+
+
+def test_hex_string():
+    assert hex_string([1, 0x12ab]) == b'000112ab'
+
+
+def test_content_stream():
+    stream = ContentStream()
+    stream.precision = 2
+    stream.operator(b'q')
+    stream.operator(b'cm', 1, 0, 0, 1, 12.346, -3)
+    stream.operator(b'Tf', b'/F1', 10.0)
+    stream.show_text([(b'ab', False, -12.3456), (b'0041', True, None)])
+    assert stream.getvalue() == (b'q\n'
+                                 b'1 0 0 1 12.35 -3 cm\n'
+                                 b'/F1 10 Tf\n'
+                                 b'[(ab) -12.346 <0041>] TJ\n')
+    stream.clear()
+    stream.write(b'BT\n')
+    assert stream.getvalue() == b'BT\n'
@@ -0,0 +1,50 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+
+from io import BytesIO
+
+from rinoh.backend.pdf import cos
+from rinoh.backend.pdf.reader import PDFReader
+
+
+def add_page(document, text, font):
+    pages = document.catalog['Pages']
+    page = pages.new_page(100, 100)
+    page['Resources']['Font'] = cos.Dictionary(F1=font)
+    page['Contents'] = cos.Stream()
+    page['Contents'].write(text)
+    return page
+
+
+def test_write_objects_early():
+    document = cos.Document('test')
+    pages = document.catalog['Pages']
+    file = BytesIO()
+    document.start_output(file)
+    font = cos.Dictionary(indirect=True)
+    for index in range(3):
+        text = 'page {}'.format(index + 1).encode('ascii')
+        page = add_page(document, text, font)
+        position = document.output_position
+        document.write_objects(page, deferred=[pages, font])
+    font['Subtype'] = cos.Name('Type1')     # deferred objects may change
+    document.truncate_output(position)      # discard the third page
+    del pages['Kids'][2:]
+    pages['Count'] = cos.Integer(2)
+    add_page(document, b'page 3b', font)
+    document.write(file)
+
+    assert file.getvalue().count(b' 0 obj') == len(document)
+    file.seek(0)
+    reader = PDFReader(file)
+    kids = reader.catalog['Pages']['Kids']
+    contents = []
+    for page in (kids[index] for index in range(len(kids))):
+        assert page['Resources']['Font']['F1']['Subtype'] == cos.Name('Type1')
+        contents.append(page['Contents'].read())
+    assert contents == [b'page 1', b'page 2', b'page 3b']
@@ -393,3 +393,34 @@ def test_sphinx_titles(caplog, tmp_path):
                             rinoh_documents=rinoh_documents)
     titles = app.builder.titles
     assert titles == [('index', "Title"), ('other/', "Other Title")]
+
+
+def build_sphinx_project(tmp_path, parallel=0):
+    with docutils_namespace():
+        app = Sphinx(srcdir=str(tmp_path / 'source'),
+                     confdir=str(tmp_path / 'source'),
+                     outdir=str(tmp_path / 'output'),
+                     doctreedir=str(tmp_path / 'doctrees'),
+                     buildername='rinoh', parallel=parallel,
+                     status=None)
+        app.build()
+    return {target: (tmp_path / 'output' / (target + '.pdf')).stat().st_mtime_ns
+            for target in ('a', 'b')}
+
+
+def test_sphinx_incremental_parallel_build(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'conf.py').write_text(
+        "rinoh_documents = [dict(doc='a', target='a', title='A'),\n"
+        "                   dict(doc='b', target='b', title='B')]\n")
+    (source / 'index.rst').write_text('.. toctree::\n\n   a\n   b\n')
+    for name in ('a', 'b'):
+        (source / (name + '.rst')).write_text('Document {0}\n==========\n\n'
+                                              'Contents.\n'.format(name))
+    first = build_sphinx_project(tmp_path, parallel=2)
+    assert build_sphinx_project(tmp_path) == first      # nothing rendered
+    (source / 'b.rst').write_text('Document b\n==========\n\nChanged.\n')
+    third = build_sphinx_project(tmp_path)
+    assert third['a'] == first['a']
+    assert third['b'] != first['b']
@@ -286,3 +286,136 @@ def test_variable():
     assert paragraph4.get_style('text_align', container) == 'right'
     assert paragraph4.get_style('font_color', container) == HexColor('f00')
     assert paragraph4.get_style('indent_first', container) == 0.5*CM
+
+
+def test_match_signatures():
+    sig_matcher = StyledMatcher({
+        'paragraph': Paragraph,
+        'note paragraph': Paragraph.like(has_class='note'),
+        'grouped paragraph': GroupedFlowables.like('group') / Paragraph,
+    })
+    sig_ssheet = StyleSheet('signatures', sig_matcher)
+    para1, para2 = Paragraph('one'), Paragraph('two')
+    note = Paragraph('note')
+    note.classes.append('note')
+    styled_para = Paragraph('styled', style='other')
+    grouped_para = Paragraph('grouped')
+    group = StaticGroupedFlowables([grouped_para], style='group')
+    sig_doctree = DocumentTree([para1, para2, note, styled_para, group])
+    sig_document = Document(sig_doctree, sig_ssheet, EN)
+
+    def signature(element):
+        return sig_document._match_signatures.get(element, sig_document)
+
+    assert signature(para1) == signature(para2)
+    assert len({signature(element) for element
+                in (para1, note, styled_para, grouped_para)}) == 4
+    assert (sig_document.get_matches(para1)
+            is sig_document.get_matches(para2))
+    assert ([match.style_name for match in sig_document.get_matches(note)]
+            == ['note paragraph', 'paragraph'])
+    assert ([match.style_name
+             for match in sig_document.get_matches(grouped_para)]
+            == ['grouped paragraph', 'paragraph'])
+
+
+def test_match_signatures_unhashable_attribute():
+    class ListParagraph(Paragraph):
+        items = ['unhashable']
+
+    unhashable_matcher = StyledMatcher({
+        'list paragraph': ListParagraph.like(items=['unhashable']),
+    })
+    unhashable_ssheet = StyleSheet('unhashable', unhashable_matcher)
+    para1, para2 = ListParagraph('one'), ListParagraph('two')
+    unhashable_document = Document(DocumentTree([para1, para2]),
+                                   unhashable_ssheet, EN)
+    assert unhashable_document._match_signatures.get(para1,
+                                                     unhashable_document) \
+        is None
+    matches1 = unhashable_document.get_matches(para1)
+    matches2 = unhashable_document.get_matches(para2)
+    assert matches1 is not matches2
+    assert [match.style_name for match in matches1] == ['list paragraph']
+
+
+def test_compiled_matcher():
+    compiled_matcher = StyledMatcher({
+        'paragraph': Paragraph,
+        'note paragraph': Paragraph.like(has_class='note'),
+        'intro paragraph': Paragraph.like(has_id='intro'),
+    })
+    compiled_ssheet = StyleSheet('compiled', compiled_matcher)
+    plain, note, intro = Paragraph('plain'), Paragraph('note'), \
+        Paragraph('intro', id='intro')
+    note.classes.append('note')
+    compiled_document = Document(DocumentTree([plain, note, intro]),
+                                 compiled_ssheet, EN)
+    compiled = compiled_ssheet.compiled_matcher
+    assert compiled_ssheet.compiled_matcher is compiled
+    candidates = compiled.candidates(Paragraph, None)
+    assert ([name for name, _, _ in candidates.for_element(plain)]
+            == ['paragraph'])
+    assert ([name for name, _, _ in candidates.for_element(note)]
+            == ['paragraph', 'note paragraph'])
+    assert ([name for name, _, _ in candidates.for_element(intro)]
+            == ['paragraph', 'intro paragraph'])
+
+    def names(element):
+        return [match.style_name for match
+                in compiled_ssheet.find_matches(element, compiled_document)]
+
+    assert names(note) == ['paragraph', 'note paragraph']
+    compiled_matcher['styled paragraph'] = Paragraph.like('styled')
+    assert compiled_ssheet.compiled_matcher is not compiled
+    assert names(Paragraph('styled', style='styled')) == ['styled paragraph',
+                                                         'paragraph']
+
+
+STYLESHEET_FILE = """
+[STYLESHEET]
+name = cached
+base = sphinx
+
+[VARIABLES]
+accent = #ff0000
+
+[body]
+font_size = 11pt
+font_color = $(accent)
+
+[note paragraph : Paragraph('note')]
+margin_left = 2cm
+"""
+
+
+def test_stylesheet_file_cache(tmp_path, monkeypatch):
+    from rinoh.style import StyleSheetFile
+
+    cache_path = tmp_path / 'cache'
+    monkeypatch.setattr('rinoh.attribute.CACHE_PATH', cache_path)
+    rts_path = tmp_path / 'cached.rts'
+    rts_path.write_text(STYLESHEET_FILE)
+    parsed = StyleSheetFile(rts_path)
+    assert not parsed._cache_loaded
+    assert len(list(cache_path.iterdir())) == 1
+    cached = StyleSheetFile(rts_path)
+    assert cached._cache_loaded
+    for stylesheet in (parsed, cached):
+        assert stylesheet.name == 'cached'
+        assert stylesheet.variables['accent'] == '#ff0000'
+        assert stylesheet['body']['font_size'] == 11*PT
+        assert stylesheet['body']['font_color'] == Var('accent')
+        assert stylesheet['note paragraph']['margin_left'] == 2*CM
+        assert stylesheet['note paragraph'].source is stylesheet
+        assert (stylesheet.get_selector('note paragraph')
+                == Paragraph.like('note'))
+    rts_path.write_text(STYLESHEET_FILE.replace('11pt', '12.5pt'))
+    stale = StyleSheetFile(rts_path)
+    assert not stale._cache_loaded
+    assert stale['body']['font_size'] == 12.5*PT
+    for cache_file in cache_path.iterdir():
+        cache_file.write_bytes(b'rinohRSC corrupt')
+    corrupt = StyleSheetFile(rts_path)
+    assert not corrupt._cache_loaded
+    assert corrupt['body']['font_size'] == 12.5*PT
@@ -0,0 +1,124 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+
+import os
+import struct
+
+import pytest
+
+from rinoh.font import Typeface
+from rinoh.font.opentype import OpenTypeFont
+from rinoh.font.opentype.subset import (subset_font, read_tables, index_end,
+                                        read_index, parse_dict, dict_operands,
+                                        check_sum, CHARSTRINGS, read_loca,
+                                        composite_glyph_components)
+
+
+DIR = os.path.dirname(__file__)
+
+
+def charstrings(cff_data):
+    header_size = cff_data[2]
+    top_dict, = read_index(cff_data, index_end(cff_data, header_size))
+    offset, = dict_operands(parse_dict(top_dict))[CHARSTRINGS]
+    return read_index(cff_data, offset)
+
+
+@pytest.mark.parametrize('filename', ['Cuprum.otf',
+                                      'texgyretermes-regular.otf'])
+def test_subset_cff_font(filename, tmpdir):
+    font = OpenTypeFont(os.path.join(DIR, filename))
+    glyph_ids = set(font.get_glyph_metrics(char, 'normal').code for char in 'Subset')
+    subset_data = subset_font(font, glyph_ids)
+    with open(font.filename, 'rb') as file:
+        font_data = file.read()
+    assert len(subset_data) < len(font_data)
+
+    _, tables = read_tables(font_data)
+    _, subset_tables = read_tables(subset_data)
+    assert 'GPOS' not in subset_tables
+    assert check_sum(subset_data) == 0xB1B0AFBA
+    original = charstrings(tables['CFF '])
+    subset = charstrings(subset_tables['CFF '])
+    assert len(subset) == len(original)
+    for glyph_id, (charstring, subset_charstring) \
+            in enumerate(zip(original, subset)):
+        if glyph_id in glyph_ids | {0}:
+            assert subset_charstring == charstring
+        else:
+            assert subset_charstring == b'\x0e'
+
+    subset_filename = tmpdir.join('subset.otf').strpath
+    with open(subset_filename, 'wb') as file:
+        file.write(subset_data)
+    subset_font_ = OpenTypeFont(subset_filename)
+    for char in 'Subset':
+        metrics = font.get_glyph_metrics(char, 'normal')
+        subset_metrics = subset_font_.get_glyph_metrics(char, 'normal')
+        assert subset_metrics.code == metrics.code
+        assert subset_metrics.width == metrics.width
+
+
+def truetype_glyphs(tables):
+    glyf, offsets = tables['glyf'], read_loca(tables)
+    return [glyf[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+def components(glyph):
+    if glyph and struct.unpack_from('>h', glyph)[0] < 0:
+        return set(composite_glyph_components(glyph))
+    return set()
+
+
+@pytest.mark.parametrize('text', ['Subset \u00e0\u00e9\u00ee\u00f5\u00fc',
+                                  None])
+def test_subset_truetype_font(text, tmpdir):
+    font = Typeface.from_string('DejaVu Serif').get_font()
+    with open(font.filename, 'rb') as file:
+        font_data = file.read()
+    _, tables = read_tables(font_data)
+    original = truetype_glyphs(tables)
+    if text is None:    # all glyphs; requires long 'loca' offsets
+        glyph_ids = set(range(len(original)))
+        text = 'Subset'
+    else:
+        glyph_ids = set(font.get_glyph_metrics(char, 'normal').code
+                        for char in text)
+    component_ids = set().union(*(components(original[glyph_id])
+                                  for glyph_id in glyph_ids))
+    retained = glyph_ids | component_ids | {0}
+    if len(glyph_ids) < len(original):
+        assert component_ids - glyph_ids    # accented letters are composites
+    subset_data = subset_font(font, glyph_ids)
+    assert len(subset_data) < len(font_data)
+
+    _, subset_tables = read_tables(subset_data)
+    assert 'GPOS' not in subset_tables
+    assert check_sum(subset_data) == 0xB1B0AFBA
+    index_to_loc_format, = struct.unpack_from('>h', subset_tables['head'], 50)
+    assert index_to_loc_format == (0 if len(glyph_ids) < len(original) else 1)
+    subset = truetype_glyphs(subset_tables)
+    assert len(subset) == len(original)
+    for glyph_id, (glyph, subset_glyph) in enumerate(zip(original, subset)):
+        if glyph_id in retained:
+            assert subset_glyph == glyph + b'\0' * (-len(glyph) % 4)
+        else:
+            assert subset_glyph == b''
+
+    subset_filename = tmpdir.join('subset.ttf').strpath
+    with open(subset_filename, 'wb') as file:
+        file.write(subset_data)
+    subset_font_ = OpenTypeFont(subset_filename)
+    mapping = subset_font_['cmap'][subset_font_._encoding].mapping
+    assert set(mapping.values()) <= retained
+    for char in text:
+        metrics = font.get_glyph_metrics(char, 'normal')
+        subset_metrics = subset_font_.get_glyph_metrics(char, 'normal')
+        assert mapping[ord(char)] == metrics.code
+        assert subset_metrics.code == metrics.code
+        assert subset_metrics.width == metrics.width
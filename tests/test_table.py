@@ -0,0 +1,138 @@
+# This file is part of rinohtype, the Python document preparation system.
+#
+# Copyright (c) Brecht Machiels.
+#
+# Use of this source code is subject to the terms of the GNU Affero General
+# Public License v3. See the LICENSE file or http://www.gnu.org/licenses/.
+
+
+import csv
+
+from pytest import raises
+
+from rinoh.document import DocumentTree
+from rinoh.flowable import Flowable
+from rinoh.paragraph import Paragraph
+from rinoh.style import StyleSheet
+from rinoh.structure import List, ListItem
+from rinoh.stylesheets import sphinx_article
+from rinoh.table import Table, TableHead, TableBody, TableRow, TableCell
+from rinoh.table import StreamingTable, StreamingTableBody
+from rinoh.templates import Article
+
+
+def create_row(index, num_columns=3):
+    return TableRow([TableCell([Paragraph('cell {} {}'.format(index, column)
+                                          + ' word' * column)])
+                     for column in range(num_columns)])
+
+
+def render_table(tmp_path, table, stylesheet=sphinx_article):
+    configuration = Article.Configuration('test', stylesheet=stylesheet)
+    document = Article(DocumentTree([table]), configuration=configuration)
+    document.render(tmp_path / 'table')
+    return document
+
+
+def test_content_widths_sampled_rows(tmp_path, monkeypatch):
+    monkeypatch.setenv('RINOH_NO_CACHE', '1')
+    stylesheet = StyleSheet('sampled', base=sphinx_article)
+    stylesheet('table', column_sizing_rows=4)
+    head = TableHead([create_row('head')])
+    body_rows = [create_row(index) for index in range(20)]
+    table = Table(TableBody(body_rows), head=head)
+    document = render_table(tmp_path, table, stylesheet)
+    sampled_cells = [cell for row in [head[0]] + body_rows[::5]
+                     for cell in row]
+    assert len(document.content_widths) == len(sampled_cells)
+    for cell in sampled_cells:
+        assert set(document.content_widths[cell]) == {0, float('+inf')}
+
+
+def test_content_widths_match_flowed_widths(tmp_path, monkeypatch):
+    def create_table():
+        def list_cell(index):
+            items = [ListItem(Paragraph('item ' + ' word' * (index + item)),
+                              id='item-{}-{}'.format(index, item))
+                     for item in range(3)]
+            return TableCell([List(items, style='enumerated')])
+
+        rows = [TableRow([TableCell([Paragraph('first line\nsecond line'
+                                               + ' longer' * index)]),
+                          list_cell(index),
+                          TableCell([Paragraph('unbreakable' * index)])])
+                for index in range(1, 4)]
+        return Table(TableBody(rows))
+
+    def content_widths(document, table):
+        return sorted(width for row in table.body for cell in row
+                      for _, width in document.content_widths[cell].values())
+
+    monkeypatch.setenv('RINOH_NO_CACHE', '1')
+    table = create_table()
+    document = render_table(tmp_path, table)
+    monkeypatch.setattr(Flowable, 'content_width', Flowable._flowed_width)
+    flowed_table = create_table()
+    flowed = render_table(tmp_path, flowed_table)
+    assert (content_widths(document, table)
+            == content_widths(flowed, flowed_table))
+
+
+def records(num_rows):
+    for index in range(num_rows):
+        yield 'row {}'.format(index), index * 7 % 13, 'word ' * (index % 5)
+
+
+def test_streaming_table(tmp_path, monkeypatch):
+    num_rows = 300
+    placed_rows = []
+    window_sizes = []
+    place_rows = Table._place_rows_and_render_borders
+    discard_rows = StreamingTableBody.discard_rows
+
+    def record_placed_rows(container, rendered_rows):
+        placed_rows.extend(row.index for row in rendered_rows
+                           if isinstance(row.row.parent, TableBody))
+        return place_rows(container, rendered_rows)
+
+    def record_window_size(body, index):
+        window_sizes.append(len(body))
+        return discard_rows(body, index)
+
+    monkeypatch.setenv('RINOH_NO_CACHE', '1')
+    monkeypatch.setattr(Table, '_place_rows_and_render_borders',
+                        staticmethod(record_placed_rows))
+    monkeypatch.setattr(StreamingTableBody, 'discard_rows',
+                        record_window_size)
+    stylesheet = StyleSheet('streaming', base=sphinx_article)
+    stylesheet('table', repeat_head=True, column_sizing_rows=20)
+    head = TableHead([TableRow.from_values(['name', 'number', 'text'])])
+    table = StreamingTable(lambda: records(num_rows), head=head)
+    document = render_table(tmp_path, table, stylesheet)
+    assert document.part_page_counts['contents'].count > 1
+    assert sorted(set(placed_rows)) == list(range(num_rows))
+    assert len(table.body._pinned) == 20
+    assert 0 < max(window_sizes) < 100
+
+
+def test_streaming_table_body_requires_iterable():
+    with raises(TypeError):
+        StreamingTableBody(records(10))
+    body = StreamingTableBody(lambda: records(10))
+    assert body.num_columns == 3
+    assert sum(1 for _ in body.iter_rows(4)) == 6
+
+
+def test_streaming_table_sources(tmp_path):
+    csv_path = tmp_path / 'records.csv'
+    with csv_path.open('w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['name', 'number', 'text'])
+        writer.writerows(records(50))
+    table = StreamingTable.from_csv(csv_path)
+    assert len(table.head) == 1 and table.head.num_columns == 3
+    assert sum(1 for _ in table.body.iter_rows()) == 50
+    columns = dict(name=['a', 'b'], number=[1, 2])
+    table = StreamingTable.from_columns(columns)
+    assert table.head.num_columns == 2
+    assert sum(1 for _ in table.body.iter_rows()) == 2
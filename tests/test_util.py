@@ -12,6 +12,7 @@ from rinoh import register_template, register_typeface
 from rinoh.font import Typeface
 from rinoh.fonts.adobe14 import helvetica
 from rinoh.template import DocumentTemplate
+from rinoh.util import LRUCache, atomic_write
 
 
 class MyTemplate(DocumentTemplate):
@@ -56,3 +57,26 @@ def test_dynamic_entry_point_conflict():
     with pytest.raises(ValueError) as exc:
         register_typeface('another_typeface', helvetica)
     assert "using 'register_typeface" in str(exc.value)
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache['a'] == 1
+    cache['c'] = 3
+    assert list(cache) == ['a', 'c']
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    cache['d'] = 4
+    assert list(cache) == ['a', 'd']
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path / 'cache' / 'file'
+    atomic_write(path, b'contents')
+    assert path.read_bytes() == b'contents'
+    with pytest.raises(TypeError):
+        atomic_write(path, 'not bytes')
+    assert path.read_bytes() == b'contents'
+    assert list(path.parent.iterdir()) == [path]